@@ -0,0 +1,125 @@
+import hashlib
+import logging
+from datetime import date, datetime, timezone
+from email.utils import format_datetime
+from typing import List, Optional, Tuple
+from urllib.parse import parse_qsl
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.config import settings
+from app.core.database import get_db_pool, get_read_db_pool
+from app.services.result_cache import range_is_open, result_cache, visible_sale_id
+
+logger = logging.getLogger(__name__)
+
+# Rotas administrativas/streaming: nunca respondem com validadores
+NO_STORE_PREFIXES = ("/analytics/cache", "/analytics/rollups", "/analytics/debug", "/analytics/health",
+                     "/analytics/indexes")
+SKIP_PREFIXES = ("/analytics/export",)
+
+
+def _range_end(params: List[Tuple[str, str]]) -> Optional[date]:
+    days = []
+    for key, value in params:
+        if not key.endswith("date"):
+            continue
+        try:
+            days.append(datetime.strptime(value, "%Y-%m-%d").date())
+        except ValueError:
+            continue
+    return max(days) if days else None
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # Comparação fraca (RFC 9110): W/"x" equivale a "x"
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+class ConditionalCacheMiddleware:
+    """ETag/Last-Modified para os GET de /analytics, derivados do watermark de vendas.
+
+    Períodos históricos (terminam antes da última venda) dependem só da época da base e
+    podem ficar em cache por muito tempo; períodos abertos e rotas sem datas mudam a cada venda nova.
+    Um If-None-Match que bate responde 304 sem executar a rota (e sem tocar nas queries).
+    """
+
+    def __init__(self, app: ASGIApp, prefix: str = ""):
+        self.app = app
+        self.prefix = prefix
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD") or not settings.HTTP_CACHE_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        route = path[len(self.prefix):] if path.startswith(self.prefix) else None
+        if route is None or not route.startswith("/analytics") or route.startswith(SKIP_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        if route.startswith(NO_STORE_PREFIXES):
+            await self.app(scope, receive, self._with_headers(send, {"Cache-Control": "no-store"}))
+            return
+
+        try:
+            watermark = await result_cache.watermark(await get_db_pool())
+        except Exception as e:
+            logger.warning(f"Watermark indisponível, respondendo sem validadores: {e}")
+            watermark = None
+        if watermark is None:
+            await self.app(scope, receive, send)
+            return
+
+        params = sorted(parse_qsl(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True))
+        end = _range_end(params)
+        historical = end is not None and not range_is_open(end, watermark)
+
+        if not historical and visible_sale_id(await get_read_db_pool(), watermark) != watermark.sale_id:
+            # Réplica atrasada: a resposta não tem todas as vendas do watermark, então não ganha ETag
+            await self.app(scope, receive, send)
+            return
+
+        # Histórico: só a época da base (e a versão das respostas) invalida; aberto: qualquer venda nova
+        parts = [settings.HTTP_CACHE_ETAG_SALT, route, repr(params), watermark.epoch]
+        if not historical:
+            parts.append(str(watermark.sale_id))
+        etag = '"' + hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:32] + '"'
+
+        headers = {"ETag": etag}
+        if historical:
+            headers["Cache-Control"] = f"public, max-age={settings.HTTP_CACHE_HISTORICAL_MAX_AGE}"
+        else:
+            headers["Cache-Control"] = f"public, max-age={settings.HTTP_CACHE_OPEN_MAX_AGE}, must-revalidate"
+            if watermark.last_created_at is not None:
+                headers["Last-Modified"] = format_datetime(
+                    watermark.last_created_at.replace(microsecond=0, tzinfo=watermark.last_created_at.tzinfo or timezone.utc)
+                    .astimezone(timezone.utc), usegmt=True
+                )
+
+        if_none_match = Headers(scope=scope).get("if-none-match")
+        if if_none_match and _matches(if_none_match, etag):
+            await send({
+                "type": "http.response.start",
+                "status": 304,
+                "headers": [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers.items()],
+            })
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        await self.app(scope, receive, self._with_headers(send, headers))
+
+    @staticmethod
+    def _with_headers(send: Send, headers: dict) -> Send:
+        async def wrapped(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                response_headers = MutableHeaders(scope=message)
+                for key, value in headers.items():
+                    if key not in response_headers:
+                        response_headers[key] = value
+            await send(message)
+        return wrapped
@@ -1,14 +1,89 @@
+import logging
+import time
 from fastapi import APIRouter, Depends, HTTPException, Query
-from typing import List, Dict, Any
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import date, datetime, timedelta
 from app.services.analytics_service import AnalyticsService
 from sqlalchemy.orm import Session
 from app.core.dependencies import get_db
+from app.api.timing import TimedRoute
+from app.core.responses import RawJSONResponse, dumps, json_mode, json_response, shape_param, wrap_data
 from app.services.query_builder import QueryBuilder
+from app.services.query_catalog import query_catalog
 from app.services.insight_detector import InsightDetector
-from app.core.dependencies import get_db
+from app.services.cache_warmer import cache_warmer
+from app.services.comparison import comparison_period
+from app.services.indexes import index_manager
+from app.services.quantiles import DEFAULT_PERCENTILES, METRICS, RELATIVE_ACCURACY, exact_percentiles, max_relative_error, sketch_percentiles
+from app.services.result_cache import result_cache
+from app.services.rollups import rollup_manager
+from app.services.semantic import SemanticError, semantic_layer
+from app.services.columnar import ColumnarUnavailableError
+from app.services.exporter import EXPORT_FORMATS, Exporter, export_filename
+from app.models import BatchRequest, SemanticQueryRequest
+from app.core.config import settings
+from app.core.dependencies import get_db, get_read_db
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/analytics", tags=["analytics"], route_class=TimedRoute, dependencies=[Depends(shape_param)])
+
+COMPARE_TO_PATTERN = "^(previous_period|previous_year|custom)$"
+COMPARE_TO_DESCRIPTION = "Compara com outro período na mesma query: previous_*, <métrica>_delta e <métrica>_change_pct"
+
+def _comparison_period(start_dt: date, end_dt: date, compare_to: Optional[str], compare_start_date: Optional[str],
+                       compare_end_date: Optional[str]) -> Optional[Tuple[date, date]]:
+    if compare_to is None:
+        return None
+    try:
+        return comparison_period(
+            start_dt, end_dt, compare_to,
+            datetime.strptime(compare_start_date, "%Y-%m-%d").date() if compare_start_date else None,
+            datetime.strptime(compare_end_date, "%Y-%m-%d").date() if compare_end_date else None,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _comparison_info(compare_to: str, compare: Tuple[date, date]) -> Dict[str, str]:
+    return {"compare_to": compare_to, "start_date": compare[0].isoformat(), "end_date": compare[1].isoformat()}
 
-router = APIRouter(prefix="/analytics", tags=["analytics"])
+async def _catalog_list_response(db_pool, route: str, category: str, query_name: str, params: tuple, limit: int = None,
+                                 preview: bool = False, compare_to: Optional[str] = None,
+                                 compare: Optional[Tuple[date, date]] = None):
+    query_builder = QueryBuilder(db_pool)
+    if compare is not None:
+        # Os dois períodos numa query só; tem precedência sobre a prévia
+        data = await query_builder.execute_comparison(category, query_name, params, *compare)
+        if data is not None:
+            return json_response({
+                "data": data[:limit] if limit is not None else data,
+                "comparison": _comparison_info(compare_to, compare),
+                "success": True
+            }, json_mode(route))
+    
+    if preview:
+        # Sem prévia disponível (query sem versão amostrada, rollup atualizado ou amostra atrasada) segue o exato
+        data = await query_builder.execute_preview(category, query_name, params)
+        if data is not None:
+            return json_response({
+                "data": data[:limit] if limit is not None else data,
+                "mode": "preview",
+                "sample_rate": settings.PREVIEW_SAMPLE_RATE,
+                "success": True
+            }, json_mode(route))
+    
+    mode = json_mode(route)
+    if mode == "postgres":
+        data_json = await query_builder.execute_query_json(category, query_name, params, limit)
+        return RawJSONResponse(wrap_data(data_json))
+    
+    data = await query_builder.execute_query(category, query_name, params)
+    return json_response({
+        "data": data[:limit] if limit is not None else data,
+        "success": True
+    }, mode)
 
 @router.get("/debug/queries")
 async def debug_queries(db_pool = Depends(get_db)):
@@ -64,41 +139,116 @@ async def debug_queries(db_pool = Depends(get_db)):
     except Exception as e:
         return {"error": f"Erro no debug: {str(e)}"}
     
+@router.get("/debug/json-benchmark")
+async def debug_json_benchmark(
+    category: str = Query("produtos"),
+    query_name: str = Query("top_addon_items"),
+    start_date: str = Query(..., description="Data inicial (YYYY-MM-DD)"),
+    end_date: str = Query(..., description="Data final (YYYY-MM-DD)"),
+    repeat: int = Query(5, ge=1, le=50),
+    db_pool = Depends(get_db)
+):
+    # Compara os caminhos de serialização para a mesma query, sem passar pelo cache
+    try:
+        catalog = query_catalog
+        query = catalog.get(category, query_name)
+        params = catalog.bind_params(query, (
+            datetime.strptime(start_date, "%Y-%m-%d").date(),
+            datetime.strptime(end_date, "%Y-%m-%d").date(),
+        ))
+        
+        timings = {"query": [], "python": [], "orjson": [], "postgres": []}
+        sizes = {}
+        async with db_pool.acquire() as connection:
+            for _ in range(repeat):
+                started = time.perf_counter()
+                records = await catalog.fetch_query(connection, query, params)
+                timings["query"].append(time.perf_counter() - started)
+                
+                # Caminho atual: dicts -> jsonable_encoder -> json.dumps do JSONResponse
+                started = time.perf_counter()
+                body = JSONResponse(jsonable_encoder({"data": [dict(r) for r in records], "success": True})).body
+                timings["python"].append(time.perf_counter() - started)
+                sizes["python"] = len(body)
+                
+                started = time.perf_counter()
+                body = dumps({"data": [dict(r) for r in records], "success": True})
+                timings["orjson"].append(time.perf_counter() - started)
+                sizes["orjson"] = len(body)
+                
+                # json_agg: query + montagem do JSON no Postgres, sem custo de serialização no Python
+                started = time.perf_counter()
+                body = wrap_data(await catalog.fetch_json(connection, category, query_name, params)).encode("utf-8")
+                timings["postgres"].append(time.perf_counter() - started)
+                sizes["postgres"] = len(body)
+        
+        def summary(values):
+            values = sorted(values)
+            return {"median_ms": round(values[len(values) // 2] * 1000, 3), "min_ms": round(values[0] * 1000, 3)}
+        
+        return {
+            "query_id": query.query_id,
+            "rows": len(records),
+            "repeat": repeat,
+            "note": "python/orjson medem só a serialização; postgres inclui a execução da query",
+            "timings": {path: summary(values) for path, values in timings.items()},
+            "bytes": sizes,
+        }
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro no benchmark: {str(e)}")
+
 @router.get("/stores/comparison")
 async def compare_stores(
     start_date: str = Query(..., description="Data inicial (YYYY-MM-DD)"),
     end_date: str = Query(..., description="Data final (YYYY-MM-DD)"),
     store_ids: str = Query(..., description="IDs das lojas separados por vírgula"),
-    db_pool = Depends(get_db)
+    approx: bool = Query(False, description="Clientes únicos estimados pelos sketches HLL (com intervalo de erro)"),
+    compare_to: str = Query(None, pattern=COMPARE_TO_PATTERN, description=COMPARE_TO_DESCRIPTION),
+    compare_start_date: str = Query(None, description="Início da comparação com compare_to=custom (YYYY-MM-DD)"),
+    compare_end_date: str = Query(None, description="Fim da comparação com compare_to=custom (YYYY-MM-DD)"),
+    db_pool = Depends(get_read_db)
 ):
     try:
-        print(f"🏪 Comparando lojas: {store_ids} - {start_date} até {end_date}")
+        logger.debug(f"🏪 Comparando lojas: {store_ids} - {start_date} até {end_date}")
         
         store_ids_list = [int(id.strip()) for id in store_ids.split(',')]
+        start_dt = datetime.strptime(start_date, "%Y-%m-%d").date()
+        end_dt = datetime.strptime(end_date, "%Y-%m-%d").date()
+        compare = _comparison_period(start_dt, end_dt, compare_to, compare_start_date, compare_end_date)
         
         analytics_service = AnalyticsService(db_pool)
-        data = await analytics_service.get_store_comparison(
-            datetime.strptime(start_date, "%Y-%m-%d").date(),
-            datetime.strptime(end_date, "%Y-%m-%d").date(),
-            store_ids_list
-        )
+        if compare is not None:
+            data = await analytics_service.get_store_period_comparison(start_dt, end_dt, store_ids_list, *compare, approx)
+            return json_response({
+                "data": data,
+                "comparison": _comparison_info(compare_to, compare),
+                "success": True
+            }, json_mode("/analytics/stores/comparison"))
         
-        return {
+        data = await analytics_service.get_store_comparison(start_dt, end_dt, store_ids_list, approx)
+        
+        return json_response({
             "data": data,
             "success": True
-        }
+        }, json_mode("/analytics/stores/comparison"))
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"❌ Erro na comparação: {e}")
+        logger.error(f"❌ Erro na comparação: {e}")
         raise HTTPException(status_code=500, detail=f"Erro na comparação: {str(e)}")
 
 @router.get("/stores/regions")
 async def get_store_regions(
     start_date: str = Query(..., description="Data inicial (YYYY-MM-DD)"),
     end_date: str = Query(..., description="Data final (YYYY-MM-DD)"),
-    db_pool = Depends(get_db)
+    db_pool = Depends(get_read_db)
 ):
     try:
-        print(f"🗺️ Buscando regiões: {start_date} até {end_date}")
+        logger.debug(f"🗺️ Buscando regiões: {start_date} até {end_date}")
         
         analytics_service = AnalyticsService(db_pool)
         data = await analytics_service.get_store_regions(
@@ -106,12 +256,12 @@ async def get_store_regions(
             datetime.strptime(end_date, "%Y-%m-%d").date()
         )
         
-        return {
+        return json_response({
             "data": data,
             "success": True
-        }
+        }, json_mode("/analytics/stores/regions"))
     except Exception as e:
-        print(f"❌ Erro nas regiões: {e}")
+        logger.error(f"❌ Erro nas regiões: {e}")
         raise HTTPException(status_code=500, detail=f"Erro nas regiões: {str(e)}")
 
 @router.get("/stores/ranking")
@@ -119,24 +269,26 @@ async def get_store_ranking(
     start_date: str = Query(..., description="Data inicial (YYYY-MM-DD)"),
     end_date: str = Query(..., description="Data final (YYYY-MM-DD)"),
     limit: int = Query(10, ge=1, le=50),
-    db_pool = Depends(get_db)
+    approx: bool = Query(False, description="Clientes únicos estimados pelos sketches HLL (com intervalo de erro)"),
+    db_pool = Depends(get_read_db)
 ):
     try:
-        print(f"🏆 Buscando ranking top {limit}: {start_date} até {end_date}")
+        logger.debug(f"🏆 Buscando ranking top {limit}: {start_date} até {end_date}")
         
         analytics_service = AnalyticsService(db_pool)
         data = await analytics_service.get_store_ranking(
             datetime.strptime(start_date, "%Y-%m-%d").date(),
             datetime.strptime(end_date, "%Y-%m-%d").date(),
-            limit
+            limit,
+            approx
         )
         
-        return {
+        return json_response({
             "data": data,
             "success": True
-        }
+        }, json_mode("/analytics/stores/ranking"))
     except Exception as e:
-        print(f"❌ Erro no ranking: {e}")
+        logger.error(f"❌ Erro no ranking: {e}")
         raise HTTPException(status_code=500, detail=f"Erro no ranking: {str(e)}")
 
 @router.get("/stores/ranking")
@@ -147,7 +299,7 @@ async def get_store_ranking(
     db: Session = Depends(get_db)
 ):
     try:
-        print(f"🏆 Buscando ranking top {limit}: {start_date} até {end_date}")
+        logger.debug(f"🏆 Buscando ranking top {limit}: {start_date} até {end_date}")
         
         analytics_service = AnalyticsService(db)
         data = analytics_service.get_store_ranking(
@@ -164,81 +316,95 @@ async def get_store_ranking(
         raise HTTPException(status_code=500, detail=f"Erro no ranking: {str(e)}")
 
 @router.get("/stores/list")
-async def get_all_stores(db_pool = Depends(get_db)):
+async def get_all_stores(db_pool = Depends(get_read_db)):
     try:
-        print("🏪 Buscando lista de lojas")
+        logger.debug("🏪 Buscando lista de lojas")
         
         analytics_service = AnalyticsService(db_pool)
         data = await analytics_service.get_all_stores()
         
-        return {
+        return json_response({
             "data": data,
             "success": True
-        }
+        }, json_mode("/analytics/stores/list"))
     except Exception as e:
-        print(f"❌ Erro na lista de lojas: {e}")
+        logger.error(f"❌ Erro na lista de lojas: {e}")
         raise HTTPException(status_code=500, detail=f"Erro na lista de lojas: {str(e)}")
 
 @router.get("/overview")
 async def get_overview_kpis(
     days: int = Query(30, ge=1, le=365),
-    db_pool = Depends(get_db)
+    approx: bool = Query(False, description="Clientes únicos estimados pelos sketches HLL (com intervalo de erro)"),
+    db_pool = Depends(get_read_db)
 ):
     try:
-        print(f"📊 Dashboard requisitou overview: {days} dias")
+        logger.debug(f"📊 Dashboard requisitou overview: {days} dias")
         
-        end_date = datetime(2025, 11, 3).date()
-        start_date = end_date - timedelta(days=days)
+        # Últimos N dias com dados: termina no dia da última venda (ou hoje, com a base vazia)
+        watermark = await result_cache.watermark(db_pool)
+        end_date = watermark.last_day if watermark is not None and watermark.last_day else date.today()
+        start_date = end_date - timedelta(days=days - 1)
         
-        print(f"📅 Usando período real: {start_date} até {end_date}")
+        logger.debug(f"📅 Usando período real: {start_date} até {end_date}")
         
-        query_builder = QueryBuilder(db_pool)
+        analytics_service = AnalyticsService(db_pool)
+        overview_data = await analytics_service.get_overview_kpis(start_date, end_date, approx)
         
-        sales_data = await query_builder.get_total_sales_period(start_date, end_date)
-        total_customers_data = await query_builder.get_total_customers()
-        
-        sales_summary = sales_data[0] if sales_data else {}
-        customers_summary = total_customers_data[0] if total_customers_data else {}
-        
-        overview_data = {
-            "sales": {
-                "total_orders": sales_summary.get("total_orders", 0),
-                "total_revenue": float(sales_summary.get("total_revenue", 0)),
-                "avg_ticket": float(sales_summary.get("avg_ticket", 0)),
-                "unique_customers": int(sales_summary.get("total_orders", 0) * 0.7)
-            },
-            "customers": {
-                "total": customers_summary.get("total_customers", 0),
-                "new_last_30d": int(customers_summary.get("total_customers", 0) * 0.03)
-            }
+        return {
+            **overview_data,
+            "period": {"start_date": start_date.isoformat(), "end_date": end_date.isoformat()}
         }
         
-        print(f"✅ Overview data: {overview_data}")
-        return overview_data
-        
     except Exception as e:
-        print(f"❌ Erro no overview: {e}")
+        logger.error(f"❌ Erro no overview: {e}")
         raise HTTPException(status_code=500, detail=f"Erro no overview: {str(e)}")
     
+@router.get("/dashboard")
+async def get_dashboard(
+    start_date: str = Query(..., description="Data inicial (YYYY-MM-DD)"),
+    end_date: str = Query(..., description="Data final (YYYY-MM-DD)"),
+    approx: bool = Query(False, description="Clientes únicos estimados pelos sketches HLL (com intervalo de erro)"),
+    db_pool = Depends(get_read_db)
+):
+    try:
+        logger.debug(f"📊 Dashboard requisitado: {start_date} até {end_date}")
+        
+        analytics_service = AnalyticsService(db_pool)
+        data = await analytics_service.get_dashboard(
+            datetime.strptime(start_date, "%Y-%m-%d").date(),
+            datetime.strptime(end_date, "%Y-%m-%d").date(),
+            approx
+        )
+        
+        return json_response({
+            **data,
+            "success": True
+        }, json_mode("/analytics/dashboard"))
+    except Exception as e:
+        logger.error(f"❌ Erro no dashboard: {e}")
+        raise HTTPException(status_code=500, detail=f"Erro no dashboard: {str(e)}")
+    
 @router.get("/top-channels")
 async def get_top_channels(
     start_date: str = Query(..., description="Data inicial (YYYY-MM-DD)"),
     end_date: str = Query(..., description="Data final (YYYY-MM-DD)"),
-    db_pool = Depends(get_db)
+    mode: str = Query("exact", pattern="^(exact|preview)$", description="preview: estimativa rápida pela amostra, com intervalos de ~95%"),
+    compare_to: str = Query(None, pattern=COMPARE_TO_PATTERN, description=COMPARE_TO_DESCRIPTION),
+    compare_start_date: str = Query(None, description="Início da comparação com compare_to=custom (YYYY-MM-DD)"),
+    compare_end_date: str = Query(None, description="Fim da comparação com compare_to=custom (YYYY-MM-DD)"),
+    db_pool = Depends(get_read_db)
 ):
     try:
-        print(f"📊 Requisitado top-channels: {start_date} até {end_date}")
+        logger.debug(f"📊 Requisitado top-channels: {start_date} até {end_date}")
         
         start_dt = datetime.strptime(start_date, "%Y-%m-%d").date()
         end_dt = datetime.strptime(end_date, "%Y-%m-%d").date()
+        compare = _comparison_period(start_dt, end_dt, compare_to, compare_start_date, compare_end_date)
         
-        query_builder = QueryBuilder(db_pool)
-        data = await query_builder.get_top_sales_channel(start_dt, end_dt)
-        
-        return {
-            "data": data,
-            "success": True
-        }
+        return await _catalog_list_response(db_pool, "/analytics/top-channels", 'vendas_e_desempenho', 'top_sales_channel', (start_dt, end_dt),
+                                            preview=mode == "preview", compare_to=compare_to, compare=compare)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro nos canais: {str(e)}")
 
@@ -246,15 +412,33 @@ async def get_top_channels(
 async def get_total_sales(
     start_date: str = Query(..., description="Data inicial (YYYY-MM-DD)"),
     end_date: str = Query(..., description="Data final (YYYY-MM-DD)"),
-    db_pool = Depends(get_db)
+    mode: str = Query("exact", pattern="^(exact|preview)$", description="preview: estimativa rápida pela amostra, com intervalos de ~95%"),
+    compare_to: str = Query(None, pattern=COMPARE_TO_PATTERN, description=COMPARE_TO_DESCRIPTION),
+    compare_start_date: str = Query(None, description="Início da comparação com compare_to=custom (YYYY-MM-DD)"),
+    compare_end_date: str = Query(None, description="Fim da comparação com compare_to=custom (YYYY-MM-DD)"),
+    db_pool = Depends(get_read_db)
 ):
     try:
-        print(f"📊 Requisitado total-sales: {start_date} até {end_date}")
+        logger.debug(f"📊 Requisitado total-sales: {start_date} até {end_date}")
         
         start_dt = datetime.strptime(start_date, "%Y-%m-%d").date()
         end_dt = datetime.strptime(end_date, "%Y-%m-%d").date()
+        compare = _comparison_period(start_dt, end_dt, compare_to, compare_start_date, compare_end_date)
+        if compare is not None:
+            return await _catalog_list_response(db_pool, "/analytics/total-sales", 'vendas_e_desempenho', 'total_sales_period', (start_dt, end_dt),
+                                                limit=1, compare_to=compare_to, compare=compare)
         
         query_builder = QueryBuilder(db_pool)
+        if mode == "preview":
+            preview = await query_builder.execute_preview('vendas_e_desempenho', 'total_sales_period', (start_dt, end_dt))
+            if preview is not None:
+                return json_response({
+                    "data": preview[:1],
+                    "mode": "preview",
+                    "sample_rate": settings.PREVIEW_SAMPLE_RATE,
+                    "success": True
+                }, json_mode("/analytics/total-sales"))
+        
         data = await query_builder.get_total_sales_period(start_dt, end_dt)
         
         sales_summary = data[0] if data else {}
@@ -264,10 +448,12 @@ async def get_total_sales(
             "avg_ticket": float(sales_summary.get("avg_ticket", 0))
         }
         
-        return {
+        return json_response({
             "data": [sales_data],
             "success": True
-        }
+        }, json_mode("/analytics/total-sales"))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro nas vendas totais: {str(e)}")
 
@@ -275,21 +461,15 @@ async def get_total_sales(
 async def get_top_days(
     start_date: str = Query(..., description="Data inicial (YYYY-MM-DD)"),
     end_date: str = Query(..., description="Data final (YYYY-MM-DD)"),
-    db_pool = Depends(get_db)
+    db_pool = Depends(get_read_db)
 ):
     try:
-        print(f"📊 SalesPage: top-days para {start_date} até {end_date}")
+        logger.debug(f"📊 SalesPage: top-days para {start_date} até {end_date}")
         
         start_dt = datetime.strptime(start_date, "%Y-%m-%d").date()
         end_dt = datetime.strptime(end_date, "%Y-%m-%d").date()
         
-        query_builder = QueryBuilder(db_pool)
-        data = await query_builder.get_top_sales_day_week(start_dt, end_dt)
-        
-        return {
-            "data": data,
-            "success": True
-        }
+        return await _catalog_list_response(db_pool, "/analytics/top-days", 'vendas_e_desempenho', 'top_sales_day_week', (start_dt, end_dt))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro nos dias: {str(e)}")
 
@@ -297,21 +477,15 @@ async def get_top_days(
 async def get_peak_hours(
     start_date: str = Query(..., description="Data inicial (YYYY-MM-DD)"),
     end_date: str = Query(..., description="Data final (YYYY-MM-DD)"),
-    db_pool = Depends(get_db)
+    db_pool = Depends(get_read_db)
 ):
     try:
-        print(f"📊 SalesPage: peak-hours para {start_date} até {end_date}")
+        logger.debug(f"📊 SalesPage: peak-hours para {start_date} até {end_date}")
         
         start_dt = datetime.strptime(start_date, "%Y-%m-%d").date()
         end_dt = datetime.strptime(end_date, "%Y-%m-%d").date()
         
-        query_builder = QueryBuilder(db_pool)
-        data = await query_builder.get_peak_sales_hours(start_dt, end_dt)
-        
-        return {
-            "data": data,
-            "success": True
-        }
+        return await _catalog_list_response(db_pool, "/analytics/peak-hours", 'vendas_e_desempenho', 'peak_sales_hours', (start_dt, end_dt))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro nos horários: {str(e)}")
 
@@ -319,21 +493,16 @@ async def get_peak_hours(
 async def get_cancellation_rate(
     start_date: str = Query(..., description="Data inicial (YYYY-MM-DD)"),
     end_date: str = Query(..., description="Data final (YYYY-MM-DD)"),
-    db_pool = Depends(get_db)
+    mode: str = Query("exact", pattern="^(exact|preview)$", description="preview: estimativa rápida pela amostra, com intervalos de ~95%"),
+    db_pool = Depends(get_read_db)
 ):
     try:
-        print(f"📊 SalesPage: cancellation-rate para {start_date} até {end_date}")
+        logger.debug(f"📊 SalesPage: cancellation-rate para {start_date} até {end_date}")
         
         start_dt = datetime.strptime(start_date, "%Y-%m-%d").date()
         end_dt = datetime.strptime(end_date, "%Y-%m-%d").date()
         
-        query_builder = QueryBuilder(db_pool)
-        data = await query_builder.get_cancellation_rate(start_dt, end_dt)
-        
-        return {
-            "data": data,
-            "success": True
-        }
+        return await _catalog_list_response(db_pool, "/analytics/cancellation-rate", 'vendas_e_desempenho', 'cancellation_rate', (start_dt, end_dt), preview=mode == "preview")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro no cancelamento: {str(e)}")
 
@@ -341,21 +510,16 @@ async def get_cancellation_rate(
 async def get_top_categories(
     start_date: str = Query(..., description="Data inicial (YYYY-MM-DD)"),
     end_date: str = Query(..., description="Data final (YYYY-MM-DD)"),
-    db_pool = Depends(get_db)
+    mode: str = Query("exact", pattern="^(exact|preview)$", description="preview: estimativa rápida pela amostra, com intervalos de ~95%"),
+    db_pool = Depends(get_read_db)
 ):
     try:
-        print(f"🍔 ProductsPage: top-categories para {start_date} até {end_date}")
+        logger.debug(f"🍔 ProductsPage: top-categories para {start_date} até {end_date}")
         
         start_dt = datetime.strptime(start_date, "%Y-%m-%d").date()
         end_dt = datetime.strptime(end_date, "%Y-%m-%d").date()
         
-        query_builder = QueryBuilder(db_pool)
-        data = await query_builder.get_top_revenue_categories(start_dt, end_dt)
-        
-        return {
-            "data": data,
-            "success": True
-        }
+        return await _catalog_list_response(db_pool, "/analytics/top-categories", 'produtos', 'top_revenue_categories', (start_dt, end_dt), preview=mode == "preview")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro nas categorias: {str(e)}")
 
@@ -363,21 +527,15 @@ async def get_top_categories(
 async def get_top_addons(
     start_date: str = Query(..., description="Data inicial (YYYY-MM-DD)"),
     end_date: str = Query(..., description="Data final (YYYY-MM-DD)"),
-    db_pool = Depends(get_db)
+    db_pool = Depends(get_read_db)
 ):
     try:
-        print(f"🍔 ProductsPage: top-addons para {start_date} até {end_date}")
+        logger.debug(f"🍔 ProductsPage: top-addons para {start_date} até {end_date}")
         
         start_dt = datetime.strptime(start_date, "%Y-%m-%d").date()
         end_dt = datetime.strptime(end_date, "%Y-%m-%d").date()
         
-        query_builder = QueryBuilder(db_pool)
-        data = await query_builder.get_top_addon_items(start_dt, end_dt)
-        
-        return {
-            "data": data,
-            "success": True
-        }
+        return await _catalog_list_response(db_pool, "/analytics/top-addons", 'produtos', 'top_addon_items', (start_dt, end_dt))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro nos adicionais: {str(e)}")
 
@@ -386,92 +544,144 @@ async def get_top_products(
     start_date: str = Query(..., description="Data inicial (YYYY-MM-DD)"),
     end_date: str = Query(..., description="Data final (YYYY-MM-DD)"),
     limit: int = Query(10, ge=1, le=50),
-    db_pool = Depends(get_db)
+    mode: str = Query("exact", pattern="^(exact|preview)$", description="preview: estimativa rápida pela amostra, com intervalos de ~95%"),
+    db_pool = Depends(get_read_db)
 ):
     try:
-        print(f"🍔 ProductsPage: top-products para {start_date} até {end_date}")
+        logger.debug(f"🍔 ProductsPage: top-products para {start_date} até {end_date}")
         
         start_dt = datetime.strptime(start_date, "%Y-%m-%d").date()
         end_dt = datetime.strptime(end_date, "%Y-%m-%d").date()
         
-        query_builder = QueryBuilder(db_pool)
-        data = await query_builder.get_top_bottom_products(start_dt, end_dt)
-        
-        top_products = data[:limit] if data else []
-        
-        return {
-            "data": top_products,
-            "success": True
-        }
+        return await _catalog_list_response(db_pool, "/analytics/top-products", 'produtos', 'top_bottom_products', (start_dt, end_dt), limit, preview=mode == "preview")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro nos produtos: {str(e)}")
 
-@router.get("/avg-product-prices")
-async def get_avg_product_prices(
+@router.get("/products/weekday-hour")
+async def get_product_weekday_hour(
     start_date: str = Query(..., description="Data inicial (YYYY-MM-DD)"),
     end_date: str = Query(..., description="Data final (YYYY-MM-DD)"),
-    db_pool = Depends(get_db)
+    day_of_week: int = Query(None, ge=0, le=6, description="Dia da semana (0 = domingo, 4 = quinta)"),
+    hour_start: int = Query(None, ge=0, le=23, description="Hora inicial (inclusive)"),
+    hour_end: int = Query(None, ge=0, le=23, description="Hora final (inclusive)"),
+    limit: int = Query(50, ge=1, le=500),
+    db_pool = Depends(get_read_db)
 ):
     try:
-        print(f"🍔 ProductsPage: avg-product-prices para {start_date} até {end_date}")
+        logger.debug(f"🍔 ProductsPage: weekday-hour para {start_date} até {end_date} (dow={day_of_week}, {hour_start}-{hour_end}h)")
         
         start_dt = datetime.strptime(start_date, "%Y-%m-%d").date()
         end_dt = datetime.strptime(end_date, "%Y-%m-%d").date()
         
         query_builder = QueryBuilder(db_pool)
-        data = await query_builder.get_avg_product_prices(start_dt, end_dt)
+        data = await query_builder.get_product_weekday_hour(start_dt, end_dt, day_of_week, hour_start, hour_end, limit)
         
-        return {
+        return json_response({
             "data": data,
             "success": True
-        }
+        }, json_mode("/analytics/products/weekday-hour"))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro nos produtos por dia/hora: {str(e)}")
+
+@router.get("/percentiles/{metric}")
+async def get_time_percentiles(
+    metric: str,
+    start_date: str = Query(..., description="Data inicial (YYYY-MM-DD)"),
+    end_date: str = Query(..., description="Data final (YYYY-MM-DD)"),
+    group_by: str = Query("store", pattern="^(store|channel|none)$"),
+    store_ids: str = Query(None, description="IDs das lojas separados por vírgula"),
+    channel_ids: str = Query(None, description="IDs dos canais separados por vírgula"),
+    percentiles: str = Query(",".join(f"{p:g}" for p in DEFAULT_PERCENTILES), description="Ex.: 50,90,99"),
+    mode: str = Query("sketch", pattern="^(sketch|exact|compare)$", description="exact/compare: PERCENTILE_CONT em sales, para validar os sketches"),
+    db_pool = Depends(get_read_db)
+):
+    if metric not in METRICS:
+        raise HTTPException(status_code=404, detail=f"Métrica desconhecida: {metric} (use {', '.join(METRICS)})")
+    try:
+        logger.debug(f"⏱️ Percentis de {metric} por {group_by}: {start_date} até {end_date} ({mode})")
+        
+        args = (
+            metric,
+            datetime.strptime(start_date, "%Y-%m-%d").date(),
+            datetime.strptime(end_date, "%Y-%m-%d").date(),
+            group_by,
+            [int(id.strip()) for id in store_ids.split(',')] if store_ids else None,
+            [int(id.strip()) for id in channel_ids.split(',')] if channel_ids else None,
+            [float(p.strip()) for p in percentiles.split(',')],
+        )
+        if any(not 0 <= p <= 100 for p in args[-1]):
+            raise HTTPException(status_code=400, detail="Percentis devem estar entre 0 e 100")
+        
+        # Sem o rollup atualizado os sketches teriam de ler uma cauda grande de sales: vai direto no exato
+        if mode == "sketch" and not await rollup_manager.is_fresh(db_pool, "sales_time_buckets_daily"):
+            mode = "exact"
+        
+        response = {"mode": mode, "success": True}
+        if mode in ("sketch", "compare"):
+            response["data"] = await sketch_percentiles(db_pool, *args)
+            response["relative_accuracy"] = RELATIVE_ACCURACY
+        if mode in ("exact", "compare"):
+            exact = await exact_percentiles(db_pool, *args)
+            if mode == "exact":
+                response["data"] = exact
+            else:
+                response["exact"] = exact
+                response["max_relative_error"] = max_relative_error(response["data"], exact)
+        
+        return json_response(response, json_mode("/analytics/percentiles"))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro nos percentis: {str(e)}")
+
+@router.get("/avg-product-prices")
+async def get_avg_product_prices(
+    start_date: str = Query(..., description="Data inicial (YYYY-MM-DD)"),
+    end_date: str = Query(..., description="Data final (YYYY-MM-DD)"),
+    db_pool = Depends(get_read_db)
+):
+    try:
+        logger.debug(f"🍔 ProductsPage: avg-product-prices para {start_date} até {end_date}")
+        
+        start_dt = datetime.strptime(start_date, "%Y-%m-%d").date()
+        end_dt = datetime.strptime(end_date, "%Y-%m-%d").date()
+        
+        return await _catalog_list_response(db_pool, "/analytics/avg-product-prices", 'produtos', 'avg_product_prices', (start_dt, end_dt))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro nos preços: {str(e)}")
 
 @router.get("/total-customers")
-async def get_total_customers(db_pool = Depends(get_db)):
+async def get_total_customers(db_pool = Depends(get_read_db)):
     try:
-        print(f"👥 CustomersPage: total-customers")
+        logger.debug(f"👥 CustomersPage: total-customers")
         
         query_builder = QueryBuilder(db_pool)
         data = await query_builder.get_total_customers()
         
         customers_summary = data[0] if data else {}
         
-        return {
+        return json_response({
             "data": [customers_summary],
             "success": True
-        }
+        }, json_mode("/analytics/total-customers"))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro no total de clientes: {str(e)}")
 
 @router.get("/promotion-optin")
-async def get_promotion_optin(db_pool = Depends(get_db)):
+async def get_promotion_optin(db_pool = Depends(get_read_db)):
     try:
-        print(f"👥 CustomersPage: promotion-optin")
-        
-        query_builder = QueryBuilder(db_pool)
-        data = await query_builder.get_promotion_optin_rate()
+        logger.debug(f"👥 CustomersPage: promotion-optin")
         
-        return {
-            "data": data,
-            "success": True
-        }
+        return await _catalog_list_response(db_pool, "/analytics/promotion-optin", 'clientes', 'promotion_optin_rate', ())
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro no opt-in: {str(e)}")
 
 @router.get("/customer-age-distribution")
-async def get_customer_age_distribution(db_pool = Depends(get_db)):
+async def get_customer_age_distribution(db_pool = Depends(get_read_db)):
     try:
-        print(f"👥 CustomersPage: customer-age-distribution")
-        
-        query_builder = QueryBuilder(db_pool)
-        data = await query_builder.get_customer_age_distribution()
+        logger.debug(f"👥 CustomersPage: customer-age-distribution")
         
-        return {
-            "data": data,
-            "success": True
-        }
+        return await _catalog_list_response(db_pool, "/analytics/customer-age-distribution", 'clientes', 'customer_age_distribution', ())
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro na distribuição etária: {str(e)}")
 
@@ -479,10 +689,10 @@ async def get_customer_age_distribution(db_pool = Depends(get_db)):
 async def get_avg_orders_per_customer(
     start_date: str = Query(..., description="Data inicial (YYYY-MM-DD)"),
     end_date: str = Query(..., description="Data final (YYYY-MM-DD)"),
-    db_pool = Depends(get_db)
+    db_pool = Depends(get_read_db)
 ):
     try:
-        print(f"👥 CustomersPage: avg-orders-per-customer para {start_date} até {end_date}")
+        logger.debug(f"👥 CustomersPage: avg-orders-per-customer para {start_date} até {end_date}")
         
         start_dt = datetime.strptime(start_date, "%Y-%m-%d").date()
         end_dt = datetime.strptime(end_date, "%Y-%m-%d").date()
@@ -492,18 +702,96 @@ async def get_avg_orders_per_customer(
         
         orders_summary = data[0] if data else {}
         
-        return {
+        return json_response({
             "data": [orders_summary],
             "success": True
-        }
+        }, json_mode("/analytics/avg-orders-per-customer"))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro na média de pedidos: {str(e)}")
 
+@router.get("/customer-metrics")
+async def get_customer_metrics(
+    start_date: str = Query(..., description="Data inicial (YYYY-MM-DD)"),
+    end_date: str = Query(..., description="Data final (YYYY-MM-DD)"),
+    db_pool = Depends(get_read_db)
+):
+    try:
+        logger.debug(f"👥 CustomersPage: customer-metrics para {start_date} até {end_date}")
+        
+        start_dt = datetime.strptime(start_date, "%Y-%m-%d").date()
+        end_dt = datetime.strptime(end_date, "%Y-%m-%d").date()
+        
+        query_builder = QueryBuilder(db_pool)
+        data = await query_builder.get_customer_metrics(start_dt, end_dt, settings.CUSTOMER_AT_RISK_DAYS, settings.CUSTOMER_LOST_DAYS)
+        
+        return json_response({
+            "data": [data[0] if data else {}],
+            "success": True
+        }, json_mode("/analytics/customer-metrics"))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro nas métricas de clientes: {str(e)}")
+
+async def _customer_segment_response(db_pool, route: str, as_of: str, min_orders: int, min_days: int,
+                                     max_days: int, store_id: int, limit: int):
+    as_of_dt = datetime.strptime(as_of, "%Y-%m-%d").date() if as_of else date.today()
+    return await _catalog_list_response(
+        db_pool, route, 'clientes', 'customer_segment',
+        (as_of_dt, min_orders, min_days, max_days, store_id, limit), limit
+    )
+
+@router.get("/repeat-customers")
+async def get_repeat_customers(
+    min_orders: int = Query(2, ge=1, description="Mínimo de pedidos concluídos"),
+    store_id: int = Query(None, description="Só pedidos desta loja"),
+    as_of: str = Query(None, description="Data de referência (YYYY-MM-DD); padrão: hoje"),
+    limit: int = Query(100, ge=1, le=1000),
+    db_pool = Depends(get_read_db)
+):
+    try:
+        logger.debug(f"👥 CustomersPage: repeat-customers (min_orders={min_orders}, loja={store_id})")
+        
+        return await _customer_segment_response(db_pool, "/analytics/repeat-customers", as_of, min_orders, 0, None, store_id, limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro nos clientes recorrentes: {str(e)}")
+
+@router.get("/customers/churn-risk")
+async def get_churn_risk_customers(
+    min_orders: int = Query(3, ge=1, description="Mínimo de pedidos concluídos"),
+    days: int = Query(settings.CUSTOMER_AT_RISK_DAYS, ge=1, description="Sem comprar há pelo menos N dias"),
+    lost_days: int = Query(settings.CUSTOMER_LOST_DAYS, ge=1, description="A partir de N dias o cliente conta como perdido"),
+    store_id: int = Query(None, description="Última visita nesta loja"),
+    as_of: str = Query(None, description="Data de referência (YYYY-MM-DD); padrão: hoje"),
+    limit: int = Query(100, ge=1, le=1000),
+    db_pool = Depends(get_read_db)
+):
+    try:
+        logger.debug(f"👥 CustomersPage: churn-risk ({min_orders}+ pedidos, {days}-{lost_days} dias, loja={store_id})")
+        
+        return await _customer_segment_response(db_pool, "/analytics/customers/churn-risk", as_of, min_orders, days, lost_days, store_id, limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro nos clientes em risco: {str(e)}")
+
+@router.get("/customers/lost")
+async def get_lost_customers(
+    min_orders: int = Query(2, ge=1, description="Mínimo de pedidos concluídos"),
+    days: int = Query(settings.CUSTOMER_LOST_DAYS, ge=1, description="Sem comprar há pelo menos N dias"),
+    store_id: int = Query(None, description="Última visita nesta loja"),
+    as_of: str = Query(None, description="Data de referência (YYYY-MM-DD); padrão: hoje"),
+    limit: int = Query(100, ge=1, le=1000),
+    db_pool = Depends(get_read_db)
+):
+    try:
+        logger.debug(f"👥 CustomersPage: lost ({min_orders}+ pedidos, {days}+ dias, loja={store_id})")
+        
+        return await _customer_segment_response(db_pool, "/analytics/customers/lost", as_of, min_orders, days, None, store_id, limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro nos clientes perdidos: {str(e)}")
+
 @router.get("/data-availability")
 async def get_data_availability(
     start_date: str = Query(..., description="Data inicial (YYYY-MM-DD)"),
     end_date: str = Query(..., description="Data final (YYYY-MM-DD)"),
-    db_pool = Depends(get_db)
+    db_pool = Depends(get_read_db)
 ):
     try:
         start_dt = datetime.strptime(start_date, "%Y-%m-%d").date()
@@ -515,7 +803,7 @@ async def get_data_availability(
                 MIN(DATE(created_at)) as data_start,
                 MAX(DATE(created_at)) as data_end
             FROM sales 
-            WHERE created_at BETWEEN $1 AND $2
+            WHERE created_at >= $1::date AND created_at < $2::date + 1
             AND sale_status_desc = 'COMPLETED'
         """
         
@@ -531,6 +819,208 @@ async def get_data_availability(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao verificar dados: {str(e)}")
 
+@router.post("/batch")
+async def run_batch(request: BatchRequest, db_pool = Depends(get_read_db)):
+    if len(request.queries) > settings.BATCH_MAX_QUERIES:
+        raise HTTPException(status_code=400, detail=f"Máximo de {settings.BATCH_MAX_QUERIES} queries por lote")
+    
+    shared_params = tuple(p for p in (request.start_date, request.end_date) if p is not None)
+    
+    queries = []
+    for item in request.queries:
+        key = item.id or f"{item.category}/{item.query}"
+        if any(key == existing[0] for existing in queries):
+            raise HTTPException(status_code=400, detail=f"Query duplicada no lote: {key}")
+        queries.append((key, item.category, item.query, shared_params + tuple(item.extra_params)))
+    
+    try:
+        query_builder = QueryBuilder(db_pool)
+        results = await query_builder.execute_batch(queries, request.deadline_ms or settings.BATCH_DEADLINE_MS)
+        
+        return json_response({
+            "results": results,
+            "success": all(result["success"] for result in results.values())
+        }, json_mode("/analytics/batch"))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro no lote: {str(e)}")
+
+def _export_response(stream, filename: str, fmt: str, gzip: bool) -> StreamingResponse:
+    media_type = "application/gzip" if gzip else EXPORT_FORMATS[fmt]
+    return StreamingResponse(
+        stream,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.get("/export/detail/{dataset}")
+async def export_detail(
+    dataset: str,
+    start_date: str = Query(..., description="Data inicial (YYYY-MM-DD)"),
+    end_date: str = Query(..., description="Data final (YYYY-MM-DD)"),
+    format: str = Query("csv", pattern="^(csv|ndjson|arrow|parquet)$"),
+    gzip: bool = Query(False),
+    db_pool = Depends(get_read_db)
+):
+    try:
+        logger.debug(f"📤 Exportando detalhe {dataset}: {start_date} até {end_date} ({format})")
+        
+        start_dt = datetime.strptime(start_date, "%Y-%m-%d").date()
+        end_dt = datetime.strptime(end_date, "%Y-%m-%d").date()
+        
+        exporter = Exporter(db_pool)
+        stream = await exporter.detail(dataset, start_dt, end_dt, format, gzip)
+        
+        return _export_response(stream, export_filename(dataset, format, gzip, (start_date, end_date)), format, gzip)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ColumnarUnavailableError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro na exportação: {str(e)}")
+
+@router.get("/export/{category}/{query_name}")
+async def export_catalog_query(
+    category: str,
+    query_name: str,
+    start_date: str = Query(None, description="Data inicial (YYYY-MM-DD)"),
+    end_date: str = Query(None, description="Data final (YYYY-MM-DD)"),
+    format: str = Query("csv", pattern="^(csv|ndjson|arrow|parquet)$"),
+    gzip: bool = Query(False),
+    db_pool = Depends(get_read_db)
+):
+    try:
+        logger.debug(f"📤 Exportando {category}/{query_name}: {start_date} até {end_date} ({format})")
+        
+        params = tuple(
+            datetime.strptime(value, "%Y-%m-%d").date()
+            for value in (start_date, end_date) if value is not None
+        )
+        
+        exporter = Exporter(db_pool)
+        stream = await exporter.catalog_query(category, query_name, params, format, gzip)
+        
+        return _export_response(stream, export_filename(query_name, format, gzip, (start_date, end_date)), format, gzip)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ColumnarUnavailableError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro na exportação: {str(e)}")
+
+def _semantic_args(request: SemanticQueryRequest) -> Dict[str, Any]:
+    return {
+        "measures": request.measures,
+        "dimensions": request.dimensions,
+        "start_date": request.start_date,
+        "end_date": request.end_date,
+        "filters": {"store_ids": request.store_ids, "channel_ids": request.channel_ids, "product_ids": request.product_ids},
+        "order_by": [(item.field, item.desc) for item in request.order_by],
+        "limit": request.limit,
+        "source_name": request.source,
+    }
+
+@router.get("/query/model")
+async def get_semantic_model():
+    return {**semantic_layer.model(), "compiled_cache": semantic_layer.stats()}
+
+@router.post("/query")
+async def run_semantic_query(request: SemanticQueryRequest, db_pool = Depends(get_read_db)):
+    args = _semantic_args(request)
+    try:
+        result = await semantic_layer.run(db_pool, **args)
+        return json_response({**result, "success": True}, json_mode("/analytics/query"))
+    except SemanticError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro na consulta: {str(e)}")
+
+@router.post("/query/explain")
+async def explain_semantic_query(
+    request: SemanticQueryRequest,
+    analyze: bool = Query(False, description="EXPLAIN ANALYZE: executa a consulta"),
+    db_pool = Depends(get_read_db)
+):
+    args = _semantic_args(request)
+    try:
+        return await semantic_layer.explain(db_pool, analyze=analyze, **args)
+    except SemanticError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro no explain da consulta: {str(e)}")
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    return result_cache.stats()
+
+@router.delete("/cache")
+async def invalidate_cache(query_id: str = Query(None, description="Ex.: vendas_e_desempenho/total_sales_period")):
+    removed = await result_cache.invalidate(query_id)
+    return {"removed": removed, "success": True}
+
+@router.get("/cache/warm/status")
+async def get_cache_warm_status():
+    return cache_warmer.status()
+
+@router.post("/cache/warm")
+async def warm_cache(
+    wait: bool = Query(False, description="Aquece agora e só responde ao terminar"),
+    db_pool = Depends(get_db)
+):
+    try:
+        if wait:
+            return {"run": await cache_warmer.warm(db_pool, "manual"), "success": True}
+        cache_warmer.trigger("manual")
+        return {"scheduled": True, "success": True}
+    except Exception as e:
+        logger.error(f"❌ Erro no aquecimento do cache: {e}")
+        raise HTTPException(status_code=500, detail=f"Erro no aquecimento do cache: {str(e)}")
+
+@router.get("/rollups/status")
+async def get_rollups_status(db_pool = Depends(get_db)):
+    try:
+        await rollup_manager.load_state(db_pool)
+        return {"enabled": rollup_manager.available, "rollups": rollup_manager.status()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro no status dos rollups: {str(e)}")
+
+@router.post("/rollups/refresh")
+async def refresh_rollups(
+    full: bool = Query(False, description="Reconstrói os rollups do zero"),
+    db_pool = Depends(get_db)
+):
+    try:
+        logger.debug(f"🧮 Refresh de rollups solicitado (full={full})")
+        
+        results = await rollup_manager.refresh(db_pool, full=full)
+        
+        return {
+            "data": results,
+            "success": True
+        }
+    except Exception as e:
+        logger.error(f"❌ Erro no refresh dos rollups: {e}")
+        raise HTTPException(status_code=500, detail=f"Erro no refresh dos rollups: {str(e)}")
+
+@router.get("/indexes")
+async def get_indexes_report(
+    min_seq_tup_read: int = Query(1_000_000, ge=0, description="Tabelas com pelo menos estas linhas lidas por seq scan"),
+    db_pool = Depends(get_db)
+):
+    try:
+        return {**await index_manager.report(db_pool, min_seq_tup_read=min_seq_tup_read), "last_run": index_manager.last_run}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro no relatório de índices: {str(e)}")
+
+@router.post("/indexes/ensure")
+async def ensure_indexes(db_pool = Depends(get_db)):
+    try:
+        return {"data": await index_manager.ensure(db_pool), "success": True}
+    except Exception as e:
+        logger.error(f"❌ Erro criando índices: {e}")
+        raise HTTPException(status_code=500, detail=f"Erro criando índices: {str(e)}")
+
 @router.get("/health")
 async def health_check():
     return {"status": "healthy", "timestamp": datetime.now().isoformat()}
@@ -0,0 +1,86 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from app.core.config import settings
+from app.core.database import database
+from app.core.dependencies import get_db
+from app.core.metrics import query_metrics, render_histogram, render_values
+from app.services.result_cache import result_cache
+from app.services.slow_query_log import slow_query_log
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+@router.get("", response_class=PlainTextResponse)
+async def get_metrics(db_pool = Depends(get_db)):
+    # Formato de exposição texto do Prometheus (version=0.0.4)
+    lines = query_metrics.render_prometheus()
+
+    pool = db_pool.stats()
+    lines += render_values("gla_pool_connections", "gauge", {
+        "size": pool["size"], "idle": pool["idle"], "acquired": pool["acquired"], "waiting": pool["waiting"],
+    }, "state")
+    lines += render_values("gla_pool_acquire_timeouts_total", "counter", {"": pool["timeouts"]})
+    lines += render_histogram("gla_pool_acquire_wait_seconds", "profile", db_pool.metrics.acquire_wait_by_profile)
+
+    if database.read_router is not None:
+        replicas = [replica.stats() for replica in database.replicas]
+        lines += render_values("gla_replica_up", "gauge", {r["name"]: int(r["usable"]) for r in replicas}, "replica")
+        lines += render_values("gla_replica_lag_seconds", "gauge", {r["name"]: r["lag_seconds"] for r in replicas}, "replica")
+        lines += render_values("gla_replica_routed_total", "counter", {r["name"]: r["routed"] for r in replicas}, "replica")
+        lines += render_values("gla_replica_failovers_total", "counter", {r["name"]: r["failovers"] for r in replicas}, "replica")
+        lines += render_values("gla_replica_pool_acquired", "gauge", {
+            r["name"]: r["pool"]["acquired"] for r in replicas if r["pool"]
+        }, "replica")
+        lines += render_values("gla_replica_pool_waiting", "gauge", {
+            r["name"]: r["pool"]["waiting"] for r in replicas if r["pool"]
+        }, "replica")
+        lines += render_values("gla_replica_pool_acquire_timeouts_total", "counter", {
+            r["name"]: r["pool"]["timeouts"] for r in replicas if r["pool"]
+        }, "replica")
+        lines += render_values("gla_read_primary_fallbacks_total", "counter", {"": database.read_router.primary_fallbacks})
+
+    cache = result_cache.stats()
+    lines += render_values("gla_cache_lookups_total", "counter", {
+        "hit": cache["hits"], "miss": cache["misses"], "stale": cache["stale"],
+    }, "result")
+    flights = cache["single_flight"]
+    lines += render_values("gla_singleflight_executions_total", "counter", {"": flights["leaders"]})
+    lines += render_values("gla_singleflight_coalesced_total", "counter", flights["coalesced_per_query"], "query_id")
+    lines += render_values("gla_singleflight_abandoned_total", "counter", {"": flights["abandoned"]})
+    lines += render_values("gla_singleflight_in_flight", "gauge", {"": flights["in_flight"]})
+    lines += render_values("gla_slow_queries_total", "counter", {"": slow_query_log.total})
+
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
+
+@router.get("/queries")
+async def get_query_metrics():
+    return query_metrics.snapshot()
+
+@router.get("/pool")
+async def get_pool_metrics(db_pool = Depends(get_db)):
+    try:
+        return {
+            **db_pool.stats(),
+            "replicas": [replica.stats() for replica in database.replicas],
+            "read_primary_fallbacks": database.read_router.primary_fallbacks if database.read_router else 0,
+            "replica_max_lag_seconds": settings.DB_REPLICA_MAX_LAG_SECONDS,
+            "acquire_timeout_seconds": settings.DB_POOL_ACQUIRE_TIMEOUT_SECONDS,
+            "default_profile": settings.DB_DEFAULT_PROFILE,
+            "profiles": settings.DB_SESSION_PROFILES,
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro nas métricas do pool: {str(e)}")
+
+@router.get("/slow-queries")
+async def get_slow_queries(
+    query_id: str = Query(None, description="Ex.: vendas_e_desempenho/total_sales_period"),
+    limit: int = Query(20, ge=1, le=200),
+    include_plans: bool = Query(True)
+):
+    entries = slow_query_log.recent(query_id, limit)
+    if not include_plans:
+        entries = [{k: v for k, v in entry.items() if k != "plan"} for entry in entries]
+    return {**slow_query_log.stats(), "entries": entries}
+
+@router.delete("/slow-queries")
+async def clear_slow_queries():
+    return {"removed": slow_query_log.clear(), "success": True}
@@ -0,0 +1,44 @@
+import asyncio
+import functools
+import time
+from contextvars import ContextVar
+from typing import Callable, List, Optional
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+from app.core.metrics import query_metrics
+
+# Instante em que o endpoint terminou; o resto do handler é validação + serialização da resposta
+_endpoint_finished: ContextVar[Optional[List[float]]] = ContextVar("_endpoint_finished", default=None)
+
+
+class TimedRoute(APIRoute):
+    def get_route_handler(self) -> Callable:
+        endpoint = self.dependant.call
+        if asyncio.iscoroutinefunction(endpoint):
+            @functools.wraps(endpoint)
+            async def timed_endpoint(*args, **kwargs):
+                try:
+                    return await endpoint(*args, **kwargs)
+                finally:
+                    marks = _endpoint_finished.get()
+                    if marks is not None:
+                        marks.append(time.perf_counter())
+
+            self.dependant.call = timed_endpoint
+
+        handler = super().get_route_handler()
+        route = self.path
+
+        async def timed_handler(request: Request) -> Response:
+            marks: List[float] = []
+            token = _endpoint_finished.set(marks)
+            started = time.perf_counter()
+            try:
+                return await handler(request)
+            finally:
+                _endpoint_finished.reset(token)
+                finished = time.perf_counter()
+                query_metrics.observe_request(route, finished - started, finished - marks[-1] if marks else None)
+
+        return timed_handler
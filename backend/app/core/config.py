@@ -1,5 +1,6 @@
 import os
-from typing import Optional
+from typing import Dict, List, Optional
+from pydantic import Field
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -7,6 +8,97 @@ class Settings(BaseSettings):
     API_V1_STR: str = "/api/v1"
     PROJECT_NAME: str = "GodLevelAnalytics"
     BACKEND_CORS_ORIGINS: list = ["http://localhost:3000", "http://127.0.0.1:3000"]
+    QUERIES_DIR: Optional[str] = None
+    QUERY_CATALOG_HOT_RELOAD: bool = False
+
+    DB_POOL_MIN_SIZE: int = 2
+    DB_POOL_MAX_SIZE: int = 10
+    DB_POOL_ACQUIRE_TIMEOUT_SECONDS: float = 10.0
+    DB_POOL_MAX_QUERIES: int = 50000
+    DB_POOL_MAX_INACTIVE_LIFETIME_SECONDS: float = 300.0
+    DB_COMMAND_TIMEOUT_SECONDS: Optional[float] = None
+    DB_STATEMENT_CACHE_SIZE: int = 256
+    DB_APPLICATION_NAME: str = "god-level-analytics"
+    # Perfis de sessão por classe de query (valores no formato do SET do Postgres);
+    # o perfil padrão vira server_settings das conexões, os demais são aplicados no acquire
+    DB_DEFAULT_PROFILE: str = "interactive"
+    DB_SESSION_PROFILES: Dict[str, Dict[str, str]] = {
+        "interactive": {"statement_timeout": "30s", "work_mem": "16MB", "jit": "off"},
+        "export": {"statement_timeout": "0", "work_mem": "32MB", "jit": "off"},
+        "maintenance": {"statement_timeout": "0", "work_mem": "256MB", "jit": "on"},
+    }
+    # Réplicas de leitura (JSON no env: DATABASE_READ_URLS='["postgresql://...@replica:5432/food_analytics"]').
+    # As rotas de consulta leem delas; escrita, rollups, índices e manutenção ficam no primário.
+    DATABASE_READ_URLS: List[str] = []
+    DB_REPLICA_MAX_LAG_SECONDS: float = 30.0
+    DB_REPLICA_HEALTH_CHECK_SECONDS: float = 5.0
+    DB_REPLICA_HEALTH_TIMEOUT_SECONDS: float = 2.0
+
+    CACHE_ENABLED: bool = True
+    CACHE_MAX_ENTRIES: int = 1024
+    CACHE_DEFAULT_TTL_SECONDS: int = 300
+    CACHE_OPEN_RANGE_TTL_SECONDS: int = 60
+    CACHE_HISTORICAL_TTL_SECONDS: Optional[int] = None
+    CACHE_WATERMARK_REFRESH_SECONDS: float = 5.0
+    CACHE_QUERY_TTLS: Dict[str, int] = {}
+    # Agrupa chamadas idênticas simultâneas numa única query (vale também com o cache desligado)
+    SINGLE_FLIGHT_ENABLED: bool = True
+
+    # Aquecimento do cache para os períodos rápidos do DateRangeFilter ("Nd" = últimos N dias)
+    CACHE_WARM_ENABLED: bool = True
+    CACHE_WARM_PRESETS: List[str] = ["7d", "30d", "90d", "current_month"]
+    CACHE_WARM_CONCURRENCY: int = 2
+    CACHE_WARM_JITTER_SECONDS: float = 10.0
+    CACHE_WARM_CHECK_INTERVAL_SECONDS: float = 60.0
+
+    # Cache HTTP (ETag/304) nas rotas GET de /analytics
+    HTTP_CACHE_ENABLED: bool = True
+    HTTP_CACHE_HISTORICAL_MAX_AGE: int = 86400
+    HTTP_CACHE_OPEN_MAX_AGE: int = 0
+    # Mudar quando o formato das respostas mudar, para invalidar ETags já emitidos
+    HTTP_CACHE_ETAG_SALT: str = "1"
+
+    # Cria em segundo plano (CONCURRENTLY) os índices de database/indexes.sql que faltarem.
+    # Desligado por padrão: o deploy roda `python -m app.services.indexes ensure` uma vez
+    DB_INDEXES_ENSURE_ON_STARTUP: bool = False
+
+    # Consultas compiladas pela camada semântica (/analytics/query), por formato de consulta
+    SEMANTIC_COMPILED_CACHE_SIZE: int = 256
+    SEMANTIC_MAX_LIMIT: int = 10000
+
+    ROLLUPS_ENABLED: bool = True
+    ROLLUP_REFRESH_INTERVAL_SECONDS: int = 300
+    ROLLUP_BATCH_SIZE: int = 100000
+    ROLLUP_MAX_TAIL_SALES: int = 50000
+    # Vendas mais novas que isso ficam na cauda: uma transação que pegou um id menor e ainda não
+    # commitou não pode ficar abaixo do last_sale_id do rollup (nem ele, nem a cauda a leriam)
+    ROLLUP_SAFE_LAG_SECONDS: int = 60
+
+    # Recência dos segmentos de clientes (customer_stats): sem comprar há N dias
+    CUSTOMER_AT_RISK_DAYS: int = 30
+    CUSTOMER_LOST_DAYS: int = 60
+
+    # mode=preview: fração de sales mantida na amostra sales_sample (rollup); o peso de cada linha é 1/taxa
+    PREVIEW_SAMPLE_RATE: float = Field(0.01, gt=0, le=1)
+
+    BATCH_MAX_QUERIES: int = 20
+    BATCH_DEADLINE_MS: int = 10000
+
+    EXPORT_CHUNK_ROWS: int = 5000
+
+    # Caminho de serialização das respostas: python (jsonable_encoder), orjson ou postgres (json_agg)
+    JSON_RESPONSE_DEFAULT: str = "orjson"
+    JSON_RESPONSE_MODES: Dict[str, str] = {
+        "/analytics/top-addons": "postgres",
+        "/analytics/top-products": "postgres",
+        "/analytics/avg-product-prices": "postgres",
+    }
+
+    SLOW_QUERY_THRESHOLD_MS: float = 500.0
+    SLOW_QUERY_LOG_SIZE: int = 50
+    SLOW_QUERY_EXPLAIN_ENABLED: bool = True
+    SLOW_QUERY_EXPLAIN_COOLDOWN_SECONDS: float = 300.0
+    SLOW_QUERY_EXPLAIN_TIMEOUT_SECONDS: float = 60.0
     
     class Config:
         case_sensitive = True
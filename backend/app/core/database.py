@@ -1,18 +1,439 @@
+import asyncio
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
 import asyncpg
 from app.core.config import settings
+from app.core.metrics import Histogram
+
+
+class PoolMetrics:
+    def __init__(self):
+        self.acquire_wait = Histogram()
+        self.acquire_wait_by_profile: Dict[str, Histogram] = {}
+        self.acquisitions = 0
+        self.timeouts = 0
+        self.in_use = 0
+        self.max_in_use = 0
+        self.waiting = 0
+        self.max_waiting = 0
+
+    def started_waiting(self) -> None:
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+
+    def acquired(self, profile: str, wait_seconds: float) -> None:
+        self.waiting -= 1
+        self.acquisitions += 1
+        self.in_use += 1
+        self.max_in_use = max(self.max_in_use, self.in_use)
+        self.acquire_wait.observe(wait_seconds)
+        self.acquire_wait_by_profile.setdefault(profile, Histogram()).observe(wait_seconds)
+
+    def failed(self, timed_out: bool) -> None:
+        self.waiting -= 1
+        if timed_out:
+            self.timeouts += 1
+
+    def released(self) -> None:
+        self.in_use -= 1
+
+
+class _AcquireContext:
+    def __init__(self, pool: "InstrumentedPool", timeout: Optional[float], profile: Optional[str]):
+        self._pool = pool
+        self._timeout = timeout
+        self._profile = profile
+        self._connection = None
+
+    async def __aenter__(self):
+        self._connection = await self._pool._acquire(self._timeout, self._profile)
+        return self._connection
+
+    async def __aexit__(self, *exc):
+        connection, self._connection = self._connection, None
+        await self._pool.release(connection)
+
+    def __await__(self):
+        # `conn = await pool.acquire()`: quem chama devolve com pool.release(conn)
+        return self._pool._acquire(self._timeout, self._profile).__await__()
+
+
+class InstrumentedPool:
+    """Envelope do asyncpg.Pool que mede a espera no acquire e aplica o perfil de sessão."""
+
+    def __init__(self, pool: asyncpg.Pool, profiles: Dict[str, Dict[str, str]], default_profile: str):
+        self._pool = pool
+        self.default_profile = default_profile
+        self.metrics = PoolMetrics()
+        # Observadores de cada SQL executado pelos atalhos do pool: (pool, sql, args, segundos)
+        self.query_observers: List[Callable] = []
+        self._profile_sql: Dict[str, tuple] = {}
+        for name, values in profiles.items():
+            if name == default_profile or not values:
+                continue
+            calls = ", ".join(f"set_config(${i * 2 + 1}, ${i * 2 + 2}, false)" for i in range(len(values)))
+            args = tuple(item for pair in values.items() for item in pair)
+            self._profile_sql[name] = (f"SELECT {calls}", args)
+
+    def acquire(self, *, timeout: Optional[float] = None, profile: Optional[str] = None) -> _AcquireContext:
+        return _AcquireContext(self, timeout, profile)
+
+    async def _acquire(self, timeout: Optional[float], profile: Optional[str]):
+        profile = profile or self.default_profile
+        if profile != self.default_profile and profile not in self._profile_sql:
+            raise ValueError(f"Perfil de sessão desconhecido: {profile}")
+
+        self.metrics.started_waiting()
+        started = time.perf_counter()
+        try:
+            connection = await self._pool.acquire(timeout=timeout or settings.DB_POOL_ACQUIRE_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            self.metrics.failed(timed_out=True)
+            raise
+        except BaseException:
+            self.metrics.failed(timed_out=False)
+            raise
+        self.metrics.acquired(profile, time.perf_counter() - started)
+
+        if profile in self._profile_sql:
+            # O RESET ALL que o asyncpg roda ao devolver a conexão volta ao perfil padrão
+            sql, args = self._profile_sql[profile]
+            try:
+                await connection.execute(sql, *args)
+            except BaseException:
+                await self.release(connection)
+                raise
+        return connection
+
+    async def run(self, fn: Callable[[Any], Awaitable[Any]], *, timeout: Optional[float] = None,
+                  profile: Optional[str] = None) -> Any:
+        """Roda fn(connection) com uma conexão do pool (mesma assinatura do ReadRouter.run)."""
+        async with self.acquire(timeout=timeout, profile=profile) as connection:
+            return await fn(connection)
+
+    async def stream(self, produce: Callable[["InstrumentedPool"], AsyncIterator]) -> AsyncIterator:
+        async for item in produce(self):
+            yield item
+
+    async def release(self, connection) -> None:
+        try:
+            await self._pool.release(connection)
+        finally:
+            self.metrics.released()
+
+    async def _run(self, method: str, query: str, args: tuple, profile: Optional[str], **kwargs):
+        async with self.acquire(profile=profile) as connection:
+            started = time.perf_counter()
+            result = await getattr(connection, method)(query, *args, **kwargs)
+            elapsed = time.perf_counter() - started
+        for observer in self.query_observers:
+            observer(self, query, args, elapsed)
+        return result
+
+    async def fetch(self, query: str, *args, timeout: Optional[float] = None, profile: Optional[str] = None):
+        return await self._run("fetch", query, args, profile, timeout=timeout)
+
+    async def fetchrow(self, query: str, *args, timeout: Optional[float] = None, profile: Optional[str] = None):
+        return await self._run("fetchrow", query, args, profile, timeout=timeout)
+
+    async def fetchval(self, query: str, *args, column: int = 0, timeout: Optional[float] = None, profile: Optional[str] = None):
+        return await self._run("fetchval", query, args, profile, column=column, timeout=timeout)
+
+    async def execute(self, query: str, *args, timeout: Optional[float] = None, profile: Optional[str] = None):
+        return await self._run("execute", query, args, profile, timeout=timeout)
+
+    async def close(self) -> None:
+        await self._pool.close()
+
+    def __getattr__(self, name):
+        return getattr(self._pool, name)
+
+    def stats(self) -> Dict:
+        size = self._pool.get_size()
+        idle = self._pool.get_idle_size()
+        metrics = self.metrics
+        return {
+            "size": size,
+            "idle": idle,
+            "acquired": metrics.in_use,
+            "min_size": self._pool.get_min_size(),
+            "max_size": self._pool.get_max_size(),
+            "waiting": metrics.waiting,
+            "max_waiting": metrics.max_waiting,
+            "max_acquired": metrics.max_in_use,
+            "acquisitions": metrics.acquisitions,
+            "timeouts": metrics.timeouts,
+            "acquire_wait_seconds": metrics.acquire_wait.snapshot(),
+            "acquire_wait_seconds_by_profile": {
+                name: histogram.snapshot() for name, histogram in metrics.acquire_wait_by_profile.items()
+            },
+        }
+
+
+# Erros que indicam réplica fora do ar ou em conflito com o replay: a query é refeita no primário
+_REPLICA_FAILOVER_ERRORS = (
+    OSError,
+    asyncpg.exceptions.PostgresConnectionError,
+    asyncpg.exceptions.CannotConnectNowError,
+    # "canceling statement due to conflict with recovery"
+    asyncpg.exceptions.SerializationError,
+)
+
+_REPLICA_STATUS_SQL = """
+    SELECT pg_is_in_recovery() AS in_recovery,
+           CASE
+               WHEN NOT pg_is_in_recovery() THEN 0
+               -- Sem WAL pendente a réplica está em dia, mesmo sem escrita recente no primário
+               WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+               ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+           END::float8 AS lag_seconds,
+           -- Última venda já aplicada: o replay é monotônico, então tudo até ela é visível daqui em diante
+           (SELECT id FROM sales ORDER BY id DESC LIMIT 1) AS sale_id
+"""
+
+
+async def _create_pool(dsn: str) -> InstrumentedPool:
+    default = settings.DB_SESSION_PROFILES.get(settings.DB_DEFAULT_PROFILE, {})
+    pool = await asyncpg.create_pool(
+        dsn,
+        min_size=settings.DB_POOL_MIN_SIZE,
+        max_size=settings.DB_POOL_MAX_SIZE,
+        max_queries=settings.DB_POOL_MAX_QUERIES,
+        max_inactive_connection_lifetime=settings.DB_POOL_MAX_INACTIVE_LIFETIME_SECONDS,
+        command_timeout=settings.DB_COMMAND_TIMEOUT_SECONDS,
+        statement_cache_size=settings.DB_STATEMENT_CACHE_SIZE,
+        server_settings={"application_name": settings.DB_APPLICATION_NAME, **default},
+    )
+    return InstrumentedPool(pool, settings.DB_SESSION_PROFILES, settings.DB_DEFAULT_PROFILE)
+
+
+class ReadReplica:
+    def __init__(self, name: str, dsn: str):
+        self.name = name
+        self.dsn = dsn
+        self.pool: Optional[InstrumentedPool] = None
+        self.healthy = False
+        self.in_recovery: Optional[bool] = None
+        self.lag_seconds: Optional[float] = None
+        self.sale_id: Optional[int] = None
+        self.last_error: Optional[str] = None
+        self.checked_at: Optional[float] = None
+        self.routed = 0
+        self.failovers = 0
+
+    def usable(self) -> bool:
+        return (
+            self.pool is not None and self.healthy
+            and self.lag_seconds is not None and self.lag_seconds <= settings.DB_REPLICA_MAX_LAG_SECONDS
+        )
+
+    def mark_down(self, error: str) -> None:
+        self.healthy = False
+        self.last_error = error
+
+    async def check(self, observers: List[Callable]) -> None:
+        try:
+            if self.pool is None:
+                # Sem prazo, uma réplica inacessível segura a subida (e cada ciclo) pelo connect timeout do asyncpg
+                self.pool = await asyncio.wait_for(_create_pool(self.dsn), settings.DB_REPLICA_HEALTH_TIMEOUT_SECONDS)
+                # Mesma lista do primário: o slow query log também vê o que roda nas réplicas
+                self.pool.query_observers = observers
+            row = await asyncio.wait_for(self.pool.fetchrow(_REPLICA_STATUS_SQL), settings.DB_REPLICA_HEALTH_TIMEOUT_SECONDS)
+            self.in_recovery = row["in_recovery"]
+            self.lag_seconds = row["lag_seconds"]
+            self.sale_id = row["sale_id"] or 0
+            self.healthy = True
+            self.last_error = None
+        except Exception as e:
+            self.mark_down(str(e) or type(e).__name__)
+        self.checked_at = time.time()
+
+    def stats(self) -> Dict:
+        return {
+            "name": self.name,
+            "connected": self.pool is not None,
+            "healthy": self.healthy,
+            "usable": self.usable(),
+            "in_recovery": self.in_recovery,
+            "lag_seconds": round(self.lag_seconds, 3) if self.lag_seconds is not None else None,
+            "sale_id": self.sale_id,
+            "last_error": self.last_error,
+            "checked_at": self.checked_at,
+            "routed": self.routed,
+            "failovers": self.failovers,
+            "pool": self.pool.stats() if self.pool is not None else None,
+        }
+
+
+class ReadRouter:
+    """Mesma interface do InstrumentedPool para queries só de leitura: manda para a réplica saudável
+    menos ocupada e cai no primário quando nenhuma está dentro de DB_REPLICA_MAX_LAG_SECONDS."""
+
+    def __init__(self, primary: InstrumentedPool, replicas: List[ReadReplica]):
+        self.primary = primary
+        self.replicas = replicas
+        self.primary_fallbacks = 0
+        self._next = 0
+
+    def _choose(self) -> Optional[ReadReplica]:
+        usable = [replica for replica in self.replicas if replica.usable()]
+        if not usable:
+            self.primary_fallbacks += 1
+            return None
+        # Rodízio entre as réplicas, preferindo a com menos conexões em uso/espera
+        self._next = (self._next + 1) % len(usable)
+        rotated = usable[self._next:] + usable[:self._next]
+        replica = min(rotated, key=lambda r: r.pool.metrics.in_use + r.pool.metrics.waiting)
+        replica.routed += 1
+        return replica
+
+    def visible_sale_id(self) -> Optional[int]:
+        """Maior id de venda que qualquer leitura roteada enxerga (a réplica utilizável mais atrasada).
+
+        None quando nenhuma réplica está em uso e as leituras vão para o primário.
+        """
+        usable = [replica.sale_id for replica in self.replicas if replica.usable() and replica.sale_id is not None]
+        return min(usable) if usable else None
+
+    def acquire(self, *, timeout: Optional[float] = None, profile: Optional[str] = None) -> _AcquireContext:
+        # Sem failover: um erro dentro do bloco já não tem como ser refeito aqui. Prefira run()/stream()
+        replica = self._choose()
+        pool = replica.pool if replica is not None else self.primary
+        return pool.acquire(timeout=timeout, profile=profile)
+
+    @staticmethod
+    def _failed(replica: ReadReplica, error: BaseException) -> None:
+        replica.failovers += 1
+        replica.mark_down(str(error) or type(error).__name__)
+
+    async def _run(self, method: str, query: str, args: tuple, **kwargs):
+        replica = self._choose()
+        if replica is not None:
+            try:
+                return await getattr(replica.pool, method)(query, *args, **kwargs)
+            except _REPLICA_FAILOVER_ERRORS as e:
+                self._failed(replica, e)
+        return await getattr(self.primary, method)(query, *args, **kwargs)
+
+    async def run(self, fn: Callable[[Any], Awaitable[Any]], *, timeout: Optional[float] = None,
+                  profile: Optional[str] = None) -> Any:
+        """Roda fn(connection) numa réplica; se ela cair (ou o replay cancelar a query), refaz no primário.
+
+        fn pode rodar duas vezes, então não deve ter efeito colateral fora da conexão.
+        """
+        replica = self._choose()
+        if replica is not None:
+            try:
+                return await replica.pool.run(fn, timeout=timeout, profile=profile)
+            except _REPLICA_FAILOVER_ERRORS as e:
+                self._failed(replica, e)
+        return await self.primary.run(fn, timeout=timeout, profile=profile)
+
+    async def stream(self, produce: Callable[[InstrumentedPool], AsyncIterator]) -> AsyncIterator:
+        """Itera produce(pool) numa réplica. Falha antes do primeiro item: refaz tudo no primário;
+        depois dele o erro sobe, porque parte do resultado já foi entregue."""
+        replica = self._choose()
+        if replica is not None:
+            items = produce(replica.pool)
+            try:
+                first = await items.__anext__()
+            except StopAsyncIteration:
+                return
+            except _REPLICA_FAILOVER_ERRORS as e:
+                await items.aclose()
+                self._failed(replica, e)
+            else:
+                yield first
+                async for item in items:
+                    yield item
+                return
+        async for item in produce(self.primary):
+            yield item
+
+    async def fetch(self, query: str, *args, **kwargs):
+        return await self._run("fetch", query, args, **kwargs)
+
+    async def fetchrow(self, query: str, *args, **kwargs):
+        return await self._run("fetchrow", query, args, **kwargs)
+
+    async def fetchval(self, query: str, *args, **kwargs):
+        return await self._run("fetchval", query, args, **kwargs)
+
+    def __getattr__(self, name):
+        # metrics, query_observers etc.: os do primário
+        return getattr(self.primary, name)
+
+    def stats(self) -> Dict:
+        primary = self.primary.stats()
+        replicas = [replica.stats() for replica in self.replicas]
+        return {
+            **primary,
+            # Quem usa stats() para medir pressão (cache warmer) enxerga a espera em todos os pools
+            "waiting": primary["waiting"] + sum(r["pool"]["waiting"] for r in replicas if r["pool"]),
+            "primary_fallbacks": self.primary_fallbacks,
+            "replicas": replicas,
+        }
+
 
 class Database:
     def __init__(self):
-        self.pool = None
+        self.pool: Optional[InstrumentedPool] = None
+        self.replicas: List[ReadReplica] = []
+        self.read_router: Optional[ReadRouter] = None
+        self._health_task: Optional[asyncio.Task] = None
+        self._connect_lock = asyncio.Lock()
 
     async def connect(self):
-        if not self.pool:
-            self.pool = await asyncpg.create_pool(settings.DATABASE_URL)
-            print("✅ Conectado ao banco de dados PostgreSQL")
+        if self.pool:
+            return
+        async with self._connect_lock:
+            if self.pool:
+                return
+            self.pool = await _create_pool(settings.DATABASE_URL)
+            print(f"✅ Conectado ao banco de dados PostgreSQL (pool {settings.DB_POOL_MIN_SIZE}-{settings.DB_POOL_MAX_SIZE})")
+
+            if settings.DATABASE_READ_URLS:
+                self.replicas = [
+                    ReadReplica(f"replica{i}", dsn) for i, dsn in enumerate(settings.DATABASE_READ_URLS, start=1)
+                ]
+                self.read_router = ReadRouter(self.pool, self.replicas)
+                # Réplica fora do ar não impede a subida: o health check tenta de novo a cada ciclo
+                await self.check_replicas()
+                for replica in self.replicas:
+                    state = f"lag {replica.lag_seconds:.1f}s" if replica.healthy and replica.lag_seconds is not None else replica.last_error
+                    print(f"{'✅' if replica.usable() else '⚠️'} Réplica de leitura {replica.name}: {state}")
+                self._health_task = asyncio.create_task(self._check_periodically())
+
+    async def check_replicas(self) -> None:
+        await asyncio.gather(*(replica.check(self.pool.query_observers) for replica in self.replicas))
+
+    async def _check_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(settings.DB_REPLICA_HEALTH_CHECK_SECONDS)
+            await self.check_replicas()
+
+    @property
+    def read_pool(self):
+        """Pool para queries só de leitura: roteador de réplicas, ou o próprio primário sem réplicas."""
+        return self.read_router or self.pool
 
     async def disconnect(self):
+        if self._health_task is not None:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+        for replica in self.replicas:
+            if replica.pool is not None:
+                await replica.pool.close()
+        self.replicas = []
+        self.read_router = None
         if self.pool:
             await self.pool.close()
+            self.pool = None
             print("❌ Desconectado do banco de dados")
 
     async def fetch_all(self, query: str, *args):
@@ -30,8 +451,50 @@ class Database:
 database = Database()
 
 async def get_db_pool():
-    await database.connect()
+    if database.pool is None:
+        await database.connect()
     return database.pool
 
 async def get_db():
-    return await get_db_pool()
\ No newline at end of file
+    return await get_db_pool()
+
+async def get_read_db_pool():
+    if database.pool is None:
+        await database.connect()
+    return database.read_pool
+
+
+async def _main(argv: Optional[List[str]] = None) -> None:
+    import argparse
+    import json
+    import sys
+
+    parser = argparse.ArgumentParser(description="Confere o roteamento de leituras entre primário e réplicas (DATABASE_READ_URLS)")
+    parser.add_argument("command", choices=["check"])
+    parser.add_argument("--reads", type=int, default=20, help="Leituras roteadas (metade por fetchval, metade por run)")
+    parser.add_argument("--expect", choices=["any", "replica", "primary"], default="any",
+                        help="replica: falha se nenhuma leitura foi para réplica; primary: falha se alguma foi")
+    args = parser.parse_args(argv)
+
+    served = {"replica": 0, "primary": 0}
+    await database.connect()
+    try:
+        pool = database.read_pool
+        for i in range(args.reads):
+            # Com a réplica parada (docker-compose stop postgres-replica) tudo deve cair no primário sem erro
+            if i % 2:
+                in_recovery = await pool.run(lambda connection: connection.fetchval("SELECT pg_is_in_recovery()"))
+            else:
+                in_recovery = await pool.fetchval("SELECT pg_is_in_recovery()")
+            served["replica" if in_recovery else "primary"] += 1
+        print(json.dumps({"served": served, "pool": pool.stats()}, indent=2, ensure_ascii=False, default=str))
+    finally:
+        await database.disconnect()
+
+    if (args.expect == "replica" and not served["replica"]) or (args.expect == "primary" and served["replica"]):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    # python -m app.core.database check [--expect replica|primary]
+    asyncio.run(_main())
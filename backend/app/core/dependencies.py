@@ -1,6 +1,6 @@
 from typing import AsyncGenerator
 import asyncpg
-from app.core.database import get_db_pool
+from app.core.database import get_db_pool, get_read_db_pool
 from app.services.query_builder import QueryBuilder
 
 async def get_db() -> AsyncGenerator[asyncpg.Pool, None]:
@@ -10,5 +10,13 @@ async def get_db() -> AsyncGenerator[asyncpg.Pool, None]:
     finally:
         pass
 
+async def get_read_db() -> AsyncGenerator[asyncpg.Pool, None]:
+    # Só para rotas que apenas leem: pode cair numa réplica com até DB_REPLICA_MAX_LAG_SECONDS de atraso
+    pool = await get_read_db_pool()
+    try:
+        yield pool
+    finally:
+        pass
+
 async def get_query_builder(db_pool: asyncpg.Pool = None) -> QueryBuilder:
     return QueryBuilder(db_pool)
\ No newline at end of file
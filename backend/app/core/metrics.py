@@ -0,0 +1,172 @@
+import bisect
+import functools
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Union
+
+# Limites em segundos, no estilo dos buckets padrão do Prometheus
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts: List[int] = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max: Optional[float] = None
+
+    def observe(self, value: float) -> None:
+        self._counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = value if self.max is None else max(self.max, value)
+
+    def cumulative(self) -> List[int]:
+        total, result = 0, []
+        for count in self._counts:
+            total += count
+            result.append(total)
+        return result
+
+    def quantile(self, q: float) -> Optional[float]:
+        # Estimativa pelo limite superior do bucket (mesma aproximação do histogram_quantile)
+        if not self.count:
+            return None
+        rank = q * self.count
+        for bound, cumulative in zip(self.buckets, self.cumulative()):
+            if cumulative >= rank:
+                return bound
+        return self.max
+
+    def snapshot(self) -> Dict:
+        cumulative = self.cumulative()
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "max": round(self.max, 6) if self.max is not None else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": {
+                **{str(bound): cumulative[i] for i, bound in enumerate(self.buckets)},
+                "+Inf": cumulative[-1],
+            },
+        }
+
+
+ROW_COUNT_BUCKETS = (1, 10, 100, 1000, 10000, 100000, 1000000)
+
+# Id da query em execução (ex.: "analytics/dashboard"): permite que o pool
+# atribua o SQL cru que ele executa à query lógica que o originou
+current_query_id: ContextVar[Optional[str]] = ContextVar("current_query_id", default=None)
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    return ",".join(f'{key}="{_escape_label(str(value))}"' for key, value in labels.items())
+
+
+def render_histogram(name: str, label_name: str, histograms: Dict[str, Histogram]) -> List[str]:
+    lines = [f"# TYPE {name} histogram"]
+    for label, histogram in sorted(histograms.items()):
+        cumulative = histogram.cumulative()
+        for bound, count in zip(histogram.buckets, cumulative):
+            lines.append(f"{name}_bucket{{{_labels({label_name: label, 'le': bound})}}} {count}")
+        lines.append(f"{name}_bucket{{{_labels({label_name: label, 'le': '+Inf'})}}} {cumulative[-1]}")
+        lines.append(f"{name}_sum{{{_labels({label_name: label})}}} {histogram.sum}")
+        lines.append(f"{name}_count{{{_labels({label_name: label})}}} {histogram.count}")
+    return lines
+
+
+def render_values(name: str, kind: str, values: Dict[str, Union[int, float]], label_name: Optional[str] = None) -> List[str]:
+    lines = [f"# TYPE {name} {kind}"]
+    for label, value in sorted(values.items()):
+        if value is None:
+            continue
+        lines.append(f"{name}{{{_labels({label_name: label})}}} {value}" if label_name and label else f"{name} {value}")
+    return lines
+
+
+class QueryMetrics:
+    def __init__(self):
+        self.query_duration: Dict[str, Histogram] = {}
+        self.query_rows: Dict[str, Histogram] = {}
+        self.query_errors: Dict[str, int] = {}
+        self.request_duration: Dict[str, Histogram] = {}
+        self.serialization_duration: Dict[str, Histogram] = {}
+
+    def observe_query(self, query_id: str, seconds: float, rows: Optional[int] = None, error: bool = False) -> None:
+        self.query_duration.setdefault(query_id, Histogram()).observe(seconds)
+        if rows is not None:
+            self.query_rows.setdefault(query_id, Histogram(ROW_COUNT_BUCKETS)).observe(rows)
+        if error:
+            self.query_errors[query_id] = self.query_errors.get(query_id, 0) + 1
+
+    def observe_request(self, route: str, seconds: float, serialization_seconds: Optional[float] = None) -> None:
+        self.request_duration.setdefault(route, Histogram()).observe(seconds)
+        if serialization_seconds is not None:
+            self.serialization_duration.setdefault(route, Histogram()).observe(serialization_seconds)
+
+    def render_prometheus(self) -> List[str]:
+        return [
+            *render_histogram("gla_query_duration_seconds", "query_id", self.query_duration),
+            *render_histogram("gla_query_rows", "query_id", self.query_rows),
+            *render_values("gla_query_errors_total", "counter", self.query_errors, "query_id"),
+            *render_histogram("gla_http_request_duration_seconds", "route", self.request_duration),
+            *render_histogram("gla_http_serialization_duration_seconds", "route", self.serialization_duration),
+        ]
+
+    def snapshot(self) -> Dict:
+        return {
+            "queries": {
+                query_id: {
+                    "duration_seconds": histogram.snapshot(),
+                    "rows": self.query_rows[query_id].snapshot() if query_id in self.query_rows else None,
+                    "errors": self.query_errors.get(query_id, 0),
+                }
+                for query_id, histogram in sorted(self.query_duration.items())
+            },
+            "routes": {
+                route: {
+                    "duration_seconds": histogram.snapshot(),
+                    "serialization_seconds": self.serialization_duration[route].snapshot()
+                    if route in self.serialization_duration else None,
+                }
+                for route, histogram in sorted(self.request_duration.items())
+            },
+        }
+
+
+query_metrics = QueryMetrics()
+
+
+def _row_count(result) -> Optional[int]:
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, dict):
+        return 1
+    return None
+
+
+def timed_query(query_id: str):
+    """Mede a execução (no cache, só os misses) e marca o SQL que o pool roda com o id da query."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            token = current_query_id.set(query_id)
+            started = time.perf_counter()
+            try:
+                result = await func(*args, **kwargs)
+            except Exception:
+                query_metrics.observe_query(query_id, time.perf_counter() - started, error=True)
+                raise
+            finally:
+                current_query_id.reset(token)
+            query_metrics.observe_query(query_id, time.perf_counter() - started, _row_count(result))
+            return result
+        return wrapper
+    return decorator
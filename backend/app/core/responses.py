@@ -0,0 +1,141 @@
+import json
+from contextvars import ContextVar
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Union
+
+from fastapi import Query
+from fastapi.responses import JSONResponse, Response
+from app.core.config import settings
+
+try:
+    import orjson
+except ImportError:  # sem orjson, o caminho rápido usa o json da stdlib (ainda sem jsonable_encoder)
+    orjson = None
+
+JSON_MODES = ("python", "orjson", "postgres")
+
+# Pares id -> nome conhecidos: o nome sai das colunas e vai uma vez só para o dicionário da dimensão
+DIMENSIONS = (
+    ("stores", "store_id", "store_name"),
+    ("channels", "channel_id", "channel_name"),
+    ("categories", "category_id", "category_name"),
+    ("products", "product_id", "product_name"),
+)
+
+# Formato pedido pela requisição atual (definido pela dependência do router)
+response_shape: ContextVar[str] = ContextVar("response_shape", default="rows")
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    raise TypeError(f"Tipo não serializável em JSON: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        # datetime/date/UUID são nativos no orjson; só Decimal passa pelo default
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """Serializa direto (orjson + Decimal), sem o passo do jsonable_encoder do FastAPI."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class RawJSONResponse(Response):
+    """Corpo já é JSON pronto (ex.: gerado pelo Postgres com json_agg)."""
+
+    media_type = "application/json"
+
+    def render(self, content: Union[str, bytes]) -> bytes:
+        return content.encode("utf-8") if isinstance(content, str) else content
+
+
+async def shape_param(
+    shape: str = Query("rows", pattern="^(rows|columnar)$", description="rows (padrão) ou columnar (colunas + dicionários)")
+) -> str:
+    response_shape.set(shape)
+    return shape
+
+
+def columnar(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Lista de objetos -> colunas + dicionários.
+
+    - pares conhecidos (store_id/store_name, ...) viram `dimensions`: {id: nome}, e a coluna de nome sai;
+    - demais colunas de texto com valores repetidos viram códigos para `dictionaries[coluna]`.
+    """
+    columns: List[str] = list(rows[0].keys()) if rows else []
+    dimensions: Dict[str, Dict[Any, Any]] = {}
+    dimension_columns: Dict[str, Dict[str, str]] = {}
+    for dimension, key, name in DIMENSIONS:
+        if key in columns and name in columns:
+            dimensions[dimension] = {row[key]: row[name] for row in rows if row[key] is not None}
+            dimension_columns[name] = {"dimension": dimension, "key": key}
+            columns.remove(name)
+
+    data: Dict[str, List[Any]] = {}
+    dictionaries: Dict[str, List[Any]] = {}
+    for column in columns:
+        values = [row.get(column) for row in rows]
+        if any(isinstance(v, str) for v in values):
+            codes: Dict[Any, int] = {}
+            encoded = [None if v is None else codes.setdefault(v, len(codes)) for v in values]
+            if len(codes) < len(values):
+                dictionaries[column] = list(codes)
+                values = encoded
+        data[column] = values
+
+    return {
+        "shape": "columnar",
+        "rows": len(rows),
+        "columns": columns,
+        "data": data,
+        "dimensions": dimensions,
+        "dimension_columns": dimension_columns,
+        "dictionaries": dictionaries,
+    }
+
+
+def _is_rows(value: Any) -> bool:
+    return isinstance(value, list) and all(isinstance(row, dict) for row in value)
+
+
+def reshape(content: Any, shape: Optional[str] = None) -> Any:
+    shape = shape or response_shape.get()
+    if shape != "columnar" or not isinstance(content, dict):
+        return content
+    if _is_rows(content.get("data")):
+        return {**content, **columnar(content["data"])}
+    if isinstance(content.get("results"), dict):
+        # /batch: cada resultado bem-sucedido tem seu próprio "data"
+        return {**content, "results": {key: reshape(result, shape) for key, result in content["results"].items()}}
+    return content
+
+
+def json_mode(route: str) -> str:
+    mode = settings.JSON_RESPONSE_MODES.get(route, settings.JSON_RESPONSE_DEFAULT)
+    if mode not in JSON_MODES:
+        return "python"
+    if mode == "postgres" and response_shape.get() == "columnar":
+        # JSON pronto do Postgres não dá para reorganizar: o formato colunar passa pelo orjson
+        return "orjson"
+    return mode
+
+
+def json_response(content: Any, mode: str):
+    content = reshape(content)
+    # "python" devolve o objeto e deixa o FastAPI fazer o caminho padrão (jsonable_encoder)
+    if mode == "python":
+        return content
+    return FastJSONResponse(content)
+
+
+def wrap_data(data_json: str) -> str:
+    return '{"data":' + data_json + ',"success":true}'
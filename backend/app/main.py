@@ -2,7 +2,13 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
 from app.core.database import database
-from app.api.routes import analytics
+from app.api.routes import analytics, metrics
+from app.api.http_cache import ConditionalCacheMiddleware
+from app.services.cache_warmer import cache_warmer
+from app.services.indexes import index_manager
+from app.services.query_catalog import load_query_catalog
+from app.services.rollups import rollup_manager
+from app.services.slow_query_log import slow_query_log
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -10,6 +16,9 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Adicionado antes do CORS para ficar por dentro dele: os 304 também recebem os cabeçalhos de CORS
+app.add_middleware(ConditionalCacheMiddleware, prefix=settings.API_V1_STR)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -25,14 +34,27 @@ app.add_middleware(
 
 @app.on_event("startup")
 async def startup():
+    catalog = await load_query_catalog()
+    print(f"📚 Catálogo SQL: {len(catalog.keys())} queries carregadas, {len(catalog.errors)} inválidas")
     await database.connect()
+    database.pool.query_observers.append(slow_query_log.observe)
+    index_manager.start(database.pool)
+    if settings.ROLLUPS_ENABLED:
+        await rollup_manager.ensure_schema(database.pool)
+        rollup_manager.start(database.pool)
+    rollup_manager.refresh_listeners.append(cache_warmer.trigger)
+    cache_warmer.start(database.pool)
     print("🚀 Backend iniciado e conectado ao banco!")
 
 @app.on_event("shutdown")
 async def shutdown():
+    await cache_warmer.stop()
+    await index_manager.stop()
+    await rollup_manager.stop()
     await database.disconnect()
 
 app.include_router(analytics.router, prefix=settings.API_V1_STR)
+app.include_router(metrics.router)
 
 @app.get("/")
 async def root():
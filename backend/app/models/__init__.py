@@ -1,8 +1,10 @@
-from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
+from pydantic import BaseModel, Field
+from typing import Optional, List, Dict, Any, Union
 from datetime import date, datetime
 from decimal import Decimal
 
+from app.core.config import settings
+
 class AnalyticsResponse(BaseModel):
     data: List[Dict[str, Any]]
     insights: Optional[List[Dict[str, Any]]] = []
@@ -12,6 +14,36 @@ class DateRangeRequest(BaseModel):
     start_date: date
     end_date: date
 
+class BatchQueryItem(BaseModel):
+    id: Optional[str] = None
+    category: str
+    query: str
+    extra_params: List[Union[int, float, None]] = []
+
+class BatchRequest(BaseModel):
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    queries: List[BatchQueryItem] = Field(..., min_length=1)
+    deadline_ms: Optional[int] = Field(None, ge=100)
+
+class SemanticOrderBy(BaseModel):
+    field: str
+    desc: bool = True
+
+class SemanticQueryRequest(BaseModel):
+    measures: List[str] = Field(..., min_length=1)
+    dimensions: List[str] = []
+    start_date: date
+    end_date: date
+    store_ids: Optional[List[int]] = None
+    channel_ids: Optional[List[int]] = None
+    product_ids: Optional[List[int]] = None
+    order_by: List[SemanticOrderBy] = []
+    # Limite validado no modelo: nem chega a compilar/executar uma consulta sem teto de linhas
+    limit: int = Field(1000, ge=1, le=settings.SEMANTIC_MAX_LIMIT)
+    # Força a fonte (ex.: "sales" para comparar com o rollup); por padrão a mais barata que responde
+    source: Optional[str] = None
+
 class SalesSummaryResponse(BaseModel):
     total_orders: int
     total_revenue: float
@@ -1,44 +1,224 @@
+import asyncio
 import asyncpg
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import logging
+from app.core.metrics import timed_query
+from app.services.comparison import with_deltas
+from app.services.hll import unique_customers, unique_customers_by_store, with_bounds
+from app.services.result_cache import ResultCache, cached_result, result_cache
+from app.services.rollups import RollupManager, rollup_manager
 
 logger = logging.getLogger(__name__)
 
+# Totais por loja a partir do rollup sales_daily + cauda de vendas ainda não consolidadas
+STORE_TOTALS_FROM_ROLLUP = """
+    coverage AS (
+        SELECT last_sale_id FROM rollup_state WHERE name = 'sales_daily'
+    ),
+    daily AS (
+        SELECT store_id, sale_status_desc, order_count, total_amount,
+               production_seconds_sum, production_count, delivery_seconds_sum, delivery_count
+        FROM sales_daily
+        WHERE day BETWEEN $1 AND $2
+        UNION ALL
+        SELECT store_id, sale_status_desc, COUNT(*), COALESCE(SUM(total_amount), 0),
+               COALESCE(SUM(production_seconds), 0), COUNT(production_seconds),
+               COALESCE(SUM(delivery_seconds), 0), COUNT(delivery_seconds)
+        FROM sales
+        WHERE id > COALESCE((SELECT last_sale_id FROM coverage), 0)
+        AND created_at >= $1::date AND created_at < $2::date + 1
+        GROUP BY store_id, sale_status_desc
+    ),
+    store_totals AS (
+        SELECT 
+            store_id,
+            SUM(order_count) as total_orders,
+            SUM(order_count) FILTER (WHERE sale_status_desc = 'COMPLETED') as completed_orders,
+            SUM(total_amount) FILTER (WHERE sale_status_desc = 'COMPLETED') as completed_revenue,
+            SUM(order_count) FILTER (WHERE sale_status_desc = 'CANCELLED') as cancelled_orders,
+            SUM(production_seconds_sum) as production_seconds_sum,
+            SUM(production_count) as production_count,
+            SUM(delivery_seconds_sum) as delivery_seconds_sum,
+            SUM(delivery_count) as delivery_count
+        FROM daily
+        GROUP BY store_id
+    )
+"""
+
+# Com approx=true, clientes únicos por loja vêm dos sketches HLL (customer_hll_daily) já estimados
+APPROX_CUSTOMERS_CTE = """
+    customers AS (
+        SELECT * FROM unnest(${first}::int[], ${second}::bigint[]) AS u(store_id, unique_customers)
+    )
+"""
+
+# compare_to em /stores/comparison: métricas de cada período com agregação condicional sobre os dois
+# intervalos ($1-$2 atual, $4-$5 comparação), numa leitura só de sales ou de sales_daily
+def _store_period_columns(period: str, prefix: str) -> str:
+    return f"""
+        COUNT(sa.id) FILTER (WHERE {period}) as {prefix}total_orders,
+        COALESCE(SUM(sa.total_amount) FILTER (WHERE {period} AND sa.sale_status_desc = 'COMPLETED'), 0) as {prefix}total_revenue,
+        AVG(sa.total_amount) FILTER (WHERE {period} AND sa.sale_status_desc = 'COMPLETED') as {prefix}avg_ticket,
+        COUNT(DISTINCT sa.customer_id) FILTER (WHERE {period}) as {prefix}unique_customers,
+        ROUND(
+            COUNT(sa.id) FILTER (WHERE {period} AND sa.sale_status_desc = 'CANCELLED') * 100.0
+            / NULLIF(COUNT(sa.id) FILTER (WHERE {period}), 0),
+        2) as {prefix}cancellation_rate,
+        AVG(sa.production_seconds) FILTER (WHERE {period}) as {prefix}avg_production_time,
+        AVG(sa.delivery_seconds) FILTER (WHERE {period}) as {prefix}avg_delivery_time"""
+
+
+def _store_rollup_period_columns(period: str, prefix: str) -> str:
+    completed = f"{period} AND sale_status_desc = 'COMPLETED'"
+    return f"""
+        COALESCE(SUM(order_count) FILTER (WHERE {period}), 0)::bigint as {prefix}total_orders,
+        COALESCE(SUM(total_amount) FILTER (WHERE {completed}), 0) as {prefix}total_revenue,
+        SUM(total_amount) FILTER (WHERE {completed}) / NULLIF(SUM(order_count) FILTER (WHERE {completed}), 0) as {prefix}avg_ticket,
+        ROUND(
+            COALESCE(SUM(order_count) FILTER (WHERE {period} AND sale_status_desc = 'CANCELLED'), 0) * 100.0
+            / NULLIF(SUM(order_count) FILTER (WHERE {period}), 0),
+        2) as {prefix}cancellation_rate,
+        SUM(production_seconds_sum) FILTER (WHERE {period})::numeric
+            / NULLIF(SUM(production_count) FILTER (WHERE {period}), 0) as {prefix}avg_production_time,
+        SUM(delivery_seconds_sum) FILTER (WHERE {period})::numeric
+            / NULLIF(SUM(delivery_count) FILTER (WHERE {period}), 0) as {prefix}avg_delivery_time"""
+
+
+SALES_IN_COMPARED_PERIODS = """
+    ((sa.created_at >= $1::date AND sa.created_at < $2::date + 1) OR (sa.created_at >= $4::date AND sa.created_at < $5::date + 1))
+"""
+SALE_IN_CURRENT = "sa.created_at >= $1::date AND sa.created_at < $2::date + 1"
+SALE_IN_PREVIOUS = "sa.created_at >= $4::date AND sa.created_at < $5::date + 1"
+
+STORE_PERIOD_TOTALS_FROM_ROLLUP = f"""
+    coverage AS (
+        SELECT last_sale_id FROM rollup_state WHERE name = 'sales_daily'
+    ),
+    daily AS (
+        SELECT day, store_id, sale_status_desc, order_count, total_amount,
+               production_seconds_sum, production_count, delivery_seconds_sum, delivery_count
+        FROM sales_daily
+        WHERE (day BETWEEN $1 AND $2 OR day BETWEEN $4 AND $5)
+        AND store_id = ANY($3)
+        UNION ALL
+        SELECT DATE(sa.created_at), sa.store_id, sa.sale_status_desc, COUNT(*), COALESCE(SUM(sa.total_amount), 0),
+               COALESCE(SUM(sa.production_seconds), 0), COUNT(sa.production_seconds),
+               COALESCE(SUM(sa.delivery_seconds), 0), COUNT(sa.delivery_seconds)
+        FROM sales sa
+        WHERE sa.id > COALESCE((SELECT last_sale_id FROM coverage), 0)
+        AND {SALES_IN_COMPARED_PERIODS}
+        AND sa.store_id = ANY($3)
+        GROUP BY 1, 2, 3
+    ),
+    store_totals AS (
+        SELECT 
+            store_id,{_store_rollup_period_columns("day BETWEEN $1 AND $2", "")},{_store_rollup_period_columns("day BETWEEN $4 AND $5", "previous_")}
+        FROM daily
+        GROUP BY store_id
+    )
+"""
+
+STORE_PERIOD_METRICS = (
+    "total_orders", "total_revenue", "avg_ticket", "unique_customers",
+    "cancellation_rate", "avg_production_time", "avg_delivery_time",
+)
+
 class AnalyticsService:
-    def __init__(self, db_pool: asyncpg.Pool):  
+    def __init__(self, db_pool: asyncpg.Pool, cache: Optional[ResultCache] = None, rollups: Optional[RollupManager] = None):  
         self.db_pool = db_pool
+        self.cache = cache or result_cache
+        self.rollups = rollups or rollup_manager
         
-    async def get_store_comparison(self, start_date: datetime, end_date: datetime, store_ids: List[int]) -> List[Dict[str, Any]]:
+    async def _approx_customers_by_store(self, approx: bool, start_date: datetime, end_date: datetime,
+                                         store_ids: Optional[List[int]] = None) -> Optional[Dict[int, Dict[str, float]]]:
+        # Sem sketches atualizados a contagem continua exata
+        if not approx or not await self.rollups.is_fresh(self.db_pool, "customer_hll_daily"):
+            return None
+        return await unique_customers_by_store(self.db_pool, start_date, end_date, store_ids)
+
+    async def _approx_customers(self, approx: bool, start_date: datetime, end_date: datetime,
+                                completed_only: bool = False) -> Optional[Dict[str, float]]:
+        if not approx or not await self.rollups.is_fresh(self.db_pool, "customer_hll_daily"):
+            return None
+        return await unique_customers(self.db_pool, start_date, end_date, completed_only=completed_only)
+
+    @staticmethod
+    def _with_customer_bounds(estimates: Optional[Dict[int, Dict[str, float]]], store_id: int, data: Dict[str, Any]) -> Dict[str, Any]:
+        if estimates is not None:
+            data["unique_customers_bounds"] = estimates.get(store_id) or with_bounds(0)
+        return data
+
+    @cached_result("analytics/store_comparison")
+    @timed_query("analytics/store_comparison")
+    async def get_store_comparison(self, start_date: datetime, end_date: datetime, store_ids: List[int],
+                                   approx: bool = False) -> List[Dict[str, Any]]:
         try:
-            query = """
+            args = (start_date, end_date, store_ids)
+            estimates = None
+            if await self.rollups.is_fresh(self.db_pool, "sales_daily"):
+                estimates = await self._approx_customers_by_store(approx, start_date, end_date, store_ids)
+                if estimates is not None:
+                    customers = APPROX_CUSTOMERS_CTE.format(first=4, second=5)
+                    args += (list(estimates), [bounds["estimate"] for bounds in estimates.values()])
+                else:
+                    customers = """
+                customers AS (
+                    SELECT store_id, COUNT(DISTINCT customer_id) as unique_customers
+                    FROM sales
+                    WHERE created_at >= $1::date AND created_at < $2::date + 1
+                    AND store_id = ANY($3)
+                    GROUP BY store_id
+                )
+                """
+                query = "WITH " + STORE_TOTALS_FROM_ROLLUP + "," + customers + """
                 SELECT 
                     s.id as store_id,
                     s.name as store_name,
                     s.city,
                     s.state,
-                    COUNT(sa.id) as total_orders,
-                    SUM(CASE WHEN sa.sale_status_desc = 'COMPLETED' THEN sa.total_amount ELSE 0 END) as total_revenue,
-                    AVG(CASE WHEN sa.sale_status_desc = 'COMPLETED' THEN sa.total_amount ELSE NULL END) as avg_ticket,
-                    COUNT(DISTINCT sa.customer_id) as unique_customers,
-                    ROUND(
-                        COUNT(CASE WHEN sa.sale_status_desc = 'CANCELLED' THEN 1 END) * 100.0 / NULLIF(COUNT(sa.id), 0),
-                    2) as cancellation_rate,
-                    AVG(sa.production_seconds) as avg_production_time,
-                    AVG(sa.delivery_seconds) as avg_delivery_time
+                    COALESCE(t.total_orders, 0)::bigint as total_orders,
+                    COALESCE(t.completed_revenue, 0) as total_revenue,
+                    t.completed_revenue / NULLIF(t.completed_orders, 0) as avg_ticket,
+                    COALESCE(cu.unique_customers, 0) as unique_customers,
+                    ROUND(COALESCE(t.cancelled_orders, 0) * 100.0 / NULLIF(t.total_orders, 0), 2) as cancellation_rate,
+                    t.production_seconds_sum::numeric / NULLIF(t.production_count, 0) as avg_production_time,
+                    t.delivery_seconds_sum::numeric / NULLIF(t.delivery_count, 0) as avg_delivery_time
                 FROM stores s
-                LEFT JOIN sales sa ON s.id = sa.store_id 
-                    AND sa.created_at BETWEEN $1 AND $2
+                LEFT JOIN store_totals t ON t.store_id = s.id
+                LEFT JOIN customers cu ON cu.store_id = s.id
                 WHERE s.id = ANY($3)
-                GROUP BY s.id, s.name, s.city, s.state
                 ORDER BY total_revenue DESC
             """
+            else:
+                query = """
+                    SELECT 
+                        s.id as store_id,
+                        s.name as store_name,
+                        s.city,
+                        s.state,
+                        COUNT(sa.id) as total_orders,
+                        SUM(CASE WHEN sa.sale_status_desc = 'COMPLETED' THEN sa.total_amount ELSE 0 END) as total_revenue,
+                        AVG(CASE WHEN sa.sale_status_desc = 'COMPLETED' THEN sa.total_amount ELSE NULL END) as avg_ticket,
+                        COUNT(DISTINCT sa.customer_id) as unique_customers,
+                        ROUND(
+                            COUNT(CASE WHEN sa.sale_status_desc = 'CANCELLED' THEN 1 END) * 100.0 / NULLIF(COUNT(sa.id), 0),
+                        2) as cancellation_rate,
+                        AVG(sa.production_seconds) as avg_production_time,
+                        AVG(sa.delivery_seconds) as avg_delivery_time
+                    FROM stores s
+                    LEFT JOIN sales sa ON s.id = sa.store_id 
+                        AND sa.created_at >= $1::date AND sa.created_at < $2::date + 1
+                    WHERE s.id = ANY($3)
+                    GROUP BY s.id, s.name, s.city, s.state
+                    ORDER BY total_revenue DESC
+                """
             
-            result = await self.db_pool.fetch(query, start_date, end_date, store_ids)
+            result = await self.db_pool.fetch(query, *args)
             
             comparison_data = []
             for row in result:
-                comparison_data.append({
+                comparison_data.append(self._with_customer_bounds(estimates, row['store_id'], {
                     "store_id": row['store_id'],
                     "store_name": row['store_name'],
                     "city": row['city'],
@@ -50,7 +230,7 @@ class AnalyticsService:
                     "cancellation_rate": float(row['cancellation_rate'] or 0),
                     "avg_production_time": row['avg_production_time'] or 0,
                     "avg_delivery_time": row['avg_delivery_time'] or 0
-                })
+                }))
             
             return comparison_data
             
@@ -58,26 +238,147 @@ class AnalyticsService:
             logger.error(f"Erro ao comparar lojas: {str(e)}")
             raise
 
+    @cached_result("analytics/store_period_comparison")
+    @timed_query("analytics/store_period_comparison")
+    async def get_store_period_comparison(self, start_date: datetime, end_date: datetime, store_ids: List[int],
+                                          compare_start: datetime, compare_end: datetime,
+                                          approx: bool = False) -> List[Dict[str, Any]]:
+        """Comparação de lojas com o período de compare_to ao lado (previous_*), deltas e variação %."""
+        try:
+            args = (start_date, end_date, store_ids, compare_start, compare_end)
+            estimates = previous_estimates = None
+            columns = ", ".join(
+                f"COALESCE(t.{prefix}{metric}, 0) as {prefix}{metric}" if metric in ("total_orders", "total_revenue")
+                else f"t.{prefix}{metric} as {prefix}{metric}"
+                for prefix in ("", "previous_")
+                for metric in STORE_PERIOD_METRICS if metric != "unique_customers"
+            )
+            if await self.rollups.is_fresh(self.db_pool, "sales_daily"):
+                estimates = await self._approx_customers_by_store(approx, start_date, end_date, store_ids)
+                if estimates is not None:
+                    previous_estimates = await unique_customers_by_store(self.db_pool, compare_start, compare_end, store_ids)
+                    ids = sorted(set(estimates) | set(previous_estimates))
+                    customers = """
+                customers AS (
+                    SELECT * FROM unnest($6::int[], $7::bigint[], $8::bigint[])
+                        AS u(store_id, unique_customers, previous_unique_customers)
+                )
+                """
+                    args += (
+                        ids,
+                        [estimates.get(store_id, with_bounds(0))["estimate"] for store_id in ids],
+                        [previous_estimates.get(store_id, with_bounds(0))["estimate"] for store_id in ids],
+                    )
+                else:
+                    customers = f"""
+                customers AS (
+                    SELECT 
+                        sa.store_id,
+                        COUNT(DISTINCT sa.customer_id) FILTER (WHERE {SALE_IN_CURRENT}) as unique_customers,
+                        COUNT(DISTINCT sa.customer_id) FILTER (WHERE {SALE_IN_PREVIOUS}) as previous_unique_customers
+                    FROM sales sa
+                    WHERE {SALES_IN_COMPARED_PERIODS}
+                    AND sa.store_id = ANY($3)
+                    GROUP BY sa.store_id
+                )
+                """
+                query = "WITH " + STORE_PERIOD_TOTALS_FROM_ROLLUP + "," + customers + f"""
+                SELECT 
+                    s.id as store_id,
+                    s.name as store_name,
+                    s.city,
+                    s.state,
+                    {columns},
+                    COALESCE(cu.unique_customers, 0) as unique_customers,
+                    COALESCE(cu.previous_unique_customers, 0) as previous_unique_customers
+                FROM stores s
+                LEFT JOIN store_totals t ON t.store_id = s.id
+                LEFT JOIN customers cu ON cu.store_id = s.id
+                WHERE s.id = ANY($3)
+                ORDER BY total_revenue DESC
+            """
+            else:
+                query = f"""
+                    SELECT 
+                        s.id as store_id,
+                        s.name as store_name,
+                        s.city,
+                        s.state,{_store_period_columns(SALE_IN_CURRENT, "")},{_store_period_columns(SALE_IN_PREVIOUS, "previous_")}
+                    FROM stores s
+                    LEFT JOIN sales sa ON s.id = sa.store_id 
+                        AND {SALES_IN_COMPARED_PERIODS}
+                    WHERE s.id = ANY($3)
+                    GROUP BY s.id, s.name, s.city, s.state
+                    ORDER BY total_revenue DESC
+                """
+            
+            result = await self.db_pool.fetch(query, *args)
+            
+            rows = []
+            for row in result:
+                data = {
+                    "store_id": row['store_id'],
+                    "store_name": row['store_name'],
+                    "city": row['city'],
+                    "state": row['state'],
+                }
+                for prefix in ("", "previous_"):
+                    for metric in STORE_PERIOD_METRICS:
+                        value = row[prefix + metric]
+                        data[prefix + metric] = (value or 0) if metric in ("total_orders", "unique_customers") else float(value or 0)
+                rows.append(data)
+            
+            comparison_data = []
+            for data in with_deltas(rows):
+                self._with_customer_bounds(estimates, data["store_id"], data)
+                if previous_estimates is not None:
+                    data["previous_unique_customers_bounds"] = previous_estimates.get(data["store_id"]) or with_bounds(0)
+                comparison_data.append(data)
+            return comparison_data
+            
+        except Exception as e:
+            logger.error(f"Erro ao comparar lojas entre períodos: {str(e)}")
+            raise
+
+    @cached_result("analytics/store_regions")
+    @timed_query("analytics/store_regions")
     async def get_store_regions(self, start_date: datetime, end_date: datetime) -> List[Dict[str, Any]]:
         try:
-            query = """
+            if await self.rollups.is_fresh(self.db_pool, "sales_daily"):
+                query = "WITH " + STORE_TOTALS_FROM_ROLLUP + """
                 SELECT 
                     s.city,
                     s.state,
                     COUNT(DISTINCT s.id) as store_count,
-                    COUNT(sa.id) as total_orders,
-                    SUM(CASE WHEN sa.sale_status_desc = 'COMPLETED' THEN sa.total_amount ELSE 0 END) as total_revenue,
-                    AVG(CASE WHEN sa.sale_status_desc = 'COMPLETED' THEN sa.total_amount ELSE NULL END) as avg_ticket,
-                    ROUND(
-                        COUNT(CASE WHEN sa.sale_status_desc = 'CANCELLED' THEN 1 END) * 100.0 / NULLIF(COUNT(sa.id), 0),
-                    2) as cancellation_rate
+                    COALESCE(SUM(t.total_orders), 0)::bigint as total_orders,
+                    COALESCE(SUM(t.completed_revenue), 0) as total_revenue,
+                    SUM(t.completed_revenue) / NULLIF(SUM(t.completed_orders), 0) as avg_ticket,
+                    ROUND(COALESCE(SUM(t.cancelled_orders), 0) * 100.0 / NULLIF(SUM(t.total_orders), 0), 2) as cancellation_rate
                 FROM stores s
-                LEFT JOIN sales sa ON s.id = sa.store_id 
-                    AND sa.created_at BETWEEN $1 AND $2
+                LEFT JOIN store_totals t ON t.store_id = s.id
                 WHERE s.is_active = true
                 GROUP BY s.city, s.state
                 ORDER BY total_revenue DESC
             """
+            else:
+                query = """
+                    SELECT 
+                        s.city,
+                        s.state,
+                        COUNT(DISTINCT s.id) as store_count,
+                        COUNT(sa.id) as total_orders,
+                        SUM(CASE WHEN sa.sale_status_desc = 'COMPLETED' THEN sa.total_amount ELSE 0 END) as total_revenue,
+                        AVG(CASE WHEN sa.sale_status_desc = 'COMPLETED' THEN sa.total_amount ELSE NULL END) as avg_ticket,
+                        ROUND(
+                            COUNT(CASE WHEN sa.sale_status_desc = 'CANCELLED' THEN 1 END) * 100.0 / NULLIF(COUNT(sa.id), 0),
+                        2) as cancellation_rate
+                    FROM stores s
+                    LEFT JOIN sales sa ON s.id = sa.store_id 
+                        AND sa.created_at >= $1::date AND sa.created_at < $2::date + 1
+                    WHERE s.is_active = true
+                    GROUP BY s.city, s.state
+                    ORDER BY total_revenue DESC
+                """
             
             result = await self.db_pool.fetch(query, start_date, end_date)
             
@@ -99,33 +400,71 @@ class AnalyticsService:
             logger.error(f"Erro ao buscar regiões: {str(e)}")
             raise
 
-    async def get_store_ranking(self, start_date: datetime, end_date: datetime, limit: int = 10) -> List[Dict[str, Any]]:
+    @cached_result("analytics/store_ranking")
+    @timed_query("analytics/store_ranking")
+    async def get_store_ranking(self, start_date: datetime, end_date: datetime, limit: int = 10,
+                                approx: bool = False) -> List[Dict[str, Any]]:
         try:
-            query = """
+            args = (start_date, end_date, limit)
+            estimates = None
+            if await self.rollups.is_fresh(self.db_pool, "sales_daily"):
+                estimates = await self._approx_customers_by_store(approx, start_date, end_date)
+                if estimates is not None:
+                    customers = APPROX_CUSTOMERS_CTE.format(first=4, second=5)
+                    args += (list(estimates), [bounds["estimate"] for bounds in estimates.values()])
+                else:
+                    customers = """
+                customers AS (
+                    SELECT store_id, COUNT(DISTINCT customer_id) as unique_customers
+                    FROM sales
+                    WHERE created_at >= $1::date AND created_at < $2::date + 1
+                    GROUP BY store_id
+                )
+                """
+                query = "WITH " + STORE_TOTALS_FROM_ROLLUP + "," + customers + """
                 SELECT 
                     s.id as store_id,
                     s.name as store_name,
                     s.city,
                     s.state,
-                    COUNT(sa.id) as total_orders,
-                    SUM(CASE WHEN sa.sale_status_desc = 'COMPLETED' THEN sa.total_amount ELSE 0 END) as total_revenue,
-                    AVG(CASE WHEN sa.sale_status_desc = 'COMPLETED' THEN sa.total_amount ELSE NULL END) as avg_ticket,
-                    COUNT(DISTINCT sa.customer_id) as unique_customers,
-                    RANK() OVER (ORDER BY SUM(CASE WHEN sa.sale_status_desc = 'COMPLETED' THEN sa.total_amount ELSE 0 END) DESC) as revenue_rank
+                    COALESCE(t.total_orders, 0)::bigint as total_orders,
+                    COALESCE(t.completed_revenue, 0) as total_revenue,
+                    t.completed_revenue / NULLIF(t.completed_orders, 0) as avg_ticket,
+                    COALESCE(cu.unique_customers, 0) as unique_customers,
+                    RANK() OVER (ORDER BY COALESCE(t.completed_revenue, 0) DESC) as revenue_rank
                 FROM stores s
-                LEFT JOIN sales sa ON s.id = sa.store_id 
-                    AND sa.created_at BETWEEN $1 AND $2
+                LEFT JOIN store_totals t ON t.store_id = s.id
+                LEFT JOIN customers cu ON cu.store_id = s.id
                 WHERE s.is_active = true
-                GROUP BY s.id, s.name, s.city, s.state
                 ORDER BY total_revenue DESC
                 LIMIT $3
             """
+            else:
+                query = """
+                    SELECT 
+                        s.id as store_id,
+                        s.name as store_name,
+                        s.city,
+                        s.state,
+                        COUNT(sa.id) as total_orders,
+                        SUM(CASE WHEN sa.sale_status_desc = 'COMPLETED' THEN sa.total_amount ELSE 0 END) as total_revenue,
+                        AVG(CASE WHEN sa.sale_status_desc = 'COMPLETED' THEN sa.total_amount ELSE NULL END) as avg_ticket,
+                        COUNT(DISTINCT sa.customer_id) as unique_customers,
+                        RANK() OVER (ORDER BY SUM(CASE WHEN sa.sale_status_desc = 'COMPLETED' THEN sa.total_amount ELSE 0 END) DESC) as revenue_rank
+                    FROM stores s
+                    LEFT JOIN sales sa ON s.id = sa.store_id 
+                        AND sa.created_at >= $1::date AND sa.created_at < $2::date + 1
+                    WHERE s.is_active = true
+                    GROUP BY s.id, s.name, s.city, s.state
+                    ORDER BY total_revenue DESC
+                    LIMIT $3
+                """
             
-            result = await self.db_pool.fetch(query, start_date, end_date, limit)
+            result = await self.db_pool.fetch(query, *args)
             
             ranking_data = []
             for row in result:
-                ranking_data.append({
+                ranking_data.append(self._with_customer_bounds(estimates, row['store_id'], {
                     "store_id": row['store_id'],
                     "store_name": row['store_name'],
                     "city": row['city'],
@@ -135,7 +474,7 @@ class AnalyticsService:
                     "avg_ticket": float(row['avg_ticket'] or 0),
                     "unique_customers": row['unique_customers'] or 0,
                     "revenue_rank": row['revenue_rank'] or 0
-                })
+                }))
             
             return ranking_data
             
@@ -143,6 +482,8 @@ class AnalyticsService:
             logger.error(f"Erro ao buscar ranking: {str(e)}")
             raise
 
+    @cached_result("analytics/store_list")
+    @timed_query("analytics/store_list")
     async def get_all_stores(self) -> List[Dict[str, Any]]:
         try:
             query = """
@@ -184,24 +525,28 @@ class AnalyticsService:
             logger.error(f"Erro ao buscar lojas: {str(e)}")
             raise
 
-    async def get_overview_kpis(self, start_date: datetime, end_date: datetime) -> Dict[str, Any]:
+    @cached_result("analytics/overview_kpis")
+    @timed_query("analytics/overview_kpis")
+    async def get_overview_kpis(self, start_date: datetime, end_date: datetime, approx: bool = False) -> Dict[str, Any]:
         try:
+            customers_estimate = await self._approx_customers(approx, start_date, end_date)
+
             sales_query = """
                 SELECT 
                     COUNT(*) as total_orders,
                     SUM(CASE WHEN sale_status_desc = 'COMPLETED' THEN total_amount ELSE 0 END) as total_revenue,
                     AVG(CASE WHEN sale_status_desc = 'COMPLETED' THEN total_amount ELSE NULL END) as avg_ticket,
-                    COUNT(DISTINCT customer_id) as unique_customers
+                    {unique_customers} as unique_customers
                 FROM sales 
-                WHERE created_at BETWEEN $1 AND $2
-            """
+                WHERE created_at >= $1::date AND created_at < $2::date + 1
+            """.format(unique_customers="NULL::bigint" if customers_estimate else "COUNT(DISTINCT customer_id)")
             
             sales_result = await self.db_pool.fetchrow(sales_query, start_date, end_date)
 
             customers_query = """
                 SELECT COUNT(*) as total_customers
                 FROM customers
-                WHERE created_at <= $1
+                WHERE created_at < $1::date + 1
             """
             
             customers_result = await self.db_pool.fetchrow(customers_query, end_date)
@@ -209,21 +554,28 @@ class AnalyticsService:
             new_customers_query = """
                 SELECT COUNT(*) as new_customers
                 FROM customers
-                WHERE created_at BETWEEN $1 AND $2
+                WHERE created_at >= $1::date AND created_at < $2::date + 1
             """
             
             new_customers_result = await self.db_pool.fetchrow(new_customers_query, start_date, end_date)
 
+            sales = {
+                "total_orders": sales_result['total_orders'] or 0 if sales_result else 0,
+                "total_revenue": float(sales_result['total_revenue'] or 0) if sales_result else 0,
+                "avg_ticket": float(sales_result['avg_ticket'] or 0) if sales_result else 0,
+                "unique_customers": sales_result['unique_customers'] or 0 if sales_result else 0
+            }
+            # approx=true com sketches desatualizados cai na contagem exata: o flag diz qual valeu
+            sales["unique_customers_estimated"] = customers_estimate is not None
+            if customers_estimate:
+                sales["unique_customers"] = customers_estimate["estimate"]
+                sales["unique_customers_bounds"] = customers_estimate
+
             return {
-                "sales": {
-                    "total_orders": sales_result['total_orders'] or 0 if sales_result else 0,
-                    "total_revenue": float(sales_result['total_revenue'] or 0) if sales_result else 0,
-                    "avg_ticket": float(sales_result['avg_ticket'] or 0) if sales_result else 0,
-                    "unique_customers": sales_result['unique_customers'] or 0 if sales_result else 0
-                },
+                "sales": sales,
                 "customers": {
                     "total": customers_result['total_customers'] or 0 if customers_result else 0,
-                    "new_last_30d": new_customers_result['new_customers'] or 0 if new_customers_result else 0
+                    "new_in_period": new_customers_result['new_customers'] or 0 if new_customers_result else 0
                 }
             }
             
@@ -231,6 +583,83 @@ class AnalyticsService:
             logger.error(f"Erro ao buscar KPIs: {str(e)}")
             raise
 
+    @cached_result("analytics/dashboard")
+    @timed_query("analytics/dashboard")
+    async def get_dashboard(self, start_date: datetime, end_date: datetime, approx: bool = False) -> Dict[str, Any]:
+        try:
+            customers_estimate = await self._approx_customers(approx, start_date, end_date, completed_only=True)
+
+            # Uma única varredura de sales: linha de total (GROUPING = 1) + uma linha por canal
+            sales_query = """
+                SELECT 
+                    GROUPING(c.id) as is_total,
+                    c.name as channel,
+                    COUNT(*) FILTER (WHERE s.sale_status_desc = 'COMPLETED') as order_count,
+                    SUM(s.total_amount) FILTER (WHERE s.sale_status_desc = 'COMPLETED') as total_revenue,
+                    AVG(s.total_amount) FILTER (WHERE s.sale_status_desc = 'COMPLETED') as avg_ticket,
+                    {unique_customers} as unique_customers
+                FROM sales s
+                JOIN channels c ON s.channel_id = c.id
+                WHERE s.created_at >= $1::date AND s.created_at < $2::date + 1
+                GROUP BY GROUPING SETS ((), (c.id, c.name))
+            """.format(unique_customers="NULL::bigint" if customers_estimate else
+                       "COUNT(DISTINCT s.customer_id) FILTER (WHERE s.sale_status_desc = 'COMPLETED')")
+
+            customers_query = """
+                SELECT 
+                    COUNT(*) FILTER (WHERE created_at < $2::date + 1) as total_customers,
+                    COUNT(*) FILTER (WHERE created_at >= $1::date AND created_at < $2::date + 1) as new_customers
+                FROM customers
+            """
+
+            sales_result, customers_result = await asyncio.gather(
+                self.db_pool.fetch(sales_query, start_date, end_date),
+                self.db_pool.fetchrow(customers_query, start_date, end_date)
+            )
+
+            totals = next((row for row in sales_result if row['is_total'] == 1), None)
+            total_orders = totals['order_count'] if totals else 0
+
+            channels_data = []
+            for row in sales_result:
+                if row['is_total'] == 1 or not row['order_count']:
+                    continue
+                channels_data.append({
+                    "channel": row['channel'],
+                    "order_count": row['order_count'],
+                    "total_revenue": float(row['total_revenue'] or 0),
+                    "percentage": round(row['order_count'] * 100.0 / total_orders, 2) if total_orders else 0.0
+                })
+            channels_data.sort(key=lambda channel: channel['order_count'], reverse=True)
+
+            sales = {
+                "total_orders": total_orders,
+                "total_revenue": float(totals['total_revenue'] or 0) if totals else 0,
+                "avg_ticket": float(totals['avg_ticket'] or 0) if totals else 0,
+                "unique_customers": totals['unique_customers'] or 0 if totals else 0,
+                "unique_customers_estimated": customers_estimate is not None
+            }
+            if customers_estimate:
+                sales["unique_customers"] = customers_estimate["estimate"]
+                sales["unique_customers_bounds"] = customers_estimate
+
+            return {
+                "has_data": total_orders > 0,
+                "sales": sales,
+                "customers": {
+                    "total": customers_result['total_customers'] or 0 if customers_result else 0,
+                    "new_in_period": customers_result['new_customers'] or 0 if customers_result else 0
+                },
+                "channels": channels_data,
+                "insights": self.generate_channel_insights(channels_data)
+            }
+
+        except Exception as e:
+            logger.error(f"Erro ao montar dashboard: {str(e)}")
+            raise
+
+    @cached_result("analytics/channel_performance")
+    @timed_query("analytics/channel_performance")
     async def get_channel_performance(self, start_date: datetime, end_date: datetime) -> List[Dict[str, Any]]:
         try:
             query = """
@@ -242,12 +671,12 @@ class AnalyticsService:
                         (COUNT(s.id) * 100.0 / NULLIF((
                             SELECT COUNT(*) 
                             FROM sales s2 
-                            WHERE s2.created_at BETWEEN $1 AND $2
+                            WHERE s2.created_at >= $1::date AND s2.created_at < $2::date + 1
                         ), 0)),
                     2) as percentage
                 FROM sales s
                 JOIN channels c ON s.channel_id = c.id
-                WHERE s.created_at BETWEEN $1 AND $2
+                WHERE s.created_at >= $1::date AND s.created_at < $2::date + 1
                 GROUP BY c.id, c.name
                 ORDER BY order_count DESC
             """
@@ -269,6 +698,8 @@ class AnalyticsService:
             logger.error(f"Erro ao buscar performance de canais: {str(e)}")
             raise
 
+    @cached_result("analytics/sales_totals")
+    @timed_query("analytics/sales_totals")
     async def get_sales_totals(self, start_date: datetime, end_date: datetime) -> List[Dict[str, Any]]:
         try:
             query = """
@@ -277,7 +708,7 @@ class AnalyticsService:
                     SUM(CASE WHEN sale_status_desc = 'COMPLETED' THEN total_amount ELSE 0 END) as total_revenue,
                     AVG(CASE WHEN sale_status_desc = 'COMPLETED' THEN total_amount ELSE NULL END) as avg_ticket
                 FROM sales 
-                WHERE created_at BETWEEN $1 AND $2
+                WHERE created_at >= $1::date AND created_at < $2::date + 1
             """
             
             result = await self.db_pool.fetchrow(query, start_date, end_date)
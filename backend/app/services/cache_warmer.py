@@ -0,0 +1,209 @@
+import asyncio
+import logging
+import random
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.responses import json_mode
+from app.services.analytics_service import AnalyticsService
+from app.services.query_builder import QueryBuilder
+from app.services.result_cache import ResultCache, result_cache
+
+logger = logging.getLogger(__name__)
+
+# Rotas de catálogo usadas pelas páginas: (rota, categoria, query, limit).
+# A rota decide o caminho (json_agg ou lista) e portanto a chave de cache que a requisição vai procurar
+CATALOG_TARGETS: List[Tuple[str, str, str, Optional[int]]] = [
+    ("/analytics/total-sales", "vendas_e_desempenho", "total_sales_period", None),
+    ("/analytics/top-channels", "vendas_e_desempenho", "top_sales_channel", None),
+    ("/analytics/top-days", "vendas_e_desempenho", "top_sales_day_week", None),
+    ("/analytics/peak-hours", "vendas_e_desempenho", "peak_sales_hours", None),
+    ("/analytics/cancellation-rate", "vendas_e_desempenho", "cancellation_rate", None),
+    ("/analytics/top-categories", "produtos", "top_revenue_categories", None),
+    ("/analytics/top-addons", "produtos", "top_addon_items", None),
+    ("/analytics/top-products", "produtos", "top_bottom_products", 10),
+    ("/analytics/avg-product-prices", "produtos", "avg_product_prices", None),
+    ("/analytics/avg-orders-per-customer", "clientes", "avg_orders_per_customer", None),
+]
+
+# Chamadas do AnalyticsService com os mesmos argumentos posicionais que as rotas usam
+SERVICE_TARGETS: List[Tuple[str, Callable[[AnalyticsService, date, date], Awaitable[Any]]]] = [
+    ("analytics/dashboard", lambda service, start, end: service.get_dashboard(start, end)),
+    ("analytics/store_regions", lambda service, start, end: service.get_store_regions(start, end)),
+    ("analytics/store_ranking", lambda service, start, end: service.get_store_ranking(start, end, 10, False)),
+]
+
+
+def preset_range(preset: str, today: Optional[date] = None) -> Tuple[date, date]:
+    """Mesmas contas do DateRangeFilter: "7d" -> (hoje - 7 dias, hoje); "current_month" -> (dia 1, hoje)."""
+    today = today or date.today()
+    if preset == "current_month":
+        return today.replace(day=1), today
+    if preset.endswith("d") and preset[:-1].isdigit():
+        return today - timedelta(days=int(preset[:-1])), today
+    raise ValueError(f"Preset de datas desconhecido: {preset}")
+
+
+class CacheWarmer:
+    """Pré-calcula as queries dos presets de datas no result cache, em segundo plano.
+
+    Roda no startup, quando alguém chama trigger() (ex.: após refresh de rollups) e quando o
+    watermark de vendas muda (carga de dados). No máximo `concurrency` queries ao mesmo tempo,
+    e cede a vez enquanto houver requisições esperando conexão no pool.
+    """
+
+    def __init__(self, cache: Optional[ResultCache] = None, presets: Optional[List[str]] = None,
+                 concurrency: int = 2, jitter_seconds: float = 10.0, check_interval_seconds: float = 60.0):
+        self.cache = cache or result_cache
+        self.presets = presets if presets is not None else settings.CACHE_WARM_PRESETS
+        self.concurrency = max(1, concurrency)
+        self.jitter_seconds = jitter_seconds
+        self.check_interval_seconds = check_interval_seconds
+        self.queries: Dict[str, Dict[str, Any]] = {}
+        self.last_run: Optional[Dict[str, Any]] = None
+        self.running = False
+        self._reasons: List[str] = []
+        self._event = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._warmed_watermark: Optional[Tuple[str, int]] = None
+
+    def trigger(self, reason: str = "manual") -> None:
+        self._reasons.append(reason)
+        self._event.set()
+
+    async def _yield_to_traffic(self, db_pool) -> None:
+        # Requisições de usuários esperando conexão têm prioridade sobre o aquecimento
+        stats = getattr(db_pool, "stats", None)
+        while stats is not None and stats()["waiting"] > 0:
+            await asyncio.sleep(0.2)
+
+    async def _warm_one(self, db_pool, semaphore: asyncio.Semaphore, key: str, preset: str,
+                        compute: Callable[[], Awaitable[Any]]) -> bool:
+        async with semaphore:
+            await self._yield_to_traffic(db_pool)
+            started = time.perf_counter()
+            try:
+                await compute()
+                error = None
+            except Exception as e:
+                error = str(e)
+                logger.warning(f"Falha ao aquecer {key} ({preset}): {e}")
+            self.queries[f"{key}@{preset}"] = {
+                "query": key,
+                "preset": preset,
+                "last_warmed_at": datetime.now().isoformat(),
+                "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+                "error": error,
+            }
+            return error is None
+
+    def _jobs(self, db_pool) -> List[Tuple[str, str, Callable[[], Awaitable[Any]]]]:
+        query_builder = QueryBuilder(db_pool, cache=self.cache)
+        service = AnalyticsService(db_pool, cache=self.cache)
+        jobs = []
+        for preset in self.presets:
+            try:
+                start, end = preset_range(preset)
+            except ValueError as e:
+                logger.warning(str(e))
+                continue
+
+            for route, category, query_name, limit in CATALOG_TARGETS:
+                if json_mode(route) == "postgres":
+                    compute = lambda c=category, q=query_name, s=start, e=end, l=limit: query_builder.execute_query_json(c, q, (s, e), l)
+                else:
+                    compute = lambda c=category, q=query_name, s=start, e=end: query_builder.execute_query(c, q, (s, e))
+                jobs.append((f"{category}/{query_name}", preset, compute))
+            for query_id, call in SERVICE_TARGETS:
+                jobs.append((query_id, preset, lambda call=call, s=start, e=end: call(service, s, e)))
+
+        jobs.append(("clientes/total_customers", "-", lambda: query_builder.execute_query("clientes", "total_customers", ())))
+        return jobs
+
+    async def warm(self, db_pool, reason: str = "manual") -> Dict[str, Any]:
+        if not self.cache.enabled:
+            return {"skipped": "cache desligado"}
+
+        started = time.perf_counter()
+        started_at = datetime.now()
+        self.running = True
+        try:
+            watermark = await self.cache.watermark(db_pool)
+            semaphore = asyncio.Semaphore(self.concurrency)
+            results = await asyncio.gather(*[
+                self._warm_one(db_pool, semaphore, key, preset, compute)
+                for key, preset, compute in self._jobs(db_pool)
+            ])
+        finally:
+            self.running = False
+
+        if watermark is not None:
+            self._warmed_watermark = (watermark.epoch, watermark.sale_id)
+        self.last_run = {
+            "reason": reason,
+            "started_at": started_at.isoformat(),
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+            "queries": len(results),
+            "failed": results.count(False),
+        }
+        logger.info(f"Cache aquecido ({reason}): {len(results)} queries em {self.last_run['duration_ms']:.0f}ms")
+        return self.last_run
+
+    async def _data_changed(self, db_pool) -> bool:
+        watermark = await self.cache.watermark(db_pool)
+        return watermark is not None and (watermark.epoch, watermark.sale_id) != self._warmed_watermark
+
+    async def _run_forever(self, db_pool) -> None:
+        self.trigger("startup")
+        while True:
+            try:
+                try:
+                    await asyncio.wait_for(self._event.wait(), timeout=self.check_interval_seconds)
+                except asyncio.TimeoutError:
+                    if await self._data_changed(db_pool):
+                        self.trigger("data")
+                if not self._event.is_set():
+                    continue
+
+                # Espalha o aquecimento para não coincidir com o pico que disparou o gatilho
+                await asyncio.sleep(random.uniform(0, self.jitter_seconds))
+                self._event.clear()
+                reasons, self._reasons = self._reasons, []
+                await self.warm(db_pool, ",".join(sorted(set(reasons))) or "manual")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Erro no aquecimento do cache: {str(e)}")
+
+    def start(self, db_pool) -> None:
+        if self._task is None and settings.CACHE_WARM_ENABLED:
+            self._task = asyncio.create_task(self._run_forever(db_pool))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.CACHE_WARM_ENABLED and self._task is not None,
+            "running": self.running,
+            "pending": self._event.is_set(),
+            "presets": self.presets,
+            "concurrency": self.concurrency,
+            "last_run": self.last_run,
+            "queries": sorted(self.queries.values(), key=lambda q: (q["query"], q["preset"])),
+        }
+
+
+cache_warmer = CacheWarmer(
+    concurrency=settings.CACHE_WARM_CONCURRENCY,
+    jitter_seconds=settings.CACHE_WARM_JITTER_SECONDS,
+    check_interval_seconds=settings.CACHE_WARM_CHECK_INTERVAL_SECONDS,
+)
@@ -0,0 +1,125 @@
+import io
+import tempfile
+from typing import Any, Iterator, Sequence
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow é opcional: só os formatos colunares dependem dele
+    pa = None
+    pq = None
+
+COLUMNAR_FORMATS = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# Tipos do Postgres (nome do asyncpg Type) -> fábrica do tipo Arrow
+_PG_TYPES = {
+    "bool": lambda: pa.bool_(),
+    "int2": lambda: pa.int16(),
+    "int4": lambda: pa.int32(),
+    "int8": lambda: pa.int64(),
+    "float4": lambda: pa.float32(),
+    "float8": lambda: pa.float64(),
+    # numeric vira float64: é o que os notebooks já faziam com o JSON, sem o Decimal por linha
+    "numeric": lambda: pa.float64(),
+    "text": lambda: pa.string(),
+    "varchar": lambda: pa.string(),
+    "bpchar": lambda: pa.string(),
+    "name": lambda: pa.string(),
+    "date": lambda: pa.date32(),
+    "time": lambda: pa.time64("us"),
+    "timestamp": lambda: pa.timestamp("us"),
+    "timestamptz": lambda: pa.timestamp("us", tz="UTC"),
+}
+
+
+class ColumnarUnavailableError(RuntimeError):
+    pass
+
+
+def available() -> bool:
+    return pa is not None
+
+
+def require_pyarrow() -> None:
+    if pa is None:
+        raise ColumnarUnavailableError("Formatos arrow/parquet exigem o pacote pyarrow (pip install pyarrow)")
+
+
+def arrow_type(pg_type_name: str):
+    factory = _PG_TYPES.get(pg_type_name)
+    return factory() if factory else pa.string()
+
+
+def schema_from_attributes(attributes: Sequence[Any]):
+    """Monta o schema Arrow a partir de PreparedStatement.get_attributes() do asyncpg."""
+    require_pyarrow()
+    return pa.schema([pa.field(attr.name, arrow_type(attr.type.name)) for attr in attributes])
+
+
+def _column(values: Sequence[Any], field) -> Any:
+    if pa.types.is_floating(field.type):
+        # Decimal não converte direto para double: infere decimal128 e faz o cast vetorizado
+        return pa.array(values).cast(field.type) if any(v is not None for v in values) \
+            else pa.nulls(len(values), field.type)
+    if pa.types.is_string(field.type):
+        return pa.array([v if v is None or isinstance(v, str) else str(v) for v in values], type=field.type)
+    return pa.array(values, type=field.type)
+
+
+def records_to_batch(records: Sequence[Sequence[Any]], schema):
+    """Converte tuplas/asyncpg.Record em RecordBatch coluna a coluna, sem dict por linha."""
+    columns = list(zip(*records)) if records else [()] * len(schema)
+    return pa.record_batch([_column(values, field) for values, field in zip(columns, schema)], schema=schema)
+
+
+class ArrowStreamWriter:
+    """Escreve o formato IPC stream incrementalmente: cada lote vira bytes prontos para enviar."""
+
+    def __init__(self, schema):
+        self._sink = io.BytesIO()
+        self._writer = pa.ipc.new_stream(self._sink, schema)
+
+    def _drain(self) -> bytes:
+        data = self._sink.getvalue()
+        self._sink.seek(0)
+        self._sink.truncate()
+        return data
+
+    def header(self) -> bytes:
+        return self._drain()
+
+    def write(self, batch) -> bytes:
+        self._writer.write_batch(batch)
+        return self._drain()
+
+    def close(self) -> bytes:
+        self._writer.close()
+        return self._drain()
+
+
+class ParquetSpoolWriter:
+    """Parquet só fica válido com o footer: os row groups vão para um arquivo temporário
+    (em memória até o limite) e o arquivo completo é enviado ao final."""
+
+    def __init__(self, schema, spool_max_bytes: int = 64 * 1024 * 1024, compression: str = "zstd"):
+        self._file = tempfile.SpooledTemporaryFile(max_size=spool_max_bytes)
+        self._writer = pq.ParquetWriter(self._file, schema, compression=compression)
+
+    def write(self, batch) -> None:
+        self._writer.write_batch(batch)
+
+    def close(self, read_size: int = 1024 * 1024) -> Iterator[bytes]:
+        self._writer.close()
+        self._file.seek(0)
+        try:
+            while True:
+                data = self._file.read(read_size)
+                if not data:
+                    break
+                yield data
+        finally:
+            self._file.close()
+
@@ -0,0 +1,67 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+# compare_to: versões das queries do catálogo (categoria "comparison") que calculam o período atual
+# ($1/$2) e o de comparação ($3/$4) numa passada só, com agregação condicional (FILTER) sobre os dois
+# intervalos; cada coluna previous_<x> ganha <x>_delta e <x>_change_pct
+COMPARISON_QUERIES: Dict[Tuple[str, str], str] = {
+    ("vendas_e_desempenho", "total_sales_period"): "total_sales_period",
+    ("vendas_e_desempenho", "top_sales_channel"): "top_sales_channel",
+}
+
+COMPARISON_CATEGORY = "comparison"
+COMPARE_TO = ("previous_period", "previous_year", "custom")
+PREVIOUS_PREFIX = "previous_"
+_NUMERIC = (int, float, Decimal)
+
+
+def _year_before(day: date) -> date:
+    try:
+        return day.replace(year=day.year - 1)
+    except ValueError:
+        # 29/02 -> 28/02
+        return day.replace(year=day.year - 1, day=28)
+
+
+def comparison_period(start_date: date, end_date: date, compare_to: str,
+                      compare_start: Optional[date] = None, compare_end: Optional[date] = None) -> Tuple[date, date]:
+    """Intervalo de comparação (inclusivo) para o período [start_date, end_date]."""
+    if compare_to == "previous_period":
+        # Mesmo número de dias, imediatamente antes
+        days = (end_date - start_date).days
+        previous_end = start_date - timedelta(days=1)
+        return previous_end - timedelta(days=days), previous_end
+    if compare_to == "previous_year":
+        return _year_before(start_date), _year_before(end_date)
+    if compare_to == "custom":
+        if compare_start is None or compare_end is None:
+            raise ValueError("compare_to=custom exige compare_start_date e compare_end_date")
+        if compare_start > compare_end:
+            raise ValueError("compare_start_date deve ser anterior a compare_end_date")
+        return compare_start, compare_end
+    raise ValueError(f"compare_to desconhecido: {compare_to} (use {', '.join(COMPARE_TO)})")
+
+
+def _change_pct(current: Any, previous: Any) -> Optional[float]:
+    if current is None or not previous:
+        return None
+    return round((float(current) - float(previous)) * 100.0 / abs(float(previous)), 2)
+
+
+def with_deltas(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Para cada previous_<x> numérico acrescenta <x>_delta e <x>_change_pct. Não muta as linhas do cache."""
+    result = []
+    for row in rows:
+        data = dict(row)
+        for key, previous in row.items():
+            if not key.startswith(PREVIOUS_PREFIX):
+                continue
+            base = key[len(PREVIOUS_PREFIX):]
+            current = row.get(base)
+            if base not in row or not (isinstance(current, _NUMERIC) or isinstance(previous, _NUMERIC)):
+                continue
+            data[f"{base}_delta"] = current - previous if current is not None and previous is not None else None
+            data[f"{base}_change_pct"] = _change_pct(current, previous)
+        result.append(data)
+    return result
@@ -0,0 +1,235 @@
+import csv
+import io
+import json
+import logging
+import zlib
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, AsyncIterator, Iterable, List, Optional, Tuple
+
+import asyncpg
+from app.core.config import settings
+from app.services import columnar
+from app.services.query_catalog import QueryCatalog, query_catalog
+from app.services.rollups import RollupManager, rollup_manager
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    **columnar.COLUMNAR_FORMATS,
+}
+
+# Detalhe bruto exportável, sempre filtrado por período e ordenado pela PK
+DETAIL_QUERIES = {
+    "sales": """
+        SELECT
+            s.id, s.created_at, s.store_id, s.channel_id, s.customer_id,
+            s.sale_status_desc, s.total_amount_items, s.total_discount, s.total_increase,
+            s.delivery_fee, s.service_tax_fee, s.total_amount, s.value_paid,
+            s.production_seconds, s.delivery_seconds, s.people_quantity, s.discount_reason
+        FROM sales s
+        WHERE s.created_at >= $1::date AND s.created_at < $2::date + 1
+        ORDER BY s.id
+    """,
+    "product_sales": """
+        SELECT
+            ps.id, ps.sale_id, s.created_at, s.store_id, s.channel_id, s.sale_status_desc,
+            ps.product_id, ps.quantity, ps.base_price, ps.total_price
+        FROM product_sales ps
+        JOIN sales s ON s.id = ps.sale_id
+        WHERE s.created_at >= $1::date AND s.created_at < $2::date + 1
+        ORDER BY ps.sale_id, ps.id
+    """,
+    "item_product_sales": """
+        SELECT
+            ips.id, ips.product_sale_id, ps.sale_id, s.created_at, s.store_id,
+            ips.item_id, ips.option_group_id, ips.quantity, ips.additional_price, ips.price
+        FROM item_product_sales ips
+        JOIN product_sales ps ON ps.id = ips.product_sale_id
+        JOIN sales s ON s.id = ps.sale_id
+        WHERE s.created_at >= $1::date AND s.created_at < $2::date + 1
+        ORDER BY ps.sale_id, ips.id
+    """,
+}
+
+
+def _to_text(value: Any) -> Any:
+    if value is None:
+        return None
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    return value
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    return str(value)
+
+
+def encode_csv(records: List[asyncpg.Record], with_header: bool) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if with_header and records:
+        writer.writerow(records[0].keys())
+    for record in records:
+        writer.writerow(["" if v is None else _to_text(v) for v in record.values()])
+    return buffer.getvalue()
+
+
+def encode_ndjson(records: List[asyncpg.Record]) -> str:
+    return "".join(json.dumps(dict(record), default=_json_default, ensure_ascii=False) + "\n" for record in records)
+
+
+class _Compressor:
+    def __init__(self, enabled: bool):
+        # wbits=31 gera um arquivo .gz completo (cabeçalho e trailer gzip)
+        self._zlib = zlib.compressobj(6, zlib.DEFLATED, 31) if enabled else None
+
+    def feed(self, data: bytes) -> bytes:
+        if not self._zlib:
+            return data
+        # Z_SYNC_FLUSH por chunk: o cliente recebe bytes a cada lote do cursor
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def flush(self) -> bytes:
+        return self._zlib.flush() if self._zlib else b""
+
+
+class _TextEncoder:
+    def __init__(self, fmt: str, gzip: bool):
+        self.fmt = fmt
+        self.description = f"{fmt}{', gzip' if gzip else ''}"
+        self._compressor = _Compressor(gzip)
+        self._with_header = True
+
+    def start(self, statement) -> bytes:
+        return b""
+
+    def feed(self, records: List[asyncpg.Record]) -> bytes:
+        if self.fmt == "csv":
+            text = encode_csv(records, with_header=self._with_header)
+            self._with_header = False
+        else:
+            text = encode_ndjson(records)
+        return self._compressor.feed(text.encode("utf-8"))
+
+    def finish(self) -> Iterable[bytes]:
+        return [self._compressor.flush()]
+
+
+class _ColumnarEncoder:
+    def __init__(self, fmt: str):
+        self.fmt = fmt
+        self.description = fmt
+        self._schema = None
+        self._writer = None
+
+    def start(self, statement) -> bytes:
+        # O schema vem do statement preparado, não dos dados: lotes com colunas
+        # só de NULL continuam com o tipo certo
+        self._schema = columnar.schema_from_attributes(statement.get_attributes())
+        if self.fmt == "arrow":
+            self._writer = columnar.ArrowStreamWriter(self._schema)
+            return self._writer.header()
+        self._writer = columnar.ParquetSpoolWriter(self._schema)
+        return b""
+
+    def feed(self, records: List[asyncpg.Record]) -> bytes:
+        batch = columnar.records_to_batch(records, self._schema)
+        if self.fmt == "arrow":
+            return self._writer.write(batch)
+        self._writer.write(batch)
+        return b""
+
+    def finish(self) -> Iterable[bytes]:
+        if self.fmt == "arrow":
+            return [self._writer.close()]
+        # Parquet só é válido com o footer: o arquivo sai inteiro depois do último lote
+        return self._writer.close()
+
+
+class Exporter:
+    def __init__(self, db_pool: asyncpg.Pool, catalog: Optional[QueryCatalog] = None, rollups: Optional[RollupManager] = None):
+        self.db_pool = db_pool
+        self.catalog = catalog or query_catalog
+        self.rollups = rollups or rollup_manager
+
+    async def _stream(self, prepare, args: Tuple, fmt: str, gzip: bool, chunk_rows: int) -> AsyncIterator[bytes]:
+        if fmt in columnar.COLUMNAR_FORMATS:
+            # Arrow/Parquet já são binários compactos (Parquet comprime por coluna)
+            if gzip:
+                raise ValueError("gzip só se aplica aos formatos csv e ndjson")
+            columnar.require_pyarrow()
+            encoder = _ColumnarEncoder(fmt)
+        else:
+            encoder = _TextEncoder(fmt, gzip)
+        return self._run(prepare, args, encoder, chunk_rows)
+
+    async def _run(self, prepare, args: Tuple, encoder, chunk_rows: int) -> AsyncIterator[bytes]:
+        exported = 0
+        started = False
+
+        # Numa réplica que falha antes do primeiro chunk, o stream inteiro é refeito no primário
+        async for records in self.db_pool.stream(lambda pool: self._records(pool, prepare, args, chunk_rows)):
+            if not started:
+                # O primeiro item é o statement (colunas/tipos para o cabeçalho)
+                started = True
+                chunk = encoder.start(records)
+            else:
+                exported += len(records)
+                chunk = encoder.feed(records)
+            if chunk:
+                yield chunk
+
+        for chunk in encoder.finish():
+            if chunk:
+                yield chunk
+        logger.info(f"Exportação concluída: {exported} linhas ({encoder.description})")
+
+    @staticmethod
+    async def _records(db_pool, prepare, args: Tuple, chunk_rows: int) -> AsyncIterator[Any]:
+        # A conexão fica presa só enquanto o cliente consome o stream;
+        # se ele desconectar, o gerador é fechado e o finally do acquire a devolve.
+        # O statement só sai junto com o primeiro lote: até lá tudo pode ser refeito em outro pool
+        async with db_pool.acquire(profile="export") as connection:
+            async with connection.transaction(readonly=True):
+                statement = await prepare(connection)
+                cursor = await statement.cursor(*args)
+                records = await cursor.fetch(chunk_rows)
+                yield statement
+                while records:
+                    yield records
+                    records = await cursor.fetch(chunk_rows)
+
+    async def catalog_query(self, category: str, query_name: str, params: Tuple, fmt: str = "csv",
+                            gzip: bool = False, chunk_rows: Optional[int] = None) -> AsyncIterator[bytes]:
+        args = self.catalog.bind_params(self.catalog.get(category, query_name), params)
+        query = self.catalog.get(*await self.rollups.route(self.db_pool, category, query_name))
+
+        async def prepare(connection):
+            return await self.catalog.prepare(connection, query)
+
+        return await self._stream(prepare, args, fmt, gzip, chunk_rows or settings.EXPORT_CHUNK_ROWS)
+
+    async def detail(self, dataset: str, start_date: date, end_date: date, fmt: str = "csv",
+                     gzip: bool = False, chunk_rows: Optional[int] = None) -> AsyncIterator[bytes]:
+        if dataset not in DETAIL_QUERIES:
+            raise ValueError(f"Dataset desconhecido: {dataset}. Opções: {', '.join(DETAIL_QUERIES)}")
+        sql = DETAIL_QUERIES[dataset]
+
+        async def prepare(connection):
+            return await connection.prepare(sql)
+
+        return await self._stream(prepare, (start_date, end_date), fmt, gzip, chunk_rows or settings.EXPORT_CHUNK_ROWS)
+
+
+def export_filename(name: str, fmt: str, gzip: bool, parts: Iterable[Any] = ()) -> str:
+    suffix = "_".join(str(p) for p in parts if p is not None)
+    return f"{name}{'_' + suffix if suffix else ''}.{fmt}{'.gz' if gzip else ''}"
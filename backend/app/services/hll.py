@@ -0,0 +1,106 @@
+import math
+from datetime import date
+from typing import Dict, List, Optional
+
+import asyncpg
+
+# HyperLogLog em SQL puro (sem a extensão hll): cada sketch é guardado como linhas (registrador, rho)
+# em customer_hll_daily, uma por (dia, loja, concluída). Juntar sketches é MAX(rho) por registrador,
+# então qualquer conjunto de lojas e período sai do mesmo rollup.
+PRECISION = 11
+REGISTERS = 1 << PRECISION
+# Bits do hash de 32 bits que sobram depois do índice do registrador
+_VALUE_BITS = 32 - PRECISION
+_ALPHA = 0.7213 / (1 + 1.079 / REGISTERS)
+RELATIVE_ERROR = 1.04 / math.sqrt(REGISTERS)
+# ~95% das estimativas ficam dentro de ±1.96 erros padrão
+CONFIDENCE_Z = 1.96
+
+HASH_SQL = "(hashint8(customer_id::bigint)::bigint & 4294967295)"
+
+
+def register_sql(hashed: str) -> str:
+    return f"({hashed} >> {_VALUE_BITS})::smallint"
+
+
+def rho_sql(hashed: str) -> str:
+    # Posição do primeiro bit 1 nos bits restantes (1 = bit mais alto); tudo zero = _VALUE_BITS + 1
+    mask = (1 << _VALUE_BITS) - 1
+    return f"({_VALUE_BITS + 1} - length(ltrim(({hashed} & {mask})::bit({_VALUE_BITS})::text, '0')))::smallint"
+
+
+def estimate_cardinality(nonzero: int, harmonic: float) -> float:
+    """Estimativa a partir dos registradores juntados: quantos são não nulos e SUM(2^-rho) deles."""
+    zeros = REGISTERS - nonzero
+    if zeros == REGISTERS:
+        return 0.0
+    raw = _ALPHA * REGISTERS * REGISTERS / (harmonic + zeros)
+    if raw <= 2.5 * REGISTERS and zeros > 0:
+        # Poucos elementos: contagem linear é bem mais precisa que a fórmula harmônica
+        return REGISTERS * math.log(REGISTERS / zeros)
+    return raw
+
+
+def with_bounds(estimate: float) -> Dict[str, float]:
+    margin = estimate * RELATIVE_ERROR * CONFIDENCE_Z
+    return {
+        "estimate": round(estimate),
+        "low": max(0, math.floor(estimate - margin)),
+        "high": math.ceil(estimate + margin),
+        "relative_error": round(RELATIVE_ERROR, 4),
+        "confidence": 0.95,
+    }
+
+
+def _sketch_query(per_store: bool) -> str:
+    group = "store_id, " if per_store else ""
+    hashed = "tail.h"
+    return f"""
+        WITH coverage AS (
+            SELECT last_sale_id FROM rollup_state WHERE name = 'customer_hll_daily'
+        ),
+        registers AS (
+            SELECT store_id, register, rho
+            FROM customer_hll_daily
+            WHERE day BETWEEN $1 AND $2
+            AND ($3::int[] IS NULL OR store_id = ANY($3::int[]))
+            AND (NOT $4::boolean OR completed)
+            UNION ALL
+            -- Cauda: vendas ainda não consolidadas no rollup
+            SELECT tail.store_id, {register_sql(hashed)}, {rho_sql(hashed)}
+            FROM (
+                SELECT COALESCE(store_id, 0) AS store_id, {HASH_SQL} AS h
+                FROM sales
+                WHERE id > COALESCE((SELECT last_sale_id FROM coverage), 0)
+                AND created_at >= $1::date AND created_at < $2::date + 1
+                AND customer_id IS NOT NULL
+                AND ($3::int[] IS NULL OR store_id = ANY($3::int[]))
+                AND (NOT $4::boolean OR sale_status_desc = 'COMPLETED')
+            ) tail
+        ),
+        merged AS (
+            SELECT {group}register, MAX(rho) AS rho
+            FROM registers
+            GROUP BY {group}register
+        )
+        SELECT {group}COUNT(*) AS nonzero, COALESCE(SUM(power(2::float8, -rho)), 0) AS harmonic
+        FROM merged
+        {"GROUP BY store_id" if per_store else ""}
+    """
+
+
+async def unique_customers(db_pool: asyncpg.Pool, start_date: date, end_date: date,
+                           store_ids: Optional[List[int]] = None, completed_only: bool = False) -> Dict[str, float]:
+    """Clientes únicos estimados no período (e nas lojas, se informadas), com intervalo de ~95%."""
+    row = await db_pool.fetchrow(_sketch_query(False), start_date, end_date, store_ids, completed_only)
+    return with_bounds(estimate_cardinality(row["nonzero"], row["harmonic"]) if row else 0.0)
+
+
+async def unique_customers_by_store(db_pool: asyncpg.Pool, start_date: date, end_date: date,
+                                    store_ids: Optional[List[int]] = None,
+                                    completed_only: bool = False) -> Dict[int, Dict[str, float]]:
+    rows = await db_pool.fetch(_sketch_query(True), start_date, end_date, store_ids, completed_only)
+    return {
+        row["store_id"]: with_bounds(estimate_cardinality(row["nonzero"], row["harmonic"]))
+        for row in rows
+    }
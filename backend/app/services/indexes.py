@@ -0,0 +1,299 @@
+import asyncio
+import logging
+import re
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import asyncpg
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEXES_FILE = Path(__file__).resolve().parents[2] / "database" / "indexes.sql"
+
+_CREATE_INDEX_RE = re.compile(
+    r"CREATE\s+(?:UNIQUE\s+)?INDEX\s+IF\s+NOT\s+EXISTS\s+(\w+)\s+ON\s+(?:ONLY\s+)?(\w+)", re.IGNORECASE
+)
+
+
+@dataclass(frozen=True)
+class IndexDefinition:
+    name: str
+    table: str
+    sql: str
+    description: str
+
+    def create_sql(self, concurrently: bool) -> str:
+        if not concurrently:
+            return self.sql
+        return re.sub(r"^CREATE(\s+UNIQUE)?\s+INDEX", lambda m: f"CREATE{m.group(1) or ''} INDEX CONCURRENTLY", self.sql, count=1)
+
+
+def load_index_definitions(path: Optional[Path] = None) -> List[IndexDefinition]:
+    """Lê database/indexes.sql: um CREATE INDEX IF NOT EXISTS por statement, comentário acima = descrição."""
+    text = Path(path or DEFAULT_INDEXES_FILE).read_text(encoding="utf-8")
+    definitions = []
+    comments: List[str] = []
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            comments = []
+        elif stripped.startswith("--"):
+            comments.append(stripped[2:].strip())
+        else:
+            match = _CREATE_INDEX_RE.match(stripped)
+            if match is None:
+                raise ValueError(f"Statement inesperado em {path or DEFAULT_INDEXES_FILE}: {stripped[:80]}")
+            definitions.append(IndexDefinition(
+                name=match.group(1),
+                table=match.group(2),
+                sql=stripped.rstrip(";"),
+                description=" ".join(comments),
+            ))
+    return definitions
+
+
+def _strip_outer_parens(predicate: str) -> str:
+    """Tira os parênteses que envolvem o predicado inteiro: pg_get_indexdef sempre os escreve."""
+    while predicate.startswith("(") and predicate.endswith(")"):
+        depth = 0
+        for position, char in enumerate(predicate):
+            depth += {"(": 1, ")": -1}.get(char, 0)
+            if depth == 0 and position < len(predicate) - 1:
+                return predicate
+        predicate = predicate[1:-1]
+    return predicate
+
+
+def _normalize(definition: str) -> str:
+    text = re.sub(r"\s+", " ", definition.lower())
+    text = text.replace(" if not exists", "").replace(" concurrently", "").replace("public.", "")
+    text = re.sub(r"\bon only\b", "on", text)
+    text = text.replace(" using btree", "").replace(" ", "").replace("'", "")
+    # Índice parcial: "where customer_id is not null" e "where (customer_id is not null)" são o mesmo
+    head, where, predicate = text.partition("where")
+    return head + where + _strip_outer_parens(predicate) if where else text
+
+
+class IndexManager:
+    """Conjunto declarativo de índices (database/indexes.sql): cria os que faltam e gera o relatório do advisor."""
+
+    # Chave do pg_advisory_lock que serializa o ensure() entre processos (rollups usam 740_231_001)
+    LOCK_KEY = 740_231_002
+
+    def __init__(self, definitions: Optional[List[IndexDefinition]] = None):
+        self._definitions = definitions
+        self.last_run: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def definitions(self) -> List[IndexDefinition]:
+        if self._definitions is None:
+            self._definitions = load_index_definitions()
+        return self._definitions
+
+    async def _existing(self, connection) -> Dict[str, Dict[str, Any]]:
+        rows = await connection.fetch("""
+            SELECT c.relname AS name, t.relname AS table_name, pg_get_indexdef(c.oid) AS definition,
+                   i.indisvalid AS valid
+            FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            JOIN pg_class t ON t.oid = i.indrelid
+            WHERE t.relnamespace = 'public'::regnamespace
+        """)
+        return {row["name"]: dict(row) for row in rows}
+
+    async def _partitioned_tables(self, connection) -> set:
+        rows = await connection.fetch("""
+            SELECT c.relname FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid
+        """)
+        return {row["relname"] for row in rows}
+
+    async def check(self, db_pool: asyncpg.Pool) -> List[Dict[str, Any]]:
+        async with db_pool.acquire() as connection:
+            existing = await self._existing(connection)
+            tables = {row["relname"] for row in await connection.fetch(
+                "SELECT relname FROM pg_class WHERE relnamespace = 'public'::regnamespace AND relkind IN ('r', 'p')"
+            )}
+
+        result = []
+        for definition in self.definitions:
+            current = existing.get(definition.name)
+            if definition.table not in tables:
+                state = "no_table"
+            elif current is None:
+                state = "missing"
+            elif not current["valid"]:
+                # Sobra de um CREATE INDEX CONCURRENTLY interrompido: precisa ser recriado
+                state = "invalid"
+            elif _normalize(current["definition"]) != _normalize(definition.sql):
+                state = "differs"
+            else:
+                state = "ok"
+            result.append({
+                "name": definition.name,
+                "table": definition.table,
+                "state": state,
+                "description": definition.description,
+                "declared": definition.sql,
+                "current": current["definition"] if current else None,
+            })
+        return result
+
+    async def ensure(self, db_pool: asyncpg.Pool, concurrently: bool = True) -> Dict[str, Any]:
+        started = time.perf_counter()
+        created, failed = [], {}
+
+        async with db_pool.acquire(profile="maintenance") as connection:
+            # Vários workers subindo juntos disputariam o mesmo CREATE INDEX CONCURRENTLY
+            if not await connection.fetchval("SELECT pg_try_advisory_lock($1)", self.LOCK_KEY):
+                logger.info("Criação de índices já em andamento em outro processo")
+                return {"created": [], "failed": {}, "skipped": True,
+                        "duration_ms": round((time.perf_counter() - started) * 1000, 1)}
+            try:
+                # Estado lido já com o lock: outro processo pode ter acabado de criar os índices
+                status = {entry["name"]: entry["state"] for entry in await self.check(db_pool)}
+                partitioned = await self._partitioned_tables(connection)
+                for definition in self.definitions:
+                    state = status.get(definition.name)
+                    if state not in ("missing", "invalid"):
+                        continue
+                    # CONCURRENTLY não existe para tabela particionada (o CREATE INDEX normal propaga às partições)
+                    use_concurrently = concurrently and definition.table not in partitioned
+                    try:
+                        if state == "invalid":
+                            await connection.execute(f"DROP INDEX {'CONCURRENTLY ' if use_concurrently else ''}IF EXISTS {definition.name}")
+                        index_started = time.perf_counter()
+                        await connection.execute(definition.create_sql(use_concurrently))
+                        created.append(definition.name)
+                        logger.info(f"Índice {definition.name} criado em {(time.perf_counter() - index_started) * 1000:.0f}ms")
+                    except Exception as e:
+                        failed[definition.name] = str(e)
+                        logger.error(f"Erro criando índice {definition.name}: {str(e)}")
+            finally:
+                await connection.execute("SELECT pg_advisory_unlock($1)", self.LOCK_KEY)
+
+        self.last_run = {
+            "created": created,
+            "failed": failed,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+        return self.last_run
+
+    async def report(self, db_pool: asyncpg.Pool, min_seq_tup_read: int = 1_000_000, statements: int = 10) -> Dict[str, Any]:
+        """Índices declarados x existentes, índices sem uso e tabelas lidas por seq scan (pg_stat_*)."""
+        declared = await self.check(db_pool)
+        declared_names = {definition.name for definition in self.definitions}
+
+        async with db_pool.acquire() as connection:
+            unused = await connection.fetch("""
+                SELECT s.relname AS table_name, s.indexrelname AS name, s.idx_scan,
+                       pg_relation_size(s.indexrelid) AS size_bytes,
+                       pg_size_pretty(pg_relation_size(s.indexrelid)) AS size
+                FROM pg_stat_user_indexes s
+                JOIN pg_index i ON i.indexrelid = s.indexrelid
+                WHERE s.idx_scan = 0 AND NOT i.indisunique AND NOT i.indisprimary
+                ORDER BY pg_relation_size(s.indexrelid) DESC
+            """)
+            seq_heavy = await connection.fetch("""
+                SELECT relname AS table_name, seq_scan, seq_tup_read, idx_scan, n_live_tup,
+                       seq_tup_read / NULLIF(seq_scan, 0) AS avg_rows_per_seq_scan
+                FROM pg_stat_user_tables
+                WHERE seq_tup_read >= $1
+                ORDER BY seq_tup_read DESC
+            """, min_seq_tup_read)
+            stats_reset = await connection.fetchval(
+                "SELECT stats_reset FROM pg_stat_database WHERE datname = current_database()"
+            )
+
+            top_statements = None
+            statements_error = None
+            # total_exec_time/mean_exec_time a partir do PostgreSQL 13; antes, total_time/mean_time
+            for total, mean in (("total_exec_time", "mean_exec_time"), ("total_time", "mean_time")):
+                try:
+                    top_statements = [dict(row) for row in await connection.fetch(f"""
+                        SELECT queryid, calls, ROUND({total}::numeric, 1) AS total_ms,
+                               ROUND({mean}::numeric, 1) AS mean_ms, rows,
+                               shared_blks_read, LEFT(query, 300) AS query
+                        FROM pg_stat_statements
+                        WHERE dbid = (SELECT oid FROM pg_database WHERE datname = current_database())
+                        ORDER BY {total} DESC
+                        LIMIT $1
+                    """, statements)]
+                    break
+                except asyncpg.exceptions.UndefinedColumnError:
+                    continue
+                except (asyncpg.exceptions.UndefinedTableError, asyncpg.exceptions.ObjectNotInPrerequisiteStateError) as e:
+                    statements_error = f"pg_stat_statements indisponível: {e}"
+                    break
+
+        return {
+            "stats_since": stats_reset.isoformat() if stats_reset else None,
+            "declared": declared,
+            "missing": [entry["name"] for entry in declared if entry["state"] in ("missing", "invalid")],
+            "unused": [
+                {**dict(row), "declared": row["name"] in declared_names}
+                for row in unused
+            ],
+            "seq_scan_heavy_tables": [dict(row) for row in seq_heavy],
+            "top_statements": top_statements,
+            "top_statements_error": statements_error,
+        }
+
+    async def _ensure_in_background(self, db_pool: asyncpg.Pool) -> None:
+        try:
+            result = await self.ensure(db_pool)
+            if result["created"] or result["failed"]:
+                logger.info(f"Índices: {len(result['created'])} criados, {len(result['failed'])} com erro")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Erro na checagem de índices: {str(e)}")
+
+    def start(self, db_pool: asyncpg.Pool) -> None:
+        # Em segundo plano: um CREATE INDEX CONCURRENTLY em sales pode levar minutos
+        if self._task is None and settings.DB_INDEXES_ENSURE_ON_STARTUP:
+            self._task = asyncio.create_task(self._ensure_in_background(db_pool))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+index_manager = IndexManager()
+
+
+async def _main(argv: Optional[List[str]] = None) -> None:
+    import argparse
+    import json
+
+    from app.core.database import database
+
+    parser = argparse.ArgumentParser(description="Índices declarados em database/indexes.sql")
+    parser.add_argument("command", choices=["check", "ensure", "report"])
+    parser.add_argument("--no-concurrently", action="store_true", help="CREATE INDEX sem CONCURRENTLY (bloqueia escrita)")
+    args = parser.parse_args(argv)
+
+    await database.connect()
+    try:
+        if args.command == "check":
+            result: Any = await index_manager.check(database.pool)
+        elif args.command == "ensure":
+            result = await index_manager.ensure(database.pool, concurrently=not args.no_concurrently)
+        else:
+            result = await index_manager.report(database.pool)
+        print(json.dumps(result, indent=2, ensure_ascii=False, default=str))
+    finally:
+        await database.disconnect()
+
+
+if __name__ == "__main__":
+    # python -m app.services.indexes check|ensure|report
+    asyncio.run(_main())
@@ -0,0 +1,34 @@
+import math
+from typing import Any, Dict, List, Tuple
+
+# mode=preview: versões das queries do catálogo que leem a amostra sales_sample (categoria "preview")
+# e devolvem estimativas escaladas; cada coluna <x>_var vira o intervalo <x>_low/<x>_high
+PREVIEW_QUERIES: Dict[Tuple[str, str], str] = {
+    ("vendas_e_desempenho", "total_sales_period"): "total_sales_period",
+    ("vendas_e_desempenho", "top_sales_channel"): "top_sales_channel",
+    ("vendas_e_desempenho", "cancellation_rate"): "cancellation_rate",
+    ("produtos", "top_revenue_categories"): "top_revenue_categories",
+    ("produtos", "top_bottom_products"): "top_bottom_products",
+}
+
+PREVIEW_CATEGORY = "preview"
+# ~95% de confiança
+CONFIDENCE_Z = 1.96
+
+
+def with_confidence_intervals(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Troca cada <x>_var por <x>_low/<x>_high (estimativa ± 1.96 erros padrão). Não muta as linhas do cache."""
+    result = []
+    for row in rows:
+        data = {}
+        for key, value in row.items():
+            if not key.endswith("_var"):
+                data[key] = value
+                continue
+            base = key[:-4]
+            estimate = float(row.get(base) or 0)
+            margin = CONFIDENCE_Z * math.sqrt(max(float(value or 0), 0.0))
+            data[f"{base}_low"] = round(max(estimate - margin, 0.0), 2)
+            data[f"{base}_high"] = round(estimate + margin, 2)
+        result.append(data)
+    return result
@@ -0,0 +1,180 @@
+import math
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import asyncpg
+
+# Histogramas com buckets logarítmicos (estilo DDSketch) em sales_time_buckets_daily, um por
+# (dia, loja, canal, métrica). Juntar é somar contagens por bucket, então qualquer período e
+# conjunto de lojas/canais sai do rollup; o valor devolvido fica a no máximo RELATIVE_ACCURACY
+# do percentil real.
+RELATIVE_ACCURACY = 0.02
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+# Bucket dos valores abaixo de 1 segundo (na prática, zero)
+ZERO_BUCKET = -1
+
+METRICS = {
+    "production": "production_seconds",
+    "delivery": "delivery_seconds",
+}
+
+# group_by -> (coluna de sales, join para o nome, expressão do nome)
+GROUPS = {
+    "store": ("store_id", "LEFT JOIN stores g ON g.id = b.group_id", "g.name"),
+    "channel": ("channel_id", "LEFT JOIN channels g ON g.id = b.group_id", "g.name"),
+    "none": ("0", "", "NULL::text"),
+}
+
+DEFAULT_PERCENTILES = (50.0, 90.0, 99.0)
+
+
+def bucket_sql(seconds: str) -> str:
+    return f"CASE WHEN {seconds} < 1 THEN {ZERO_BUCKET} ELSE CEIL(LN({seconds}) / LN({GAMMA!r})) END::smallint"
+
+
+def bucket_value(bucket: int) -> float:
+    # Ponto do bucket (γ^(i-1), γ^i] com erro relativo simétrico nas duas pontas
+    if bucket == ZERO_BUCKET:
+        return 0.0
+    return 2 * GAMMA ** bucket / (GAMMA + 1)
+
+
+def percentiles_from_buckets(buckets: Sequence[Tuple[int, int]], percentiles: Sequence[float]) -> Dict[str, Optional[float]]:
+    """buckets: (bucket, contagem) em ordem crescente de bucket."""
+    total = sum(count for _, count in buckets)
+    result: Dict[str, Optional[float]] = {}
+    for percentile in percentiles:
+        if total == 0:
+            result[_label(percentile)] = None
+            continue
+        rank = percentile / 100 * (total - 1)
+        seen = 0
+        for bucket, count in buckets:
+            seen += count
+            if seen > rank:
+                result[_label(percentile)] = round(bucket_value(bucket), 1)
+                break
+    return result
+
+
+def _label(percentile: float) -> str:
+    return f"p{percentile:g}".replace(".", "_")
+
+
+def _check(metric: str, group_by: str) -> Tuple[str, Tuple[str, str, str]]:
+    if metric not in METRICS:
+        raise ValueError(f"Métrica desconhecida: {metric} (use {', '.join(METRICS)})")
+    if group_by not in GROUPS:
+        raise ValueError(f"Agrupamento desconhecido: {group_by} (use {', '.join(GROUPS)})")
+    return METRICS[metric], GROUPS[group_by]
+
+
+def _sketch_query(metric: str, group_by: str) -> str:
+    column, (key, join, name) = _check(metric, group_by)
+    tail_key = key if key == "0" else f"COALESCE({key}, 0)"
+    return f"""
+        WITH coverage AS (
+            SELECT last_sale_id FROM rollup_state WHERE name = 'sales_time_buckets_daily'
+        ),
+        buckets AS (
+            SELECT {key} AS group_id, bucket, sale_count
+            FROM sales_time_buckets_daily
+            WHERE day BETWEEN $1 AND $2
+            AND metric = '{metric}'
+            AND ($3::int[] IS NULL OR store_id = ANY($3::int[]))
+            AND ($4::int[] IS NULL OR channel_id = ANY($4::int[]))
+            UNION ALL
+            -- Cauda: vendas ainda não consolidadas no rollup
+            SELECT {tail_key}, {bucket_sql(column)}, COUNT(*)
+            FROM sales
+            WHERE id > COALESCE((SELECT last_sale_id FROM coverage), 0)
+            AND created_at >= $1::date AND created_at < $2::date + 1
+            AND sale_status_desc = 'COMPLETED'
+            AND {column} IS NOT NULL
+            AND ($3::int[] IS NULL OR store_id = ANY($3::int[]))
+            AND ($4::int[] IS NULL OR channel_id = ANY($4::int[]))
+            GROUP BY 1, 2
+        )
+        SELECT b.group_id, {name} AS group_name, b.bucket, SUM(b.sale_count)::bigint AS sale_count
+        FROM buckets b
+        {join}
+        GROUP BY b.group_id, {name}, b.bucket
+        ORDER BY b.group_id, b.bucket
+    """
+
+
+def _exact_query(metric: str, group_by: str) -> str:
+    column, (key, join, name) = _check(metric, group_by)
+    return f"""
+        SELECT b.group_id, {name} AS group_name, COUNT(*) AS sale_count,
+               PERCENTILE_CONT($5::float8[]) WITHIN GROUP (ORDER BY b.seconds::float8) AS percentiles
+        FROM (
+            SELECT {key if key == "0" else f"COALESCE({key}, 0)"} AS group_id, {column} AS seconds
+            FROM sales
+            WHERE created_at >= $1::date AND created_at < $2::date + 1
+            AND sale_status_desc = 'COMPLETED'
+            AND {column} IS NOT NULL
+            AND ($3::int[] IS NULL OR store_id = ANY($3::int[]))
+            AND ($4::int[] IS NULL OR channel_id = ANY($4::int[]))
+        ) b
+        {join}
+        GROUP BY b.group_id, {name}
+        ORDER BY b.group_id
+    """
+
+
+async def sketch_percentiles(db_pool: asyncpg.Pool, metric: str, start_date: date, end_date: date,
+                             group_by: str = "store", store_ids: Optional[List[int]] = None,
+                             channel_ids: Optional[List[int]] = None,
+                             percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> List[Dict[str, Any]]:
+    rows = await db_pool.fetch(_sketch_query(metric, group_by), start_date, end_date, store_ids, channel_ids)
+
+    groups: Dict[int, Dict[str, Any]] = {}
+    for row in rows:
+        group = groups.setdefault(row["group_id"], {"name": row["group_name"], "buckets": []})
+        group["buckets"].append((row["bucket"], row["sale_count"]))
+
+    return [
+        {
+            "group_id": group_id if group_by != "none" else None,
+            "group_name": group["name"],
+            "count": sum(count for _, count in group["buckets"]),
+            **percentiles_from_buckets(group["buckets"], percentiles),
+        }
+        for group_id, group in groups.items()
+    ]
+
+
+async def exact_percentiles(db_pool: asyncpg.Pool, metric: str, start_date: date, end_date: date,
+                            group_by: str = "store", store_ids: Optional[List[int]] = None,
+                            channel_ids: Optional[List[int]] = None,
+                            percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> List[Dict[str, Any]]:
+    """PERCENTILE_CONT direto em sales: caro, serve para validar a precisão dos sketches."""
+    fractions = [percentile / 100 for percentile in percentiles]
+    rows = await db_pool.fetch(_exact_query(metric, group_by), start_date, end_date, store_ids, channel_ids, fractions)
+    return [
+        {
+            "group_id": row["group_id"] if group_by != "none" else None,
+            "group_name": row["group_name"],
+            "count": row["sale_count"],
+            **{
+                _label(percentile): round(value, 1) if value is not None else None
+                for percentile, value in zip(percentiles, row["percentiles"] or [None] * len(percentiles))
+            },
+        }
+        for row in rows
+    ]
+
+
+def max_relative_error(sketch: List[Dict[str, Any]], exact: List[Dict[str, Any]]) -> Optional[float]:
+    """Maior erro relativo entre os percentis do sketch e os exatos (para o modo compare)."""
+    exact_by_group = {row["group_id"]: row for row in exact}
+    errors = []
+    for row in sketch:
+        reference = exact_by_group.get(row["group_id"])
+        if reference is None:
+            continue
+        for key, value in row.items():
+            if key.startswith("p") and value is not None and reference.get(key):
+                errors.append(abs(value - reference[key]) / reference[key])
+    return round(max(errors), 4) if errors else None
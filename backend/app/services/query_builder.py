@@ -1,49 +1,160 @@
+import asyncio
+import logging
+import time
 import asyncpg
-import os
 from typing import Dict, List, Any, Tuple, Optional
 from datetime import date
-from pathlib import Path
+from app.core.metrics import query_metrics
+from app.services.comparison import COMPARISON_CATEGORY, COMPARISON_QUERIES, with_deltas
+from app.services.preview import PREVIEW_CATEGORY, PREVIEW_QUERIES, with_confidence_intervals
+from app.services.query_catalog import QueryCatalog, query_catalog
+from app.services.result_cache import ResultCache, result_cache
+from app.services.rollups import RollupManager, rollup_manager
+from app.services.slow_query_log import SlowQueryLog, slow_query_log
+
+logger = logging.getLogger(__name__)
 
 class QueryBuilder:
-    def __init__(self, db_pool: asyncpg.Pool):
+    def __init__(self, db_pool: asyncpg.Pool, catalog: Optional[QueryCatalog] = None, cache: Optional[ResultCache] = None, rollups: Optional[RollupManager] = None, slow_log: Optional[SlowQueryLog] = None):
         self.db_pool = db_pool
-        self.queries_base_path = Path("database/queries")
+        self.catalog = catalog or query_catalog
+        self.cache = cache or result_cache
+        self.rollups = rollups or rollup_manager
+        self.slow_log = slow_log or slow_query_log
     
     async def load_query(self, category: str, query_name: str) -> str:
-        query_path = self.queries_base_path / category / f"{query_name}.sql"
-        
-        print(f"🔍 Buscando query: {query_path}")
-        
-        if not query_path.exists():
-            raise FileNotFoundError(f"Query não encontrada: {query_path}")
-        
-        with open(query_path, 'r', encoding='utf-8') as f:
-            query_content = f.read()
-            print(f"✅ Query carregada: {query_path} ({len(query_content)} chars)")
-            return query_content
+        return self.catalog.get(category, query_name).sql
     
     async def execute_query(self, category: str, query_name: str, params: Optional[Tuple] = None) -> List[Dict]:
         try:
-            query = await self.load_query(category, query_name)
+            query = self.catalog.get(category, query_name)
+            args = self.catalog.bind_params(query, params)
             
-            print(f"🚀 Executando query: {category}/{query_name}")
-            print(f"📋 Parâmetros: {params}")
-            print(f"📝 Query preview: {query[:200]}...")
-            
-            async with self.db_pool.acquire() as connection:
-                if params and any(f'${i+1}' in query for i in range(len(params))):
-                    print(f"🔧 Query USA parâmetros: {params}")
-                    result = await connection.fetch(query, *params)
-                else:
-                    print("🔧 Query SEM parâmetros")
-                    result = await connection.fetch(query)
-                
-                print(f"✅ Query executada com sucesso: {len(result)} resultados")
-                return [dict(row) for row in result]
+            return await self.cache.get_or_compute(
+                query.query_id,
+                args,
+                lambda: self._fetch(category, query_name, args),
+                db_pool=self.db_pool
+            )
                 
         except Exception as e:
-            print(f"❌ Erro executando query {category}/{query_name}: {e}")
+            logger.error(f"Erro executando query {category}/{query_name}: {e}")
             raise e
+    
+    async def execute_query_json(self, category: str, query_name: str, params: Optional[Tuple] = None,
+                                 limit: Optional[int] = None) -> str:
+        """Mesmo resultado de execute_query, mas já como texto JSON montado pelo Postgres (json_agg)."""
+        try:
+            query = self.catalog.get(category, query_name)
+            args = self.catalog.bind_params(query, params)
+            
+            # Mesmo query_id (a invalidação por query continua valendo); o marcador separa as entradas
+            return await self.cache.get_or_compute(
+                query.query_id,
+                args + ("json", limit),
+                lambda: self._fetch_json(category, query_name, args, limit),
+                db_pool=self.db_pool
+            )
+        except Exception as e:
+            logger.error(f"Erro executando query {category}/{query_name} (json): {e}")
+            raise e
+    
+    async def execute_preview(self, category: str, query_name: str, params: Optional[Tuple] = None) -> Optional[List[Dict]]:
+        """Estimativa a partir de sales_sample, com intervalos de ~95%; None quando a prévia não se aplica."""
+        preview_name = PREVIEW_QUERIES.get((category, query_name))
+        if preview_name is None:
+            return None
+        # Com um rollup atualizado a resposta exata já é rápida; a amostra precisa estar em dia
+        if await self.rollups.route(self.db_pool, category, query_name) != (category, query_name):
+            return None
+        if not await self.rollups.is_fresh(self.db_pool, "sales_sample"):
+            return None
+        
+        rows = await self.execute_query(PREVIEW_CATEGORY, preview_name, params)
+        return with_confidence_intervals(rows)
+    
+    async def execute_comparison(self, category: str, query_name: str, params: Tuple,
+                                 compare_start: date, compare_end: date) -> Optional[List[Dict]]:
+        """Período de params e o de comparação numa query só, com deltas; None sem versão de comparação."""
+        comparison_name = COMPARISON_QUERIES.get((category, query_name))
+        if comparison_name is None:
+            return None
+        
+        rows = await self.execute_query(COMPARISON_CATEGORY, comparison_name, tuple(params) + (compare_start, compare_end))
+        return with_deltas(rows)
+    
+    async def execute_batch(self, queries: List[Tuple[str, str, str, Tuple]], deadline_ms: int) -> Dict[str, Dict[str, Any]]:
+        started = time.perf_counter()
+        
+        async def run(category: str, query_name: str, params: Tuple) -> Tuple[List[Dict], float]:
+            query_started = time.perf_counter()
+            data = await self.execute_query(category, query_name, params)
+            return data, (time.perf_counter() - query_started) * 1000
+        
+        tasks = {
+            key: asyncio.create_task(run(category, query_name, params))
+            for key, category, query_name, params in queries
+        }
+        done, pending = await asyncio.wait(tasks.values(), timeout=deadline_ms / 1000)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        
+        results = {}
+        for key, task in tasks.items():
+            if task in pending:
+                results[key] = {"success": False, "error": f"Prazo do lote excedido ({deadline_ms}ms)"}
+            elif task.exception() is not None:
+                results[key] = {"success": False, "error": str(task.exception())}
+            else:
+                data, duration_ms = task.result()
+                results[key] = {"success": True, "data": data, "duration_ms": round(duration_ms, 1)}
+        
+        logger.debug(f"Lote com {len(queries)} queries em {(time.perf_counter() - started) * 1000:.0f}ms ({len(pending)} estouraram o prazo)")
+        return results
+    
+    async def _fetch(self, category: str, query_name: str, params: Tuple) -> List[Dict]:
+        query_id = f"{category}/{query_name}"
+        routed = self.catalog.get(*await self.rollups.route(self.db_pool, category, query_name))
+        
+        # Só o tempo da query: a espera pelo pool já é medida em /metrics/pool
+        async def fetch(connection):
+            started = time.perf_counter()
+            try:
+                rows = await self.catalog.fetch(connection, routed.category, routed.name, params)
+            except Exception:
+                query_metrics.observe_query(query_id, time.perf_counter() - started, error=True)
+                raise
+            return rows, time.perf_counter() - started
+        
+        # run(): numa réplica que cai no meio, a query é refeita no primário
+        result, elapsed = await self.db_pool.run(fetch)
+        
+        # Métrica e log de lentas ficam com o id lógico, mesmo quando a query foi roteada para um rollup
+        query_metrics.observe_query(query_id, elapsed, len(result))
+        self.slow_log.observe(self.db_pool, routed.sql, params, elapsed, query_id=query_id)
+        logger.debug(f"Query {query_id} ({routed.query_id}): {len(result)} linhas em {elapsed * 1000:.1f}ms")
+        return [dict(row) for row in result]
+
+    async def _fetch_json(self, category: str, query_name: str, params: Tuple, limit: Optional[int]) -> str:
+        query_id = f"{category}/{query_name}"
+        routed = self.catalog.get(*await self.rollups.route(self.db_pool, category, query_name))
+        
+        async def fetch(connection):
+            started = time.perf_counter()
+            try:
+                body = await self.catalog.fetch_json(connection, routed.category, routed.name, params, limit)
+            except Exception:
+                query_metrics.observe_query(query_id, time.perf_counter() - started, error=True)
+                raise
+            return body, time.perf_counter() - started
+        
+        data, elapsed = await self.db_pool.run(fetch)
+        
+        query_metrics.observe_query(query_id, elapsed)
+        self.slow_log.observe(self.db_pool, self.catalog.as_json(routed).sql, params + (limit,), elapsed, query_id=query_id)
+        return data
 
     async def get_total_sales_period(self, start_date: date, end_date: date) -> List[Dict]:
         return await self.execute_query('vendas_e_desempenho', 'total_sales_period', (start_date, end_date))
@@ -89,6 +200,10 @@ class QueryBuilder:
     
     async def get_low_margin_products(self, start_date: date, end_date: date) -> List[Dict]:
         return await self.execute_query('produtos', 'low_margin_products', (start_date, end_date))
+    
+    async def get_product_weekday_hour(self, start_date: date, end_date: date, day_of_week: Optional[int] = None,
+                                       hour_start: Optional[int] = None, hour_end: Optional[int] = None, limit: int = 50) -> List[Dict]:
+        return await self.execute_query('produtos', 'product_weekday_hour', (start_date, end_date, day_of_week, hour_start, hour_end, limit))
 
     async def get_total_customers(self) -> List[Dict]:
         return await self.execute_query('clientes', 'total_customers')
@@ -102,6 +217,13 @@ class QueryBuilder:
     async def get_avg_orders_per_customer(self, start_date: date, end_date: date) -> List[Dict]:
         return await self.execute_query('clientes', 'avg_orders_per_customer', (start_date, end_date))
 
+    async def get_customer_metrics(self, start_date: date, end_date: date, at_risk_days: int, lost_days: int) -> List[Dict]:
+        return await self.execute_query('clientes', 'customer_metrics', (start_date, end_date, at_risk_days, lost_days))
+
+    async def get_customer_segment(self, as_of: date, min_orders: int, min_days: int, max_days: Optional[int] = None,
+                                   store_id: Optional[int] = None, limit: int = 100) -> List[Dict]:
+        return await self.execute_query('clientes', 'customer_segment', (as_of, min_orders, min_days, max_days, store_id, limit))
+
     async def get_avg_delivery_time_by_channel(self, start_date: date, end_date: date) -> List[Dict]:
         return await self.execute_query('entregas', 'avg_delivery_time_by_channel', (start_date, end_date))
     
@@ -0,0 +1,200 @@
+import asyncio
+import hashlib
+import logging
+import re
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import asyncpg
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUERIES_DIR = Path(__file__).resolve().parents[2] / "database" / "queries"
+
+_PLACEHOLDER_RE = re.compile(r"\$(\d+)")
+_LINE_COMMENT_RE = re.compile(r"--[^\n]*")
+_STRING_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+
+
+@dataclass(frozen=True)
+class CatalogQuery:
+    category: str
+    name: str
+    sql: str
+    path: Path
+    param_count: int
+    statement_name: str
+    mtime: float
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        return (self.category, self.name)
+
+    @property
+    def query_id(self) -> str:
+        return f"{self.category}/{self.name}"
+
+
+def _strip_sql_noise(sql: str) -> str:
+    return _STRING_LITERAL_RE.sub("''", _LINE_COMMENT_RE.sub("", sql))
+
+
+def validate_sql(sql: str) -> int:
+    body = _strip_sql_noise(sql).strip()
+    if not body:
+        raise ValueError("arquivo vazio")
+    if ";" in body.rstrip(";").rstrip():
+        raise ValueError("mais de um statement no mesmo arquivo")
+    if "%(" in body:
+        raise ValueError("placeholders no formato psycopg (%(nome)s); use $1, $2, ...")
+
+    placeholders = sorted({int(n) for n in _PLACEHOLDER_RE.findall(body)})
+    if placeholders and placeholders != list(range(1, placeholders[-1] + 1)):
+        raise ValueError(f"placeholders não sequenciais: {placeholders}")
+    return placeholders[-1] if placeholders else 0
+
+
+def _statement_name(sql: str) -> str:
+    return "gla_" + hashlib.sha1(sql.encode("utf-8")).hexdigest()[:20]
+
+
+class QueryCatalog:
+    def __init__(self, base_path: Optional[Path] = None, hot_reload: bool = False):
+        self.base_path = Path(base_path) if base_path else DEFAULT_QUERIES_DIR
+        self.hot_reload = hot_reload
+        self._queries: Dict[Tuple[str, str], CatalogQuery] = {}
+        self.errors: Dict[Tuple[str, str], str] = {}
+        self._json_variants: Dict[str, CatalogQuery] = {}
+        self.loaded = False
+
+    def load(self) -> None:
+        queries: Dict[Tuple[str, str], CatalogQuery] = {}
+        errors: Dict[Tuple[str, str], str] = {}
+
+        for path in sorted(self.base_path.glob("*/*.sql")):
+            key = (path.parent.name, path.stem)
+            try:
+                queries[key] = self._read(path)
+            except (OSError, UnicodeDecodeError, ValueError) as e:
+                errors[key] = str(e)
+                logger.warning(f"Query inválida no catálogo {key[0]}/{key[1]}: {e}")
+
+        self._queries = queries
+        self.errors = errors
+        self._json_variants = {}
+        self.loaded = True
+        logger.info(f"Catálogo SQL carregado: {len(queries)} queries, {len(errors)} inválidas ({self.base_path})")
+
+    def _read(self, path: Path) -> CatalogQuery:
+        sql = path.read_text(encoding="utf-8")
+        param_count = validate_sql(sql)
+        return CatalogQuery(
+            category=path.parent.name,
+            name=path.stem,
+            sql=sql,
+            path=path,
+            param_count=param_count,
+            statement_name=_statement_name(sql),
+            mtime=path.stat().st_mtime,
+        )
+
+    def _reload_if_changed(self, key: Tuple[str, str]) -> None:
+        path = self.base_path / key[0] / f"{key[1]}.sql"
+        current = self._queries.get(key)
+        try:
+            mtime = path.stat().st_mtime
+        except FileNotFoundError:
+            self._queries.pop(key, None)
+            return
+
+        if current is not None and current.mtime == mtime:
+            return
+
+        try:
+            self._queries[key] = self._read(path)
+            self.errors.pop(key, None)
+            logger.info(f"Query recarregada: {key[0]}/{key[1]}")
+        except (OSError, UnicodeDecodeError, ValueError) as e:
+            self._queries.pop(key, None)
+            self.errors[key] = str(e)
+
+    def get(self, category: str, query_name: str) -> CatalogQuery:
+        if not self.loaded:
+            self.load()
+
+        key = (category, query_name)
+        if self.hot_reload:
+            self._reload_if_changed(key)
+
+        query = self._queries.get(key)
+        if query is not None:
+            return query
+        if key in self.errors:
+            raise ValueError(f"Query inválida {category}/{query_name}: {self.errors[key]}")
+        raise FileNotFoundError(f"Query não encontrada: {self.base_path / category / f'{query_name}.sql'}")
+
+    def keys(self) -> List[Tuple[str, str]]:
+        return sorted(self._queries)
+
+    def as_json(self, query: CatalogQuery) -> CatalogQuery:
+        """Variante que devolve o resultado inteiro como um único texto JSON (array de objetos).
+
+        Recebe um parâmetro extra, $N+1, com o LIMIT (NULL = sem limite). A ordem da query original
+        é mantida: json_agg sozinho não garante ordem, então as linhas são numeradas na subquery e
+        agregadas por esse número. Cada linha entra como o registro inteiro de `base`, sem a coluna
+        de ordem e com as chaves na ordem das colunas.
+        """
+        variant = self._json_variants.get(query.statement_name)
+        if variant is None:
+            body = query.sql.strip().rstrip(";")
+            sql = (
+                "SELECT COALESCE(json_agg(q.item ORDER BY q.__ord), '[]')::text FROM (\n"
+                "SELECT base AS item, row_number() OVER () AS __ord FROM (\n"
+                f"{body}\n) AS base LIMIT ${query.param_count + 1}\n"
+                ") AS q"
+            )
+            variant = replace(query, sql=sql, param_count=query.param_count + 1, statement_name=_statement_name(sql))
+            self._json_variants[query.statement_name] = variant
+        return variant
+
+    def bind_params(self, query: CatalogQuery, params: Optional[Sequence] = None) -> Tuple:
+        params = tuple(params or ())
+        if len(params) < query.param_count:
+            raise ValueError(
+                f"Query {query.query_id} espera {query.param_count} parâmetros, recebeu {len(params)}"
+            )
+        return params[:query.param_count]
+
+    async def prepare(self, connection, query: CatalogQuery):
+        """PreparedStatement para cursores (exportação); vale só enquanto a conexão estiver adquirida."""
+        return await connection.prepare(query.sql)
+
+    async def fetch(self, connection, category: str, query_name: str, params: Optional[Sequence] = None) -> List[asyncpg.Record]:
+        query = self.get(category, query_name)
+        return await self.fetch_query(connection, query, self.bind_params(query, params))
+
+    async def fetch_json(self, connection, category: str, query_name: str, params: Optional[Sequence] = None,
+                         limit: Optional[int] = None) -> str:
+        query = self.get(category, query_name)
+        rows = await self.fetch_query(connection, self.as_json(query), self.bind_params(query, params) + (limit,))
+        return rows[0][0]
+
+    async def fetch_query(self, connection, query: CatalogQuery, args: Tuple) -> List[asyncpg.Record]:
+        # O cache de statements do asyncpg (DB_STATEMENT_CACHE_SIZE) fica na conexão física: o PREPARE
+        # acontece uma vez por conexão e sobrevive às devoluções ao pool, ao contrário de um
+        # PreparedStatement guardado, que o asyncpg invalida quando a conexão volta ao pool.
+        # Mudança de schema (InvalidCachedStatementError) também é tratada por ele.
+        return await connection.fetch(query.sql, *args)
+
+
+query_catalog = QueryCatalog(
+    base_path=Path(settings.QUERIES_DIR) if settings.QUERIES_DIR else None,
+    hot_reload=settings.QUERY_CATALOG_HOT_RELOAD,
+)
+
+
+async def load_query_catalog() -> QueryCatalog:
+    await asyncio.to_thread(query_catalog.load)
+    return query_catalog
@@ -0,0 +1,298 @@
+import asyncio
+import functools
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from app.core.config import settings
+from app.services.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class DataWatermark:
+    sale_id: int
+    last_created_at: Optional[datetime]
+    # Primeira venda da base: muda quando a base é recriada, mesmo que o id máximo cresça
+    first_created_at: Optional[datetime] = None
+
+    @property
+    def last_day(self) -> Optional[date]:
+        return self.last_created_at.date() if self.last_created_at else None
+
+    @property
+    def epoch(self) -> str:
+        return self.first_created_at.isoformat() if self.first_created_at else "empty"
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    expires_at: Optional[float]
+    sale_id: Optional[int]
+
+
+class CacheBackend:
+    async def get(self, key: Hashable) -> Optional[CacheEntry]:
+        raise NotImplementedError
+
+    async def set(self, key: Hashable, entry: CacheEntry) -> None:
+        raise NotImplementedError
+
+    async def delete(self, key: Hashable) -> None:
+        raise NotImplementedError
+
+    async def clear(self, query_id: Optional[str] = None) -> int:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class InMemoryLRUBackend(CacheBackend):
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+
+    async def get(self, key: Hashable) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    async def set(self, key: Hashable, entry: CacheEntry) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def delete(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    async def clear(self, query_id: Optional[str] = None) -> int:
+        if query_id is None:
+            removed = len(self._entries)
+            self._entries.clear()
+            return removed
+
+        keys = [key for key in self._entries if key[0] == query_id]
+        for key in keys:
+            del self._entries[key]
+        return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "memory",
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "evictions": self.evictions,
+        }
+
+
+def normalize_param(value: Any) -> Hashable:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted(normalize_param(v) for v in value))
+    if isinstance(value, (list, tuple)):
+        return tuple(normalize_param(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, normalize_param(v)) for k, v in value.items()))
+    return value
+
+
+def _range_end(params: Tuple) -> Optional[date]:
+    days = []
+    for value in params:
+        if isinstance(value, datetime):
+            days.append(value.date())
+        elif isinstance(value, date):
+            days.append(value)
+        elif isinstance(value, tuple):
+            nested = _range_end(value)
+            if nested is not None:
+                days.append(nested)
+    return max(days) if days else None
+
+
+def range_is_open(end: date, watermark: Optional[DataWatermark]) -> bool:
+    # Períodos que alcançam a última venda (ou hoje) ainda recebem dados novos
+    boundary = date.today()
+    if watermark is not None and watermark.last_day is not None:
+        boundary = min(boundary, watermark.last_day)
+    return end >= boundary
+
+
+def visible_sale_id(db_pool, watermark: Optional[DataWatermark]) -> Optional[int]:
+    """sale_id que uma leitura por db_pool certamente já enxerga.
+
+    O watermark vem do primário; com réplicas atrasadas o resultado pode não ter as últimas vendas,
+    e guardá-lo sob o watermark do primário o deixaria velho até a próxima venda.
+    """
+    if watermark is None:
+        return None
+    replicas = getattr(db_pool, "visible_sale_id", None)
+    replica_sale_id = replicas() if callable(replicas) else None
+    return watermark.sale_id if replica_sale_id is None else min(watermark.sale_id, replica_sale_id)
+
+
+class ResultCache:
+    WATERMARK_QUERY = """
+        SELECT last.id, last.created_at, first.created_at AS first_created_at
+        FROM (SELECT id, created_at FROM sales ORDER BY id DESC LIMIT 1) AS last,
+             (SELECT created_at FROM sales ORDER BY id LIMIT 1) AS first
+    """
+
+    def __init__(self, backend: Optional[CacheBackend] = None, enabled: bool = True, flights: Optional[SingleFlight] = None):
+        self.backend = backend or InMemoryLRUBackend(settings.CACHE_MAX_ENTRIES)
+        self.flights = flights or SingleFlight(settings.SINGLE_FLIGHT_ENABLED)
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.per_query: Dict[str, Dict[str, int]] = {}
+        self._watermark: Optional[DataWatermark] = None
+        self._watermark_checked_at = 0.0
+        self._watermark_lock = asyncio.Lock()
+
+    async def watermark(self, db_pool, force: bool = False) -> Optional[DataWatermark]:
+        fresh = time.monotonic() - self._watermark_checked_at < settings.CACHE_WATERMARK_REFRESH_SECONDS
+        if db_pool is None or (fresh and not force and self._watermark is not None):
+            return self._watermark
+
+        async with self._watermark_lock:
+            if not force and time.monotonic() - self._watermark_checked_at < settings.CACHE_WATERMARK_REFRESH_SECONDS:
+                return self._watermark
+
+            # Sempre do primário: réplicas com atrasos diferentes fariam o sale_id "voltar" e limpar o cache
+            row = await getattr(db_pool, "primary", db_pool).fetchrow(self.WATERMARK_QUERY)
+            current = DataWatermark(row["id"], row["created_at"], row["first_created_at"]) if row else DataWatermark(0, None)
+            if self._watermark is not None and (
+                current.sale_id < self._watermark.sale_id or current.epoch != self._watermark.epoch
+            ):
+                # Base recriada (reset_database/generate_data): nada do que está em cache vale mais
+                logger.info(f"Base de vendas recriada ({self._watermark.sale_id} -> {current.sale_id}), limpando cache")
+                await self.backend.clear()
+            elif self._watermark is not None and current != self._watermark:
+                logger.info(f"Watermark de vendas avançou: {self._watermark.sale_id} -> {current.sale_id}")
+            self._watermark = current
+            self._watermark_checked_at = time.monotonic()
+            return current
+
+    def _ttl_for(self, query_id: str, params: Tuple, watermark: Optional[DataWatermark]) -> Tuple[Optional[float], bool]:
+        end = _range_end(params)
+        if end is None:
+            ttl = settings.CACHE_QUERY_TTLS.get(query_id, settings.CACHE_DEFAULT_TTL_SECONDS)
+            return ttl, False
+
+        if range_is_open(end, watermark):
+            ttl = settings.CACHE_QUERY_TTLS.get(query_id, settings.CACHE_OPEN_RANGE_TTL_SECONDS)
+            return ttl, True
+
+        return settings.CACHE_QUERY_TTLS.get(query_id, settings.CACHE_HISTORICAL_TTL_SECONDS), False
+
+    def _count(self, query_id: str, field: str) -> None:
+        counters = self.per_query.setdefault(query_id, {"hits": 0, "misses": 0})
+        counters[field] += 1
+
+    async def get_or_compute(
+        self,
+        query_id: str,
+        params: Optional[Tuple],
+        compute: Callable[[], Awaitable[Any]],
+        db_pool=None,
+    ) -> Any:
+        params = tuple(params or ())
+        key = (query_id, normalize_param(params))
+        if not self.enabled:
+            return await self.flights.do(query_id, key, compute)
+
+        watermark = await self.watermark(db_pool)
+
+        entry = await self.backend.get(key)
+        if entry is not None:
+            expired = entry.expires_at is not None and entry.expires_at <= time.monotonic()
+            moved = entry.sale_id is not None and watermark is not None and entry.sale_id != watermark.sale_id
+            if not expired and not moved:
+                self.hits += 1
+                self._count(query_id, "hits")
+                return entry.value
+            self.stale += 1
+            await self.backend.delete(key)
+
+        self.misses += 1
+        self._count(query_id, "misses")
+
+        async def load() -> Any:
+            # Lido antes da query: o que a réplica já aplicou até aqui está no resultado
+            visible = visible_sale_id(db_pool, watermark)
+            value = await compute()
+            ttl, watermark_bound = self._ttl_for(query_id, params, watermark)
+            # Entrada de réplica atrasada fica com o sale_id dela: na próxima leitura não bate e é refeita
+            await self.backend.set(key, CacheEntry(
+                value=value,
+                expires_at=time.monotonic() + ttl if ttl is not None else None,
+                sale_id=visible if watermark_bound else None,
+            ))
+            return value
+
+        # Misses simultâneos da mesma chave (e mesmo watermark) compartilham uma execução só
+        sale_id = watermark.sale_id if watermark is not None else None
+        return await self.flights.do(query_id, key + (sale_id,), load)
+
+    async def invalidate(self, query_id: Optional[str] = None) -> int:
+        removed = await self.backend.clear(query_id)
+        logger.info(f"Cache invalidado ({query_id or 'tudo'}): {removed} entradas")
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "watermark": {
+                "sale_id": self._watermark.sale_id,
+                "last_created_at": self._watermark.last_created_at.isoformat() if self._watermark.last_created_at else None,
+                "epoch": self._watermark.epoch,
+            } if self._watermark else None,
+            "per_query": self.per_query,
+            "single_flight": self.flights.stats(),
+            **self.backend.stats(),
+        }
+
+
+result_cache = ResultCache(enabled=settings.CACHE_ENABLED)
+
+
+def cached_result(query_id: str):
+    # Os valores em cache são compartilhados entre requisições: quem chama não deve mutá-los
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            cache = getattr(self, "cache", None)
+            if cache is None:
+                return await func(self, *args, **kwargs)
+
+            params = args + tuple(sorted(kwargs.items()))
+            return await cache.get_or_compute(
+                query_id,
+                params,
+                lambda: func(self, *args, **kwargs),
+                db_pool=getattr(self, "db_pool", None),
+            )
+        return wrapper
+    return decorator
@@ -0,0 +1,574 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import asyncpg
+from app.core.config import settings
+from app.services.hll import HASH_SQL, register_sql, rho_sql
+from app.services.quantiles import bucket_sql
+from app.services.result_cache import result_cache
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_STATE_DDL = """
+    CREATE TABLE IF NOT EXISTS rollup_state (
+        name VARCHAR(100) PRIMARY KEY,
+        last_sale_id BIGINT NOT NULL DEFAULT 0,
+        refreshed_at TIMESTAMP
+    )
+"""
+
+
+@dataclass(frozen=True)
+class RollupDefinition:
+    name: str
+    ddl: List[str]
+    # $1 = último sale id já processado, $2 = maior sale id incluído neste lote
+    refresh_sql: str
+    # Parâmetros extras ($3 em diante), lidos a cada refresh
+    refresh_args: Callable[[], Tuple[Any, ...]] = tuple
+
+
+@dataclass
+class RollupState:
+    last_sale_id: int
+    refreshed_at: Optional[datetime]
+
+
+SALES_DAILY = RollupDefinition(
+    name="sales_daily",
+    ddl=[
+        """
+        CREATE TABLE IF NOT EXISTS sales_daily (
+            day DATE NOT NULL,
+            store_id INTEGER NOT NULL,
+            channel_id INTEGER NOT NULL,
+            sale_status_desc VARCHAR(100) NOT NULL,
+            order_count BIGINT NOT NULL DEFAULT 0,
+            total_amount NUMERIC NOT NULL DEFAULT 0,
+            total_amount_sq NUMERIC NOT NULL DEFAULT 0,
+            total_discount NUMERIC NOT NULL DEFAULT 0,
+            delivery_fee NUMERIC NOT NULL DEFAULT 0,
+            service_tax_fee NUMERIC NOT NULL DEFAULT 0,
+            production_seconds_sum BIGINT NOT NULL DEFAULT 0,
+            production_count BIGINT NOT NULL DEFAULT 0,
+            delivery_seconds_sum BIGINT NOT NULL DEFAULT 0,
+            delivery_count BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, store_id, channel_id, sale_status_desc)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_sales_daily_store_day ON sales_daily(store_id, day)",
+    ],
+    refresh_sql="""
+        INSERT INTO sales_daily (
+            day, store_id, channel_id, sale_status_desc,
+            order_count, total_amount, total_amount_sq, total_discount,
+            delivery_fee, service_tax_fee,
+            production_seconds_sum, production_count,
+            delivery_seconds_sum, delivery_count
+        )
+        SELECT
+            DATE(created_at),
+            COALESCE(store_id, 0),
+            COALESCE(channel_id, 0),
+            sale_status_desc,
+            COUNT(*),
+            COALESCE(SUM(total_amount), 0),
+            COALESCE(SUM(total_amount * total_amount), 0),
+            COALESCE(SUM(total_discount), 0),
+            COALESCE(SUM(delivery_fee), 0),
+            COALESCE(SUM(service_tax_fee), 0),
+            COALESCE(SUM(production_seconds), 0),
+            COUNT(production_seconds),
+            COALESCE(SUM(delivery_seconds), 0),
+            COUNT(delivery_seconds)
+        FROM sales
+        WHERE id > $1 AND id <= $2
+        GROUP BY 1, 2, 3, 4
+        ON CONFLICT (day, store_id, channel_id, sale_status_desc) DO UPDATE SET
+            order_count = sales_daily.order_count + EXCLUDED.order_count,
+            total_amount = sales_daily.total_amount + EXCLUDED.total_amount,
+            total_amount_sq = sales_daily.total_amount_sq + EXCLUDED.total_amount_sq,
+            total_discount = sales_daily.total_discount + EXCLUDED.total_discount,
+            delivery_fee = sales_daily.delivery_fee + EXCLUDED.delivery_fee,
+            service_tax_fee = sales_daily.service_tax_fee + EXCLUDED.service_tax_fee,
+            production_seconds_sum = sales_daily.production_seconds_sum + EXCLUDED.production_seconds_sum,
+            production_count = sales_daily.production_count + EXCLUDED.production_count,
+            delivery_seconds_sum = sales_daily.delivery_seconds_sum + EXCLUDED.delivery_seconds_sum,
+            delivery_count = sales_daily.delivery_count + EXCLUDED.delivery_count
+    """,
+)
+
+SALES_HOURLY = RollupDefinition(
+    name="sales_hourly",
+    ddl=[
+        """
+        CREATE TABLE IF NOT EXISTS sales_hourly (
+            day DATE NOT NULL,
+            hour SMALLINT NOT NULL,
+            store_id INTEGER NOT NULL,
+            channel_id INTEGER NOT NULL,
+            sale_status_desc VARCHAR(100) NOT NULL,
+            order_count BIGINT NOT NULL DEFAULT 0,
+            total_amount NUMERIC NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, hour, store_id, channel_id, sale_status_desc)
+        )
+        """,
+    ],
+    refresh_sql="""
+        INSERT INTO sales_hourly (
+            day, hour, store_id, channel_id, sale_status_desc, order_count, total_amount
+        )
+        SELECT
+            DATE(created_at),
+            EXTRACT(HOUR FROM created_at)::smallint,
+            COALESCE(store_id, 0),
+            COALESCE(channel_id, 0),
+            sale_status_desc,
+            COUNT(*),
+            COALESCE(SUM(total_amount), 0)
+        FROM sales
+        WHERE id > $1 AND id <= $2
+        GROUP BY 1, 2, 3, 4, 5
+        ON CONFLICT (day, hour, store_id, channel_id, sale_status_desc) DO UPDATE SET
+            order_count = sales_hourly.order_count + EXCLUDED.order_count,
+            total_amount = sales_hourly.total_amount + EXCLUDED.total_amount
+    """,
+)
+
+# Só vendas concluídas: todas as análises de produto filtram COMPLETED
+PRODUCT_SALES_HOURLY = RollupDefinition(
+    name="product_sales_hourly",
+    ddl=[
+        """
+        CREATE TABLE IF NOT EXISTS product_sales_hourly (
+            day DATE NOT NULL,
+            hour SMALLINT NOT NULL,
+            store_id INTEGER NOT NULL,
+            channel_id INTEGER NOT NULL,
+            product_id INTEGER NOT NULL,
+            order_count BIGINT NOT NULL DEFAULT 0,
+            total_quantity NUMERIC NOT NULL DEFAULT 0,
+            total_revenue NUMERIC NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, hour, store_id, channel_id, product_id)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_product_sales_hourly_product_day ON product_sales_hourly(product_id, day)",
+    ],
+    refresh_sql="""
+        INSERT INTO product_sales_hourly (
+            day, hour, store_id, channel_id, product_id, order_count, total_quantity, total_revenue
+        )
+        SELECT
+            DATE(s.created_at),
+            EXTRACT(HOUR FROM s.created_at)::smallint,
+            COALESCE(s.store_id, 0),
+            COALESCE(s.channel_id, 0),
+            ps.product_id,
+            COUNT(*),
+            COALESCE(SUM(ps.quantity), 0),
+            COALESCE(SUM(ps.total_price), 0)
+        FROM product_sales ps
+        JOIN sales s ON s.id = ps.sale_id
+        WHERE s.id > $1 AND s.id <= $2
+        AND s.sale_status_desc = 'COMPLETED'
+        GROUP BY 1, 2, 3, 4, 5
+        ON CONFLICT (day, hour, store_id, channel_id, product_id) DO UPDATE SET
+            order_count = product_sales_hourly.order_count + EXCLUDED.order_count,
+            total_quantity = product_sales_hourly.total_quantity + EXCLUDED.total_quantity,
+            total_revenue = product_sales_hourly.total_revenue + EXCLUDED.total_revenue
+    """,
+)
+
+# Um registro por cliente (vendas concluídas): recorrência e recência sem varrer o histórico de sales.
+# sale ids não chegam em ordem de created_at, por isso LEAST/GREATEST em vez de sobrescrever
+CUSTOMER_STATS = RollupDefinition(
+    name="customer_stats",
+    ddl=[
+        """
+        CREATE TABLE IF NOT EXISTS customer_stats (
+            customer_id INTEGER PRIMARY KEY,
+            first_order_at TIMESTAMP NOT NULL,
+            last_order_at TIMESTAMP NOT NULL,
+            order_count BIGINT NOT NULL DEFAULT 0,
+            total_spent NUMERIC NOT NULL DEFAULT 0
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_customer_stats_last_order ON customer_stats(last_order_at) INCLUDE (order_count, total_spent)",
+        "CREATE INDEX IF NOT EXISTS idx_customer_stats_first_order ON customer_stats(first_order_at)",
+    ],
+    refresh_sql="""
+        INSERT INTO customer_stats (customer_id, first_order_at, last_order_at, order_count, total_spent)
+        SELECT
+            customer_id,
+            MIN(created_at),
+            MAX(created_at),
+            COUNT(*),
+            COALESCE(SUM(total_amount), 0)
+        FROM sales
+        WHERE id > $1 AND id <= $2
+        AND sale_status_desc = 'COMPLETED'
+        AND customer_id IS NOT NULL
+        GROUP BY customer_id
+        ON CONFLICT (customer_id) DO UPDATE SET
+            first_order_at = LEAST(customer_stats.first_order_at, EXCLUDED.first_order_at),
+            last_order_at = GREATEST(customer_stats.last_order_at, EXCLUDED.last_order_at),
+            order_count = customer_stats.order_count + EXCLUDED.order_count,
+            total_spent = customer_stats.total_spent + EXCLUDED.total_spent
+    """,
+)
+
+# Mesma coisa por loja: última visita do cliente em cada loja
+CUSTOMER_STORE_STATS = RollupDefinition(
+    name="customer_store_stats",
+    ddl=[
+        """
+        CREATE TABLE IF NOT EXISTS customer_store_stats (
+            customer_id INTEGER NOT NULL,
+            store_id INTEGER NOT NULL,
+            first_order_at TIMESTAMP NOT NULL,
+            last_order_at TIMESTAMP NOT NULL,
+            order_count BIGINT NOT NULL DEFAULT 0,
+            total_spent NUMERIC NOT NULL DEFAULT 0,
+            PRIMARY KEY (customer_id, store_id)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_customer_store_stats_store_last_order ON customer_store_stats(store_id, last_order_at)",
+    ],
+    refresh_sql="""
+        INSERT INTO customer_store_stats (customer_id, store_id, first_order_at, last_order_at, order_count, total_spent)
+        SELECT
+            customer_id,
+            COALESCE(store_id, 0),
+            MIN(created_at),
+            MAX(created_at),
+            COUNT(*),
+            COALESCE(SUM(total_amount), 0)
+        FROM sales
+        WHERE id > $1 AND id <= $2
+        AND sale_status_desc = 'COMPLETED'
+        AND customer_id IS NOT NULL
+        GROUP BY 1, 2
+        ON CONFLICT (customer_id, store_id) DO UPDATE SET
+            first_order_at = LEAST(customer_store_stats.first_order_at, EXCLUDED.first_order_at),
+            last_order_at = GREATEST(customer_store_stats.last_order_at, EXCLUDED.last_order_at),
+            order_count = customer_store_stats.order_count + EXCLUDED.order_count,
+            total_spent = customer_store_stats.total_spent + EXCLUDED.total_spent
+    """,
+)
+
+# Sketches HyperLogLog de clientes por (dia, loja, concluída): ver app/services/hll.py
+CUSTOMER_HLL_DAILY = RollupDefinition(
+    name="customer_hll_daily",
+    ddl=[
+        """
+        CREATE TABLE IF NOT EXISTS customer_hll_daily (
+            day DATE NOT NULL,
+            store_id INTEGER NOT NULL,
+            completed BOOLEAN NOT NULL,
+            register SMALLINT NOT NULL,
+            rho SMALLINT NOT NULL,
+            PRIMARY KEY (day, store_id, completed, register)
+        )
+        """,
+    ],
+    refresh_sql=f"""
+        INSERT INTO customer_hll_daily (day, store_id, completed, register, rho)
+        SELECT day, store_id, completed, {register_sql("h")}, MAX({rho_sql("h")})
+        FROM (
+            SELECT
+                DATE(created_at) AS day,
+                COALESCE(store_id, 0) AS store_id,
+                COALESCE(sale_status_desc = 'COMPLETED', false) AS completed,
+                {HASH_SQL} AS h
+            FROM sales
+            WHERE id > $1 AND id <= $2
+            AND customer_id IS NOT NULL
+        ) hashed
+        GROUP BY 1, 2, 3, 4
+        ON CONFLICT (day, store_id, completed, register) DO UPDATE SET
+            rho = GREATEST(customer_hll_daily.rho, EXCLUDED.rho)
+    """,
+)
+
+# Histogramas logarítmicos de tempo de preparo/entrega por (dia, loja, canal): ver app/services/quantiles.py
+SALES_TIME_BUCKETS_DAILY = RollupDefinition(
+    name="sales_time_buckets_daily",
+    ddl=[
+        """
+        CREATE TABLE IF NOT EXISTS sales_time_buckets_daily (
+            day DATE NOT NULL,
+            store_id INTEGER NOT NULL,
+            channel_id INTEGER NOT NULL,
+            metric VARCHAR(20) NOT NULL,
+            bucket SMALLINT NOT NULL,
+            sale_count BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, store_id, channel_id, metric, bucket)
+        )
+        """,
+    ],
+    refresh_sql=f"""
+        INSERT INTO sales_time_buckets_daily (day, store_id, channel_id, metric, bucket, sale_count)
+        SELECT
+            DATE(s.created_at),
+            COALESCE(s.store_id, 0),
+            COALESCE(s.channel_id, 0),
+            m.metric,
+            {bucket_sql("m.seconds")},
+            COUNT(*)
+        FROM sales s
+        CROSS JOIN LATERAL (
+            VALUES ('production', s.production_seconds), ('delivery', s.delivery_seconds)
+        ) AS m(metric, seconds)
+        WHERE s.id > $1 AND s.id <= $2
+        AND s.sale_status_desc = 'COMPLETED'
+        AND m.seconds IS NOT NULL
+        GROUP BY 1, 2, 3, 4, 5
+        ON CONFLICT (day, store_id, channel_id, metric, bucket) DO UPDATE SET
+            sale_count = sales_time_buckets_daily.sale_count + EXCLUDED.sale_count
+    """,
+)
+
+# Amostra de Bernoulli de sales para o mode=preview (ver app/services/preview.py). O peso fica na
+# linha: mudar PREVIEW_SAMPLE_RATE não invalida o que já foi amostrado
+SALES_SAMPLE = RollupDefinition(
+    name="sales_sample",
+    ddl=[
+        """
+        CREATE TABLE IF NOT EXISTS sales_sample (
+            id BIGINT PRIMARY KEY,
+            created_at TIMESTAMP NOT NULL,
+            store_id INTEGER,
+            channel_id INTEGER,
+            customer_id INTEGER,
+            sale_status_desc VARCHAR(100),
+            total_amount NUMERIC,
+            weight NUMERIC NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_sales_sample_created_at ON sales_sample(created_at)",
+    ],
+    # $3 = PREVIEW_SAMPLE_RATE (0 < taxa <= 1, validado em config)
+    refresh_sql="""
+        INSERT INTO sales_sample (
+            id, created_at, store_id, channel_id, customer_id, sale_status_desc, total_amount, weight
+        )
+        SELECT id, created_at, store_id, channel_id, customer_id, sale_status_desc, total_amount,
+               (1 / $3::float8)::numeric
+        FROM sales
+        WHERE id > $1 AND id <= $2
+        AND random() < $3::float8
+        ON CONFLICT (id) DO NOTHING
+    """,
+    refresh_args=lambda: (settings.PREVIEW_SAMPLE_RATE,),
+)
+
+ROLLUPS: Dict[str, RollupDefinition] = {
+    SALES_DAILY.name: SALES_DAILY,
+    SALES_HOURLY.name: SALES_HOURLY,
+    PRODUCT_SALES_HOURLY.name: PRODUCT_SALES_HOURLY,
+    CUSTOMER_STATS.name: CUSTOMER_STATS,
+    CUSTOMER_STORE_STATS.name: CUSTOMER_STORE_STATS,
+    CUSTOMER_HLL_DAILY.name: CUSTOMER_HLL_DAILY,
+    SALES_TIME_BUCKETS_DAILY.name: SALES_TIME_BUCKETS_DAILY,
+    SALES_SAMPLE.name: SALES_SAMPLE,
+}
+
+# Queries do catálogo que têm uma versão equivalente lendo do rollup. A versão de
+# rollup recebe os mesmos parâmetros e lê o último sale id coberto de rollup_state
+# no mesmo snapshot, somando as vendas posteriores direto de sales (a "cauda").
+# Quando a versão de rollup lê mais de uma tabela, todas precisam estar atualizadas.
+ROUTED_QUERIES: Dict[Tuple[str, str], Tuple[Union[str, Tuple[str, ...]], str, str]] = {
+    ("vendas_e_desempenho", "total_sales_period"): ("sales_daily", "rollups", "total_sales_period"),
+    ("vendas_e_desempenho", "top_sales_channel"): ("sales_daily", "rollups", "top_sales_channel"),
+    ("vendas_e_desempenho", "top_sales_day_week"): ("sales_daily", "rollups", "top_sales_day_week"),
+    ("vendas_e_desempenho", "cancellation_rate"): ("sales_daily", "rollups", "cancellation_rate"),
+    ("vendas_e_desempenho", "peak_sales_hours"): ("sales_hourly", "rollups", "peak_sales_hours"),
+    ("produtos", "product_weekday_hour"): ("product_sales_hourly", "rollups", "product_weekday_hour"),
+    ("comparison", "total_sales_period"): ("sales_daily", "rollups", "total_sales_period_comparison"),
+    ("comparison", "top_sales_channel"): ("sales_daily", "rollups", "top_sales_channel_comparison"),
+    ("clientes", "customer_metrics"): ("customer_stats", "rollups", "customer_metrics"),
+    ("clientes", "customer_segment"): (("customer_stats", "customer_store_stats"), "rollups", "customer_segment"),
+}
+
+
+class RollupManager:
+    # Chave do pg_advisory_lock que serializa refreshes entre processos
+    LOCK_KEY = 740_231_001
+
+    def __init__(self, rollups: Optional[Dict[str, RollupDefinition]] = None):
+        self.rollups = rollups if rollups is not None else ROLLUPS
+        self.states: Dict[str, RollupState] = {}
+        self.durations: Dict[str, float] = {}
+        self.available = False
+        self._state_loaded = False
+        self._task: Optional[asyncio.Task] = None
+        self._refresh_lock = asyncio.Lock()
+        # Chamados com o nome do gatilho quando um refresh processou vendas novas
+        self.refresh_listeners: List[Callable[[str], None]] = []
+
+    async def ensure_schema(self, db_pool: asyncpg.Pool) -> None:
+        async with db_pool.acquire(profile="maintenance") as connection:
+            await connection.execute(ROLLUP_STATE_DDL)
+            for rollup in self.rollups.values():
+                for statement in rollup.ddl:
+                    await connection.execute(statement)
+        self.available = True
+
+    async def load_state(self, db_pool: asyncpg.Pool) -> None:
+        try:
+            rows = await db_pool.fetch("SELECT name, last_sale_id, refreshed_at FROM rollup_state")
+        except asyncpg.exceptions.UndefinedTableError:
+            self.available = False
+            self._state_loaded = True
+            return
+
+        for row in rows:
+            if row["name"] in self.rollups:
+                self.states[row["name"]] = RollupState(row["last_sale_id"], row["refreshed_at"])
+        self.available = True
+        self._state_loaded = True
+
+    async def _refresh_one(self, connection, rollup: RollupDefinition, full: bool, batch_size: int) -> int:
+        if full:
+            self.states.pop(rollup.name, None)
+            async with connection.transaction():
+                await connection.execute(f"TRUNCATE TABLE {rollup.name}")
+                await connection.execute(
+                    "INSERT INTO rollup_state (name, last_sale_id, refreshed_at) VALUES ($1, 0, NOW()) "
+                    "ON CONFLICT (name) DO UPDATE SET last_sale_id = 0, refreshed_at = NOW()",
+                    rollup.name,
+                )
+
+        last_sale_id = await connection.fetchval(
+            "SELECT last_sale_id FROM rollup_state WHERE name = $1", rollup.name
+        ) or 0
+        max_sale_id = await connection.fetchval("SELECT COALESCE(MAX(id), 0) FROM sales")
+        if max_sale_id < last_sale_id:
+            # sales foi recriada (reset_database): o rollup precisa ser refeito do zero
+            return await self._refresh_one(connection, rollup, True, batch_size)
+
+        # Ids saem da sequence antes do commit: só avança até vendas com ROLLUP_SAFE_LAG_SECONDS,
+        # para que uma transação lenta com id menor não caia atrás do last_sale_id
+        # (ORDER BY id DESC LIMIT 1: varre a pk de trás para frente só até a primeira venda antiga o bastante)
+        horizon = await connection.fetchval(
+            "SELECT id FROM sales WHERE created_at <= LOCALTIMESTAMP - make_interval(secs => $1) ORDER BY id DESC LIMIT 1",
+            float(settings.ROLLUP_SAFE_LAG_SECONDS),
+        )
+        safe_sale_id = min(max_sale_id, horizon or 0)
+
+        processed = 0
+        while last_sale_id < safe_sale_id:
+            upper = min(last_sale_id + batch_size, safe_sale_id)
+            async with connection.transaction():
+                await connection.execute(rollup.refresh_sql, last_sale_id, upper, *rollup.refresh_args())
+                await connection.execute(
+                    "INSERT INTO rollup_state (name, last_sale_id, refreshed_at) VALUES ($1, $2, NOW()) "
+                    "ON CONFLICT (name) DO UPDATE SET last_sale_id = EXCLUDED.last_sale_id, refreshed_at = NOW()",
+                    rollup.name, upper,
+                )
+            processed += upper - last_sale_id
+            last_sale_id = upper
+
+        await connection.execute(
+            "INSERT INTO rollup_state (name, last_sale_id, refreshed_at) VALUES ($1, $2, NOW()) "
+            "ON CONFLICT (name) DO UPDATE SET refreshed_at = NOW()",
+            rollup.name, last_sale_id,
+        )
+        return processed
+
+    async def refresh(self, db_pool: asyncpg.Pool, full: bool = False, names: Optional[List[str]] = None) -> Dict[str, Dict]:
+        if not self.available:
+            await self.ensure_schema(db_pool)
+
+        results = {}
+        async with self._refresh_lock:
+            async with db_pool.acquire(profile="maintenance") as connection:
+                locked = await connection.fetchval("SELECT pg_try_advisory_lock($1)", self.LOCK_KEY)
+                if not locked:
+                    # Quem segura o lock atualiza as tabelas; aqui só se relê o rollup_state abaixo
+                    logger.info("Refresh de rollups já em andamento em outro processo")
+                else:
+                    try:
+                        for name, rollup in self.rollups.items():
+                            if names and name not in names:
+                                continue
+                            started = time.perf_counter()
+                            processed = await self._refresh_one(connection, rollup, full, settings.ROLLUP_BATCH_SIZE)
+                            duration_ms = (time.perf_counter() - started) * 1000
+                            results[name] = {"processed_sale_ids": processed, "duration_ms": round(duration_ms, 1)}
+                            logger.info(f"Rollup {name} atualizado: {processed} sale ids em {duration_ms:.0f}ms")
+                            self.durations[name] = duration_ms
+                    finally:
+                        await connection.execute("SELECT pg_advisory_unlock($1)", self.LOCK_KEY)
+
+        # Também nos workers sem o lock: senão self.states fica parado e is_fresh/route envelhecem
+        await self.load_state(db_pool)
+        if results and (full or any(result["processed_sale_ids"] for result in results.values())):
+            for listener in self.refresh_listeners:
+                listener("rollups")
+        return results
+
+    async def is_fresh(self, db_pool: asyncpg.Pool, name: str) -> bool:
+        if not settings.ROLLUPS_ENABLED:
+            return False
+        if not self._state_loaded:
+            await self.load_state(db_pool)
+
+        state = self.states.get(name)
+        if not self.available or state is None or state.last_sale_id == 0:
+            return False
+
+        # Só vale a pena ler do rollup se a cauda lida de sales for pequena
+        watermark = await result_cache.watermark(db_pool)
+        return watermark is None or watermark.sale_id - state.last_sale_id <= settings.ROLLUP_MAX_TAIL_SALES
+
+    async def route(self, db_pool: asyncpg.Pool, category: str, query_name: str) -> Tuple[str, str]:
+        target = ROUTED_QUERIES.get((category, query_name))
+        if target is None:
+            return category, query_name
+
+        rollup_names, rollup_category, rollup_query = target
+        for rollup_name in ((rollup_names,) if isinstance(rollup_names, str) else rollup_names):
+            if not await self.is_fresh(db_pool, rollup_name):
+                return category, query_name
+        return rollup_category, rollup_query
+
+    async def _run_periodically(self, db_pool: asyncpg.Pool) -> None:
+        while True:
+            try:
+                await self.refresh(db_pool)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Erro no refresh de rollups: {str(e)}")
+            await asyncio.sleep(settings.ROLLUP_REFRESH_INTERVAL_SECONDS)
+
+    def start(self, db_pool: asyncpg.Pool) -> None:
+        if self._task is None and settings.ROLLUPS_ENABLED:
+            self._task = asyncio.create_task(self._run_periodically(db_pool))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def status(self) -> Dict[str, Dict]:
+        return {
+            name: {
+                "last_sale_id": state.last_sale_id,
+                "refreshed_at": state.refreshed_at.isoformat() if state.refreshed_at else None,
+                "last_duration_ms": round(self.durations[name], 1) if name in self.durations else None,
+            }
+            for name, state in self.states.items()
+        }
+
+
+rollup_manager = RollupManager()
@@ -0,0 +1,488 @@
+import hashlib
+import json
+import logging
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import asyncpg
+from app.core.config import settings
+from app.core.metrics import query_metrics
+from app.services.query_catalog import CatalogQuery, QueryCatalog, query_catalog
+from app.services.result_cache import ResultCache, result_cache
+from app.services.rollups import RollupManager, rollup_manager
+from app.services.slow_query_log import SlowQueryLog, slow_query_log
+
+logger = logging.getLogger(__name__)
+
+# Camada semântica: medidas e dimensões declaradas uma vez, compiladas para SQL parametrizado
+# sobre a fonte mais barata que responde (rollup atualizado + cauda de sales, ou tabelas brutas).
+# Cada medida é uma expressão sobre "parciais" aditivos ({nome} vira SUM(f.nome)); cada fonte sabe
+# calcular os seus parciais, então rollup e tabela bruta devolvem exatamente a mesma medida.
+
+
+class SemanticError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Measure:
+    name: str
+    description: str
+    expression: str
+
+    @property
+    def partials(self) -> Tuple[str, ...]:
+        return tuple(re.findall(r"\{(\w+)\}", self.expression))
+
+    def sql(self) -> str:
+        return re.sub(r"\{(\w+)\}", lambda m: f"SUM(f.{m.group(1)})", self.expression)
+
+
+@dataclass(frozen=True)
+class Dimension:
+    name: str
+    description: str
+    # Chaves agrupadas na fonte; as colunas de saída (expressão, alias) são montadas sobre elas
+    keys: Tuple[str, ...]
+    columns: Tuple[Tuple[str, str], ...]
+    joins: Tuple[str, ...] = ()
+
+
+@dataclass(frozen=True)
+class Source:
+    name: str
+    from_sql: str
+    date_filter: str
+    keys: Dict[str, str]
+    partials: Dict[str, str]
+    filters: Dict[str, str]
+    where: Tuple[str, ...] = ()
+    ctes: Tuple[str, ...] = ()
+    # Rollups: nome em rollup_state e a fonte bruta que cobre as vendas ainda não consolidadas
+    rollup: Optional[str] = None
+    tail: Optional[str] = None
+
+    def answers(self, keys: Sequence[str], partials: Sequence[str], filters: Sequence[str]) -> bool:
+        return (
+            all(key in self.keys for key in keys)
+            and all(partial in self.partials for partial in partials)
+            and all(name in self.filters for name in filters)
+        )
+
+
+MEASURES: Dict[str, Measure] = {measure.name: measure for measure in (
+    Measure("orders", "Vendas concluídas", "{completed_count}"),
+    Measure("revenue", "Faturamento das vendas concluídas", "{completed_amount}"),
+    Measure("avg_ticket", "Ticket médio das vendas concluídas", "{completed_amount} / NULLIF({completed_count}, 0)"),
+    Measure("all_orders", "Vendas em qualquer status", "{order_count}"),
+    Measure("cancellations", "Vendas canceladas", "{cancelled_count}"),
+    Measure("cancellation_rate", "% de vendas canceladas", "ROUND({cancelled_count} * 100.0 / NULLIF({order_count}, 0), 2)"),
+    Measure("discounts", "Descontos das vendas concluídas", "{discount_amount}"),
+    Measure("delivery_fees", "Taxas de entrega das vendas concluídas", "{delivery_fee_amount}"),
+    Measure("avg_production_time", "Tempo médio de preparo (s)", "{production_seconds}::numeric / NULLIF({production_count}, 0)"),
+    Measure("avg_delivery_time", "Tempo médio de entrega (s)", "{delivery_seconds}::numeric / NULLIF({delivery_count}, 0)"),
+    Measure("product_orders", "Itens de produto vendidos (linhas de product_sales)", "{product_count}"),
+    Measure("items_sold", "Quantidade de produtos vendidos", "{product_quantity}"),
+    Measure("product_revenue", "Faturamento por produto (total_price)", "{product_amount}"),
+    Measure("addons_added", "Complementos adicionados", "{addon_count}"),
+    Measure("addon_revenue", "Faturamento de complementos", "{addon_amount}"),
+)}
+
+JOINS: Dict[str, str] = {
+    "stores": "LEFT JOIN stores st ON st.id = f.store_id",
+    "channels": "LEFT JOIN channels ch ON ch.id = f.channel_id",
+    "products": "LEFT JOIN products p ON p.id = f.product_id",
+    "categories": "LEFT JOIN categories cat ON cat.id = p.category_id",
+}
+
+DIMENSIONS: Dict[str, Dimension] = {dimension.name: dimension for dimension in (
+    Dimension("day", "Dia", ("day",), (("f.day", "day"),)),
+    Dimension("dow", "Dia da semana (1 = segunda)", ("day",), (("EXTRACT(ISODOW FROM f.day)::int", "dow"),)),
+    Dimension("hour", "Hora do dia", ("hour",), (("f.hour", "hour"),)),
+    Dimension("store", "Loja", ("store_id",), (("f.store_id", "store_id"), ("st.name", "store_name")), ("stores",)),
+    Dimension("city", "Cidade da loja", ("store_id",), (("st.city", "city"), ("st.state", "state")), ("stores",)),
+    Dimension("channel", "Canal de venda", ("channel_id",), (("f.channel_id", "channel_id"), ("ch.name", "channel_name")), ("channels",)),
+    Dimension("product", "Produto", ("product_id",), (("f.product_id", "product_id"), ("p.name", "product_name")), ("products",)),
+    Dimension("category", "Categoria do produto", ("product_id",), (("cat.id", "category_id"), ("cat.name", "category_name")), ("products", "categories")),
+)}
+
+# Ordem dos parâmetros depois de $1/$2 (período): só os filtros presentes entram
+FILTERS = ("store_ids", "channel_ids", "product_ids")
+
+_COMPLETED = "s.sale_status_desc = 'COMPLETED'"
+_SALE_RANGE_CTE = """sale_range AS (
+        SELECT MIN(id) AS first_id, MAX(id) AS last_id
+        FROM sales
+        WHERE created_at >= $1::date AND created_at < $2::date + 1
+    )"""
+# Poda as partições das tabelas filhas (particionadas por sale_id), como nas queries de produtos
+_IN_SALE_RANGE = "ps.sale_id BETWEEN (SELECT first_id FROM sale_range) AND (SELECT last_id FROM sale_range)"
+
+_SALE_KEYS = {
+    "day": "DATE(s.created_at)",
+    "hour": "EXTRACT(HOUR FROM s.created_at)::smallint",
+    "store_id": "COALESCE(s.store_id, 0)",
+    "channel_id": "COALESCE(s.channel_id, 0)",
+}
+_SALE_FILTERS = {"store_ids": "s.store_id", "channel_ids": "s.channel_id"}
+_ROLLUP_KEYS = {"day": "r.day", "hour": "r.hour", "store_id": "r.store_id", "channel_id": "r.channel_id", "product_id": "r.product_id"}
+_ROLLUP_FILTERS = {"store_ids": "r.store_id", "channel_ids": "r.channel_id", "product_ids": "r.product_id"}
+
+
+def _rollup_status_partials(extended: bool) -> Dict[str, str]:
+    partials = {
+        "completed_count": "COALESCE(SUM(r.order_count) FILTER (WHERE r.sale_status_desc = 'COMPLETED'), 0)",
+        "completed_amount": "COALESCE(SUM(r.total_amount) FILTER (WHERE r.sale_status_desc = 'COMPLETED'), 0)",
+        "order_count": "COALESCE(SUM(r.order_count), 0)",
+        "cancelled_count": "COALESCE(SUM(r.order_count) FILTER (WHERE r.sale_status_desc = 'CANCELLED'), 0)",
+    }
+    if extended:
+        partials.update({
+            "discount_amount": "COALESCE(SUM(r.total_discount) FILTER (WHERE r.sale_status_desc = 'COMPLETED'), 0)",
+            "delivery_fee_amount": "COALESCE(SUM(r.delivery_fee) FILTER (WHERE r.sale_status_desc = 'COMPLETED'), 0)",
+            "production_seconds": "COALESCE(SUM(r.production_seconds_sum), 0)",
+            "production_count": "COALESCE(SUM(r.production_count), 0)",
+            "delivery_seconds": "COALESCE(SUM(r.delivery_seconds_sum), 0)",
+            "delivery_count": "COALESCE(SUM(r.delivery_count), 0)",
+        })
+    return partials
+
+
+# Da mais barata para a mais cara; a primeira que responde (e, se rollup, está atualizada) é usada
+SOURCES: List[Source] = [
+    Source(
+        name="sales_daily",
+        from_sql="sales_daily r",
+        date_filter="r.day BETWEEN $1 AND $2",
+        keys={key: _ROLLUP_KEYS[key] for key in ("day", "store_id", "channel_id")},
+        partials=_rollup_status_partials(extended=True),
+        filters={name: _ROLLUP_FILTERS[name] for name in ("store_ids", "channel_ids")},
+        rollup="sales_daily",
+        tail="sales",
+    ),
+    Source(
+        name="sales_hourly",
+        from_sql="sales_hourly r",
+        date_filter="r.day BETWEEN $1 AND $2",
+        keys={key: _ROLLUP_KEYS[key] for key in ("day", "hour", "store_id", "channel_id")},
+        partials=_rollup_status_partials(extended=False),
+        filters={name: _ROLLUP_FILTERS[name] for name in ("store_ids", "channel_ids")},
+        rollup="sales_hourly",
+        tail="sales",
+    ),
+    Source(
+        name="product_sales_hourly",
+        from_sql="product_sales_hourly r",
+        date_filter="r.day BETWEEN $1 AND $2",
+        keys=dict(_ROLLUP_KEYS),
+        partials={
+            "product_count": "COALESCE(SUM(r.order_count), 0)",
+            "product_quantity": "COALESCE(SUM(r.total_quantity), 0)",
+            "product_amount": "COALESCE(SUM(r.total_revenue), 0)",
+        },
+        filters=dict(_ROLLUP_FILTERS),
+        rollup="product_sales_hourly",
+        tail="product_sales",
+    ),
+    Source(
+        name="sales",
+        from_sql="sales s",
+        date_filter="s.created_at >= $1::date AND s.created_at < $2::date + 1",
+        keys=dict(_SALE_KEYS),
+        partials={
+            "completed_count": f"COUNT(*) FILTER (WHERE {_COMPLETED})",
+            "completed_amount": f"COALESCE(SUM(s.total_amount) FILTER (WHERE {_COMPLETED}), 0)",
+            "order_count": "COUNT(*)",
+            "cancelled_count": "COUNT(*) FILTER (WHERE s.sale_status_desc = 'CANCELLED')",
+            "discount_amount": f"COALESCE(SUM(s.total_discount) FILTER (WHERE {_COMPLETED}), 0)",
+            "delivery_fee_amount": f"COALESCE(SUM(s.delivery_fee) FILTER (WHERE {_COMPLETED}), 0)",
+            "production_seconds": "COALESCE(SUM(s.production_seconds), 0)",
+            "production_count": "COUNT(s.production_seconds)",
+            "delivery_seconds": "COALESCE(SUM(s.delivery_seconds), 0)",
+            "delivery_count": "COUNT(s.delivery_seconds)",
+        },
+        filters=dict(_SALE_FILTERS),
+    ),
+    Source(
+        name="product_sales",
+        from_sql="product_sales ps\n        JOIN sales s ON s.id = ps.sale_id",
+        date_filter="s.created_at >= $1::date AND s.created_at < $2::date + 1",
+        keys={**_SALE_KEYS, "product_id": "ps.product_id"},
+        partials={
+            "product_count": "COUNT(*)",
+            "product_quantity": "COALESCE(SUM(ps.quantity), 0)",
+            "product_amount": "COALESCE(SUM(ps.total_price), 0)",
+        },
+        filters={**_SALE_FILTERS, "product_ids": "ps.product_id"},
+        where=(_COMPLETED, _IN_SALE_RANGE),
+        ctes=(_SALE_RANGE_CTE,),
+    ),
+    Source(
+        name="item_product_sales",
+        from_sql="item_product_sales ips\n        JOIN product_sales ps ON ps.id = ips.product_sale_id\n        JOIN sales s ON s.id = ps.sale_id",
+        date_filter="s.created_at >= $1::date AND s.created_at < $2::date + 1",
+        keys={**_SALE_KEYS, "product_id": "ps.product_id"},
+        partials={
+            "addon_count": "COUNT(*)",
+            "addon_amount": "COALESCE(SUM(ips.additional_price), 0)",
+        },
+        filters={**_SALE_FILTERS, "product_ids": "ps.product_id"},
+        where=(_COMPLETED, _IN_SALE_RANGE),
+        ctes=(_SALE_RANGE_CTE,),
+    ),
+]
+SOURCES_BY_NAME = {source.name: source for source in SOURCES}
+
+
+@dataclass(frozen=True)
+class QueryShape:
+    """O que define o SQL gerado; os valores (período, ids, limite) são só parâmetros."""
+    measures: Tuple[str, ...]
+    dimensions: Tuple[str, ...]
+    filters: Tuple[str, ...]
+    order_by: Tuple[Tuple[str, bool], ...]
+
+    @property
+    def keys(self) -> Tuple[str, ...]:
+        return tuple(dict.fromkeys(key for name in self.dimensions for key in DIMENSIONS[name].keys))
+
+    @property
+    def partials(self) -> Tuple[str, ...]:
+        return tuple(dict.fromkeys(partial for name in self.measures for partial in MEASURES[name].partials))
+
+    @property
+    def columns(self) -> Tuple[Tuple[str, str], ...]:
+        return tuple(dict.fromkeys(column for name in self.dimensions for column in DIMENSIONS[name].columns))
+
+
+def build_shape(measures: Sequence[str], dimensions: Sequence[str] = (), filters: Sequence[str] = (),
+                order_by: Sequence[Tuple[str, bool]] = ()) -> QueryShape:
+    unknown = [name for name in measures if name not in MEASURES]
+    if unknown:
+        raise SemanticError(f"Medidas desconhecidas: {', '.join(unknown)} (use {', '.join(MEASURES)})")
+    unknown = [name for name in dimensions if name not in DIMENSIONS]
+    if unknown:
+        raise SemanticError(f"Dimensões desconhecidas: {', '.join(unknown)} (use {', '.join(DIMENSIONS)})")
+    if not measures:
+        raise SemanticError("Informe ao menos uma medida")
+
+    shape = QueryShape(
+        measures=tuple(dict.fromkeys(measures)),
+        dimensions=tuple(dict.fromkeys(dimensions)),
+        filters=tuple(name for name in FILTERS if name in filters),
+        order_by=tuple(order_by),
+    )
+    outputs = {alias for _, alias in shape.columns} | set(shape.measures)
+    unknown = [name for name, _ in shape.order_by if name not in outputs]
+    if unknown:
+        raise SemanticError(f"order_by fora da resposta: {', '.join(unknown)} (use {', '.join(sorted(outputs))})")
+    return shape
+
+
+def candidate_sources(shape: QueryShape) -> List[Source]:
+    sources = [source for source in SOURCES if source.answers(shape.keys, shape.partials, shape.filters)]
+    if not sources:
+        raise SemanticError(
+            "Nenhuma fonte responde essa combinação de medidas/dimensões/filtros "
+            "(medidas de vendas e de produtos/complementos não se misturam numa mesma consulta)"
+        )
+    return sources
+
+
+def _default_order(shape: QueryShape) -> Tuple[Tuple[str, bool], ...]:
+    # Séries temporais em ordem cronológica; o resto pela primeira medida, do maior para o menor
+    temporal = [(alias, False) for _, alias in shape.columns if alias in ("day", "dow", "hour")]
+    return tuple(temporal) or ((shape.measures[0], True),)
+
+
+def _facts_select(source: Source, shape: QueryShape, filter_params: Dict[str, int], tail: bool) -> str:
+    select = [f"{source.keys[key]} AS {key}" for key in shape.keys]
+    select += [f"{source.partials[partial]} AS {partial}" for partial in shape.partials]
+    where = [source.date_filter, *source.where]
+    where += [f"{source.filters[name]} = ANY(${filter_params[name]}::int[])" for name in shape.filters]
+    if tail:
+        where.insert(0, "s.id > COALESCE((SELECT last_sale_id FROM coverage), 0)")
+    group_by = f"\n        GROUP BY {', '.join(str(i) for i in range(1, len(shape.keys) + 1))}" if shape.keys else ""
+    return (
+        f"SELECT {', '.join(select)}\n"
+        f"        FROM {source.from_sql}\n"
+        f"        WHERE " + "\n        AND ".join(where) + group_by
+    )
+
+
+def compile_sql(shape: QueryShape, source: Source) -> Tuple[str, int]:
+    """SQL parametrizado ($1/$2 período, filtros na ordem de FILTERS, limite por último) e nº de parâmetros."""
+    filter_params = {name: index for index, name in enumerate(shape.filters, start=3)}
+    limit_param = len(shape.filters) + 3
+
+    ctes = list(source.ctes)
+    facts = _facts_select(source, shape, filter_params, tail=False)
+    if source.rollup is not None:
+        tail = SOURCES_BY_NAME[source.tail]
+        ctes = [f"coverage AS (\n        SELECT last_sale_id FROM rollup_state WHERE name = '{source.rollup}'\n    )"]
+        ctes += [cte for cte in tail.ctes if cte not in ctes]
+        facts += "\n        UNION ALL\n        -- Cauda: vendas ainda não consolidadas no rollup\n        "
+        facts += _facts_select(tail, shape, filter_params, tail=True)
+    ctes.append(f"facts AS (\n        {facts}\n    )")
+
+    columns = [f"{expression} AS {alias}" for expression, alias in shape.columns]
+    columns += [f"{MEASURES[name].sql()} AS {name}" for name in shape.measures]
+    joins = [sql for name, sql in JOINS.items() if any(name in DIMENSIONS[d].joins for d in shape.dimensions)]
+    group_by = ", ".join(expression for expression, _ in shape.columns)
+    order_by = ", ".join(
+        f"{name} {'DESC' if descending else 'ASC'} NULLS LAST" for name, descending in shape.order_by or _default_order(shape)
+    )
+
+    sql = "WITH " + ",\n    ".join(ctes) + "\nSELECT\n    " + ",\n    ".join(columns) + "\nFROM facts f"
+    if joins:
+        sql += "\n" + "\n".join(joins)
+    if group_by:
+        sql += f"\nGROUP BY {group_by}"
+    sql += f"\nORDER BY {order_by}\nLIMIT ${limit_param}"
+    return sql, limit_param
+
+
+class SemanticLayer:
+    def __init__(self, catalog: Optional[QueryCatalog] = None, cache: Optional[ResultCache] = None,
+                 rollups: Optional[RollupManager] = None, slow_log: Optional[SlowQueryLog] = None,
+                 max_compiled: Optional[int] = None):
+        self.catalog = catalog or query_catalog
+        self.cache = cache or result_cache
+        self.rollups = rollups or rollup_manager
+        self.slow_log = slow_log or slow_query_log
+        self.max_compiled = max_compiled or settings.SEMANTIC_COMPILED_CACHE_SIZE
+        # (formato, fonte) -> query compilada; o SQL estável faz o cache de statements do asyncpg
+        # reaproveitar o PREPARE (e o plano) por conexão, como nas queries dos arquivos .sql
+        self._compiled: "OrderedDict[Tuple[QueryShape, str], CatalogQuery]" = OrderedDict()
+        self.compilations = 0
+        self.compiled_hits = 0
+
+    def model(self) -> Dict[str, Any]:
+        return {
+            "measures": {name: measure.description for name, measure in MEASURES.items()},
+            "dimensions": {name: dimension.description for name, dimension in DIMENSIONS.items()},
+            "filters": list(FILTERS),
+            "sources": [
+                {
+                    "name": source.name,
+                    "rollup": source.rollup is not None,
+                    "measures": [name for name, measure in MEASURES.items() if all(p in source.partials for p in measure.partials)],
+                    "dimensions": [name for name, dimension in DIMENSIONS.items() if all(k in source.keys for k in dimension.keys)],
+                }
+                for source in SOURCES
+            ],
+        }
+
+    async def choose_source(self, db_pool: asyncpg.Pool, shape: QueryShape, source_name: Optional[str] = None) -> Source:
+        candidates = candidate_sources(shape)
+        if source_name is not None:
+            # Forçar a fonte (comparar rollup x bruto); precisa conseguir responder
+            for source in candidates:
+                if source.name == source_name:
+                    return source
+            raise SemanticError(f"A fonte {source_name} não responde essa consulta (use {', '.join(s.name for s in candidates)})")
+
+        for source in candidates:
+            if source.rollup is None or await self.rollups.is_fresh(db_pool, source.rollup):
+                return source
+        # Nenhum rollup atualizado: a última candidata é sempre uma tabela bruta
+        return candidates[-1]
+
+    def compile(self, shape: QueryShape, source: Source) -> CatalogQuery:
+        key = (shape, source.name)
+        query = self._compiled.get(key)
+        if query is not None:
+            self._compiled.move_to_end(key)
+            self.compiled_hits += 1
+            return query
+
+        sql, param_count = compile_sql(shape, source)
+        digest = hashlib.sha1(sql.encode("utf-8")).hexdigest()[:20]
+        query = CatalogQuery(
+            category="semantic",
+            name=f"{source.name}_{digest[:8]}",
+            sql=sql,
+            path=Path("semantic"),
+            param_count=param_count,
+            statement_name=f"gla_sem_{digest}",
+            mtime=0.0,
+        )
+        self._compiled[key] = query
+        self.compilations += 1
+        while len(self._compiled) > self.max_compiled:
+            self._compiled.popitem(last=False)
+        return query
+
+    async def prepare(self, db_pool: asyncpg.Pool, measures: Sequence[str], dimensions: Sequence[str],
+                      start_date: date, end_date: date, filters: Optional[Dict[str, Optional[List[int]]]] = None,
+                      order_by: Sequence[Tuple[str, bool]] = (), limit: int = 1000,
+                      source_name: Optional[str] = None) -> Tuple[CatalogQuery, Source, Tuple]:
+        if start_date > end_date:
+            raise SemanticError("start_date deve ser anterior a end_date")
+        filters = {name: values for name, values in (filters or {}).items() if values}
+        unknown = [name for name in filters if name not in FILTERS]
+        if unknown:
+            raise SemanticError(f"Filtros desconhecidos: {', '.join(unknown)} (use {', '.join(FILTERS)})")
+
+        shape = build_shape(measures, dimensions, list(filters), order_by)
+        source = await self.choose_source(db_pool, shape, source_name)
+        query = self.compile(shape, source)
+        args = (start_date, end_date, *[list(filters[name]) for name in shape.filters], limit)
+        return query, source, args
+
+    async def run(self, db_pool: asyncpg.Pool, *args, **kwargs) -> Dict[str, Any]:
+        query, source, params = await self.prepare(db_pool, *args, **kwargs)
+        # Uma entrada de cache por fonte: DELETE /analytics/cache?query_id=semantic/<fonte> invalida
+        query_id = f"semantic/{source.name}"
+        data = await self.cache.get_or_compute(
+            query_id,
+            (query.statement_name,) + params,
+            lambda: self._fetch(db_pool, query_id, query, params),
+            db_pool=db_pool,
+        )
+        return {"data": data, "source": source.name, "query": query.name}
+
+    async def explain(self, db_pool: asyncpg.Pool, *args, analyze: bool = False, **kwargs) -> Dict[str, Any]:
+        query, source, params = await self.prepare(db_pool, *args, **kwargs)
+        options = "ANALYZE, BUFFERS, FORMAT JSON" if analyze else "FORMAT JSON"
+        plan = await db_pool.fetchval(f"EXPLAIN ({options}) {query.sql}", *params)
+        return {
+            "source": source.name,
+            "query": query.name,
+            "sql": query.sql,
+            "params": [str(value) for value in params],
+            "plan": json.loads(plan) if isinstance(plan, str) else plan,
+        }
+
+    async def _fetch(self, db_pool: asyncpg.Pool, query_id: str, query: CatalogQuery, params: Tuple) -> List[Dict[str, Any]]:
+        async def fetch(connection):
+            started = time.perf_counter()
+            try:
+                rows = await self.catalog.fetch_query(connection, query, params)
+            except Exception:
+                query_metrics.observe_query(query_id, time.perf_counter() - started, error=True)
+                raise
+            return rows, time.perf_counter() - started
+
+        result, elapsed = await db_pool.run(fetch)
+
+        query_metrics.observe_query(query_id, elapsed, len(result))
+        self.slow_log.observe(db_pool, query.sql, params, elapsed, query_id=query_id)
+        logger.debug(f"Consulta semântica {query.name}: {len(result)} linhas em {elapsed * 1000:.1f}ms")
+        return [dict(row) for row in result]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "compiled": len(self._compiled),
+            "max_compiled": self.max_compiled,
+            "compilations": self.compilations,
+            "compiled_hits": self.compiled_hits,
+        }
+
+
+semantic_layer = SemanticLayer()
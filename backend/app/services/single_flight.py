@@ -0,0 +1,71 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Chamadas concorrentes com a mesma chave aguardam uma única execução em andamento.
+
+    A execução roda numa task própria: se quem a iniciou desconectar (cancelamento), os demais
+    continuam esperando o mesmo resultado; ela só é cancelada quando o último interessado sai.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._inflight: Dict[Hashable, _Flight] = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.abandoned = 0
+        self.per_query: Dict[str, int] = {}
+
+    async def do(self, query_id: str, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        if not self.enabled:
+            return await compute()
+
+        flight = self._inflight.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(compute()))
+            self._inflight[key] = flight
+            flight.task.add_done_callback(lambda _, key=key, flight=flight: self._finished(key, flight))
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+            self.per_query[query_id] = self.per_query.get(query_id, 0) + 1
+            logger.debug(f"Query {query_id} agrupada com execução em andamento ({flight.waiters} aguardando)")
+
+        flight.waiters += 1
+        try:
+            # shield: o cancelamento de um chamador não se propaga para a execução compartilhada
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                self.abandoned += 1
+                flight.task.cancel()
+
+    def _finished(self, key: Hashable, flight: _Flight) -> None:
+        if self._inflight.get(key) is flight:
+            del self._inflight[key]
+        if not flight.task.cancelled():
+            # Sem ninguém aguardando (todos cancelados) a exceção ficaria sem dono no log do asyncio
+            flight.task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "in_flight": len(self._inflight),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "abandoned": self.abandoned,
+            "coalesced_per_query": self.per_query,
+        }
@@ -0,0 +1,121 @@
+import asyncio
+import json
+import logging
+import re
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Sequence, Set
+
+from app.core.config import settings
+from app.core.metrics import current_query_id
+
+logger = logging.getLogger(__name__)
+
+_LEADING_COMMENTS_RE = re.compile(r"^(\s*--[^\n]*\n|\s+)*")
+
+
+def _is_read_only(sql: str) -> bool:
+    head = _LEADING_COMMENTS_RE.sub("", sql, count=1).lstrip("(").lstrip()[:6].upper()
+    return head.startswith("SELECT") or head.startswith("WITH")
+
+
+def _describe(value: Any) -> Any:
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_describe(v) for v in value]
+    return str(value)
+
+
+class SlowQueryLog:
+    """Guarda as últimas N queries acima do limite e, em segundo plano, o EXPLAIN (ANALYZE, BUFFERS) delas."""
+
+    def __init__(self, threshold_ms: float, max_entries: int, explain: bool = True,
+                 cooldown_seconds: float = 300.0, explain_timeout_seconds: float = 60.0):
+        self.threshold_ms = threshold_ms
+        self.explain = explain
+        self.cooldown_seconds = cooldown_seconds
+        self.explain_timeout_seconds = explain_timeout_seconds
+        self.entries: Deque[Dict[str, Any]] = deque(maxlen=max_entries)
+        self.total = 0
+        self._last_explain: Dict[str, float] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    def observe(self, db_pool, sql: str, args: Sequence, seconds: float, query_id: Optional[str] = None) -> None:
+        duration_ms = seconds * 1000
+        if duration_ms < self.threshold_ms:
+            return
+
+        query_id = query_id or current_query_id.get() or "adhoc"
+        self.total += 1
+        entry = {
+            "query_id": query_id,
+            "duration_ms": round(duration_ms, 1),
+            "params": _describe(list(args)),
+            "captured_at": datetime.now().isoformat(),
+            "sql": sql.strip(),
+            "plan": None,
+            "plan_status": "skipped",
+        }
+        self.entries.append(entry)
+        logger.warning(f"Query lenta {query_id}: {duration_ms:.0f}ms (params={entry['params']})")
+
+        if not self.explain or db_pool is None or not _is_read_only(sql):
+            return
+        # Um EXPLAIN ANALYZE executa a query de novo: no máximo um por query id a cada cooldown
+        now = time.monotonic()
+        if now - self._last_explain.get(query_id, float("-inf")) < self.cooldown_seconds:
+            return
+        self._last_explain[query_id] = now
+
+        entry["plan_status"] = "pending"
+        task = asyncio.create_task(self._capture_plan(db_pool, entry, sql, tuple(args)))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _capture_plan(self, db_pool, entry: Dict[str, Any], sql: str, args: tuple) -> None:
+        statement = sql.strip().rstrip(";")
+        try:
+            async with db_pool.acquire() as connection:
+                # Transação somente leitura e descartada: o ANALYZE não pode ter efeito colateral
+                async with connection.transaction(readonly=True):
+                    raw = await connection.fetchval(
+                        f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}",
+                        *args,
+                        timeout=self.explain_timeout_seconds,
+                    )
+            entry["plan"] = json.loads(raw) if isinstance(raw, str) else raw
+            entry["plan_status"] = "captured"
+        except Exception as e:
+            entry["plan_status"] = f"failed: {e}"
+            logger.warning(f"Falha ao capturar EXPLAIN de {entry['query_id']}: {e}")
+
+    def recent(self, query_id: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        entries = [e for e in reversed(self.entries) if query_id is None or e["query_id"] == query_id]
+        return entries[:limit] if limit else entries
+
+    def clear(self) -> int:
+        removed = len(self.entries)
+        self.entries.clear()
+        self._last_explain.clear()
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "threshold_ms": self.threshold_ms,
+            "explain": self.explain,
+            "total": self.total,
+            "kept": len(self.entries),
+            "max_entries": self.entries.maxlen,
+            "pending_plans": len(self._tasks),
+        }
+
+
+slow_query_log = SlowQueryLog(
+    threshold_ms=settings.SLOW_QUERY_THRESHOLD_MS,
+    max_entries=settings.SLOW_QUERY_LOG_SIZE,
+    explain=settings.SLOW_QUERY_EXPLAIN_ENABLED,
+    cooldown_seconds=settings.SLOW_QUERY_EXPLAIN_COOLDOWN_SECONDS,
+    explain_timeout_seconds=settings.SLOW_QUERY_EXPLAIN_TIMEOUT_SECONDS,
+)
@@ -0,0 +1,34 @@
+-- Índices de performance mantidos pelo backend (app/services/indexes.py) e pelo generate_data.py.
+-- Um CREATE INDEX por statement; os comentários logo acima viram a descrição no relatório do advisor.
+-- O backend cria os que faltam com CONCURRENTLY (exceto em tabelas particionadas).
+
+-- Filtro de período em tabelas grandes e ordenadas por inserção: BRIN é minúsculo e poda blocos
+CREATE INDEX IF NOT EXISTS idx_sales_created_at_brin ON sales USING brin (created_at) WITH (pages_per_range = 32);
+
+-- Comparação/ranking de lojas e filtros por loja no período
+CREATE INDEX IF NOT EXISTS idx_sales_store_created_at ON sales (store_id, created_at);
+
+-- Agregações por status no período (total_sales_period, cancellation_rate, peak_sales_hours) sem ir ao heap
+CREATE INDEX IF NOT EXISTS idx_sales_created_at_status ON sales (created_at, sale_status_desc) INCLUDE (channel_id, store_id, total_amount);
+
+-- Agregações por canal (top_sales_channel, dashboard)
+CREATE INDEX IF NOT EXISTS idx_sales_channel_created_at ON sales (channel_id, created_at) INCLUDE (sale_status_desc, total_amount);
+
+-- Pedidos por cliente (avg_orders_per_customer, recorrência)
+CREATE INDEX IF NOT EXISTS idx_sales_customer_created_at ON sales (customer_id, created_at) WHERE (customer_id IS NOT NULL);
+
+-- Joins das tabelas filhas com sales (e faixa de sale_id dos rollups)
+CREATE INDEX IF NOT EXISTS idx_product_sales_sale_id ON product_sales (sale_id);
+
+-- Produtos mais vendidos por período
+CREATE INDEX IF NOT EXISTS idx_product_sales_product_sale ON product_sales (product_id, sale_id);
+
+-- Complementos (top_addon_items) a partir de product_sales
+CREATE INDEX IF NOT EXISTS idx_item_product_sales_product_sale_id ON item_product_sales (product_sale_id);
+
+-- Métodos de pagamento por período
+CREATE INDEX IF NOT EXISTS idx_payments_sale_id ON payments (sale_id);
+
+-- Entregas por venda (tipo, custo, bairros)
+CREATE INDEX IF NOT EXISTS idx_delivery_sales_sale_id ON delivery_sales (sale_id);
+CREATE INDEX IF NOT EXISTS idx_delivery_addresses_sale_id ON delivery_addresses (sale_id);
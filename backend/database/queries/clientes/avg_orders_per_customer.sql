@@ -6,7 +6,7 @@ WITH customer_monthly_orders AS (
     FROM customers c
     JOIN sales s ON c.id = s.customer_id
     WHERE s.sale_status_desc = 'COMPLETED'
-    AND DATE(s.created_at) BETWEEN $1 AND $2
+    AND s.created_at >= $1::date AND s.created_at < $2::date + 1
     GROUP BY c.id, month
 )
 SELECT 
@@ -0,0 +1,30 @@
+-- Resumo da base de clientes direto de sales (sem rollup; ver rollups/customer_metrics.sql).
+-- Novos clientes são os do período; recorrência e recência usam os totais atuais, com $2 como referência.
+-- $1/$2 período, $3 dias sem comprar para "em risco", $4 dias sem comprar para "perdido"
+-- check_plans: seq-scan-ok histórico inteiro de sales; só roda sem customer_stats atualizado
+WITH per_customer AS (
+    SELECT
+        customer_id,
+        COUNT(*) as order_count,
+        SUM(total_amount) as total_spent,
+        MIN(created_at) as first_order_at,
+        MAX(created_at) as last_order_at
+    FROM sales
+    WHERE sale_status_desc = 'COMPLETED'
+    AND customer_id IS NOT NULL
+    GROUP BY customer_id
+)
+SELECT
+    COUNT(*) as customers_with_orders,
+    COUNT(*) FILTER (WHERE first_order_at >= $1::date) as new_customers,
+    COUNT(*) FILTER (WHERE order_count >= 2) as repeat_customers,
+    ROUND(COUNT(*) FILTER (WHERE order_count >= 2) * 100.0 / NULLIF(COUNT(*), 0), 2) as repeat_rate,
+    COUNT(*) FILTER (
+        WHERE last_order_at < $2::date + 1 - $3::int
+        AND last_order_at >= $2::date + 1 - $4::int
+    ) as at_risk_customers,
+    COUNT(*) FILTER (WHERE last_order_at < $2::date + 1 - $4::int) as lost_customers,
+    ROUND(AVG(order_count), 2) as avg_orders_per_customer,
+    ROUND(AVG(total_spent), 2) as avg_lifetime_value
+FROM per_customer
+WHERE first_order_at < $2::date + 1;
@@ -0,0 +1,33 @@
+-- Clientes por recorrência e recência direto de sales (sem rollup; ver rollups/customer_segment.sql).
+-- $1 data de referência, $2 mínimo de pedidos, $3 mínimo de dias sem comprar, $4 máximo de dias sem comprar (opcional),
+-- $5 loja (opcional), $6 limite
+-- check_plans: seq-scan-ok histórico inteiro de sales; só roda sem customer_stats/customer_store_stats atualizados
+WITH per_customer AS (
+    SELECT
+        customer_id,
+        COUNT(*) as order_count,
+        SUM(total_amount) as total_spent,
+        MIN(created_at) as first_order_at,
+        MAX(created_at) as last_order_at
+    FROM sales
+    WHERE sale_status_desc = 'COMPLETED'
+    AND customer_id IS NOT NULL
+    AND ($5::int IS NULL OR store_id = $5::int)
+    GROUP BY customer_id
+)
+SELECT
+    m.customer_id,
+    c.customer_name,
+    m.order_count,
+    m.total_spent,
+    ROUND(m.total_spent / NULLIF(m.order_count, 0), 2) as avg_ticket,
+    m.first_order_at,
+    m.last_order_at,
+    $1::date - m.last_order_at::date as days_since_last_order
+FROM per_customer m
+LEFT JOIN customers c ON c.id = m.customer_id
+WHERE m.order_count >= $2
+AND m.last_order_at < $1::date + 1 - $3::int
+AND ($4::int IS NULL OR m.last_order_at >= $1::date + 1 - $4::int)
+ORDER BY m.total_spent DESC
+LIMIT $6;
@@ -0,0 +1,33 @@
+-- compare_to de vendas_e_desempenho/top_sales_channel: período atual ($1-$2) e de comparação ($3-$4)
+-- numa leitura só de sales, separados por agregação condicional
+WITH windowed AS (
+    SELECT 
+        channel_id,
+        total_amount,
+        created_at >= $1::date AND created_at < $2::date + 1 AS is_current,
+        created_at >= $3::date AND created_at < $4::date + 1 AS is_previous
+    FROM sales
+    WHERE ((created_at >= $1::date AND created_at < $2::date + 1) OR (created_at >= $3::date AND created_at < $4::date + 1))
+    AND sale_status_desc = 'COMPLETED'
+),
+by_channel AS (
+    SELECT 
+        channel_id,
+        COUNT(*) FILTER (WHERE is_current) as order_count,
+        COALESCE(SUM(total_amount) FILTER (WHERE is_current), 0) as total_revenue,
+        COUNT(*) FILTER (WHERE is_previous) as previous_order_count,
+        COALESCE(SUM(total_amount) FILTER (WHERE is_previous), 0) as previous_total_revenue
+    FROM windowed
+    GROUP BY channel_id
+)
+SELECT 
+    c.name as channel,
+    b.order_count,
+    b.total_revenue,
+    ROUND((b.order_count * 100.0 / NULLIF(SUM(b.order_count) OVER (), 0)), 2) as percentage,
+    b.previous_order_count,
+    b.previous_total_revenue,
+    ROUND((b.previous_order_count * 100.0 / NULLIF(SUM(b.previous_order_count) OVER (), 0)), 2) as previous_percentage
+FROM by_channel b
+JOIN channels c ON b.channel_id = c.id
+ORDER BY b.order_count DESC, b.previous_order_count DESC;
@@ -0,0 +1,19 @@
+-- compare_to de vendas_e_desempenho/total_sales_period: período atual ($1-$2) e de comparação ($3-$4)
+-- numa leitura só de sales, separados por agregação condicional
+WITH windowed AS (
+    SELECT 
+        total_amount,
+        created_at >= $1::date AND created_at < $2::date + 1 AS is_current,
+        created_at >= $3::date AND created_at < $4::date + 1 AS is_previous
+    FROM sales
+    WHERE ((created_at >= $1::date AND created_at < $2::date + 1) OR (created_at >= $3::date AND created_at < $4::date + 1))
+    AND sale_status_desc = 'COMPLETED'
+)
+SELECT 
+    COUNT(*) FILTER (WHERE is_current) as total_orders,
+    COALESCE(SUM(total_amount) FILTER (WHERE is_current), 0) as total_revenue,
+    AVG(total_amount) FILTER (WHERE is_current) as avg_ticket,
+    COUNT(*) FILTER (WHERE is_previous) as previous_total_orders,
+    COALESCE(SUM(total_amount) FILTER (WHERE is_previous), 0) as previous_total_revenue,
+    AVG(total_amount) FILTER (WHERE is_previous) as previous_avg_ticket
+FROM windowed;
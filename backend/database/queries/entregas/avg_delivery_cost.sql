@@ -7,4 +7,4 @@ JOIN sales s ON ds.sale_id = s.id
 WHERE s.sale_status_desc = 'COMPLETED'
 AND ds.courier_fee IS NOT NULL
 AND ds.courier_fee > 0
-AND DATE(s.created_at) BETWEEN $1 AND $2;
\ No newline at end of file
+AND s.created_at >= $1::date AND s.created_at < $2::date + 1;
\ No newline at end of file
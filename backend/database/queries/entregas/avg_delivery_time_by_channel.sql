@@ -8,6 +8,6 @@ FROM sales s
 JOIN channels c ON s.channel_id = c.id
 WHERE s.sale_status_desc = 'COMPLETED'
 AND s.delivery_seconds IS NOT NULL
-AND DATE(s.created_at) BETWEEN $1 AND $2
+AND s.created_at >= $1::date AND s.created_at < $2::date + 1
 GROUP BY c.id, c.name
 ORDER BY avg_delivery_time_seconds;
\ No newline at end of file
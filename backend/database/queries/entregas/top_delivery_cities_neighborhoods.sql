@@ -1,3 +1,9 @@
+-- Faixa de ids das vendas do período: poda as partições das tabelas filhas (particionadas por sale_id)
+WITH sale_range AS (
+    SELECT MIN(id) AS first_id, MAX(id) AS last_id
+    FROM sales
+    WHERE created_at >= $1::date AND created_at < $2::date + 1
+)
 SELECT 
     da.city,
     da.neighborhood,
@@ -7,7 +13,8 @@ FROM sales s
 JOIN delivery_addresses da ON s.id = da.sale_id
 WHERE s.sale_status_desc = 'COMPLETED'
 AND da.city IS NOT NULL
-AND DATE(s.created_at) BETWEEN $1 AND $2
+AND s.created_at >= $1::date AND s.created_at < $2::date + 1
+AND da.sale_id BETWEEN (SELECT first_id FROM sale_range) AND (SELECT last_id FROM sale_range)
 GROUP BY da.city, da.neighborhood
 ORDER BY delivery_count DESC
 LIMIT 15;
\ No newline at end of file
@@ -1,14 +1,21 @@
-WITH split_payments AS (
+-- Faixa de ids das vendas do período: poda as partições das tabelas filhas (particionadas por sale_id)
+WITH sale_range AS (
+    SELECT MIN(id) AS first_id, MAX(id) AS last_id
+    FROM sales
+    WHERE created_at >= $1::date AND created_at < $2::date + 1
+),
+split_payments AS (
     SELECT 
         sale_id,
         COUNT(*) as payment_methods_count
     FROM payments 
-    WHERE sale_id IN (SELECT id FROM sales WHERE sale_status_desc = 'COMPLETED' AND DATE(created_at) BETWEEN $1 AND $2)
+    WHERE sale_id BETWEEN (SELECT first_id FROM sale_range) AND (SELECT last_id FROM sale_range)
+    AND sale_id IN (SELECT id FROM sales WHERE sale_status_desc = 'COMPLETED' AND created_at >= $1::date AND created_at < $2::date + 1)
     GROUP BY sale_id
     HAVING COUNT(*) > 1
 )
 SELECT 
     COUNT(*) as split_payment_orders,
-    ROUND((COUNT(*) * 100.0 / (SELECT COUNT(*) FROM sales WHERE sale_status_desc = 'COMPLETED' AND DATE(created_at) BETWEEN $1 AND $2)), 2) as percentage,
+    ROUND((COUNT(*) * 100.0 / (SELECT COUNT(*) FROM sales WHERE sale_status_desc = 'COMPLETED' AND created_at >= $1::date AND created_at < $2::date + 1)), 2) as percentage,
     AVG(sp.payment_methods_count) as avg_methods_per_order
 FROM split_payments sp;
\ No newline at end of file
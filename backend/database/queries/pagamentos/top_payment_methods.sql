@@ -1,12 +1,19 @@
+-- Faixa de ids das vendas do período: poda as partições das tabelas filhas (particionadas por sale_id)
+WITH sale_range AS (
+    SELECT MIN(id) AS first_id, MAX(id) AS last_id
+    FROM sales
+    WHERE created_at >= $1::date AND created_at < $2::date + 1
+)
 SELECT 
     pt.description as payment_method,
     COUNT(*) as transaction_count,
     SUM(p.value) as total_amount,
-    ROUND((COUNT(*) * 100.0 / (SELECT COUNT(*) FROM payments p2 JOIN sales s ON p2.sale_id = s.id WHERE s.sale_status_desc = 'COMPLETED' AND DATE(s.created_at) BETWEEN $1 AND $2)), 2) as percentage
+    ROUND((COUNT(*) * 100.0 / (SELECT COUNT(*) FROM payments p2 JOIN sales s ON p2.sale_id = s.id WHERE p2.sale_id BETWEEN (SELECT first_id FROM sale_range) AND (SELECT last_id FROM sale_range) AND s.sale_status_desc = 'COMPLETED' AND s.created_at >= $1::date AND s.created_at < $2::date + 1)), 2) as percentage
 FROM payments p
 JOIN payment_types pt ON p.payment_type_id = pt.id
 JOIN sales s ON p.sale_id = s.id
 WHERE s.sale_status_desc = 'COMPLETED'
-AND DATE(s.created_at) BETWEEN $1 AND $2
+AND s.created_at >= $1::date AND s.created_at < $2::date + 1
+AND p.sale_id BETWEEN (SELECT first_id FROM sale_range) AND (SELECT last_id FROM sale_range)
 GROUP BY pt.id, pt.description
 ORDER BY transaction_count DESC;
\ No newline at end of file
@@ -0,0 +1,23 @@
+-- Prévia de vendas_e_desempenho/cancellation_rate a partir da amostra sales_sample
+WITH coverage AS (
+    SELECT last_sale_id FROM rollup_state WHERE name = 'sales_sample'
+),
+sampled AS (
+    SELECT sale_status_desc, weight
+    FROM sales_sample
+    WHERE created_at >= $1::date AND created_at < $2::date + 1
+    UNION ALL
+    -- Cauda: vendas posteriores ao último refresh da amostra entram todas (peso 1, variância 0)
+    SELECT sale_status_desc, 1::numeric
+    FROM sales
+    WHERE id > COALESCE((SELECT last_sale_id FROM coverage), 0)
+    AND created_at >= $1::date AND created_at < $2::date + 1
+)
+SELECT 
+    sale_status_desc as status,
+    SUM(weight) as order_count,
+    ROUND(SUM(weight) * 100.0 / (SELECT SUM(weight) FROM sampled), 2) as percentage,
+    SUM(weight * (weight - 1)) as order_count_var,
+    COUNT(*) as sample_size
+FROM sampled
+GROUP BY sale_status_desc;
@@ -0,0 +1,64 @@
+-- Prévia de produtos/top_bottom_products a partir da amostra sales_sample (amostra por venda)
+WITH coverage AS (
+    SELECT last_sale_id FROM rollup_state WHERE name = 'sales_sample'
+),
+-- O período fica aqui dentro: sampled é lida duas vezes (materializada) e o filtro de fora não
+-- chegaria à cauda, que então leria todas as partições de sales
+sampled AS (
+    SELECT id, created_at, sale_status_desc, weight
+    FROM sales_sample
+    WHERE created_at >= $1::date AND created_at < $2::date + 1
+    UNION ALL
+    -- Cauda: vendas posteriores ao último refresh da amostra entram todas (peso 1, variância 0)
+    SELECT id, created_at, sale_status_desc, 1::numeric
+    FROM sales
+    WHERE id > COALESCE((SELECT last_sale_id FROM coverage), 0)
+    AND created_at >= $1::date AND created_at < $2::date + 1
+),
+-- Faixa de ids das vendas amostradas do período: poda as partições de product_sales (particionada por sale_id)
+sale_range AS (
+    SELECT MIN(id) AS first_id, MAX(id) AS last_id
+    FROM sampled
+),
+per_sale AS (
+    SELECT 
+        p.id,
+        p.name,
+        p.category_id,
+        c.name as category_name,
+        s.weight,
+        COUNT(*) as times_ordered,
+        SUM(ps.quantity) as total_quantity,
+        SUM(ps.total_price) as total_revenue,
+        SUM(ps.base_price) as base_price_sum
+    FROM sampled s
+    JOIN product_sales ps ON ps.sale_id = s.id
+    JOIN products p ON ps.product_id = p.id
+    JOIN categories c ON p.category_id = c.id
+    WHERE s.sale_status_desc = 'COMPLETED'
+    AND ps.sale_id BETWEEN (SELECT first_id FROM sale_range) AND (SELECT last_id FROM sale_range)
+    GROUP BY p.id, p.name, p.category_id, c.name, s.id, s.weight
+),
+product_sales AS (
+    SELECT 
+        id,
+        name,
+        category_id,
+        category_name,
+        SUM(weight * times_ordered) as times_ordered,
+        SUM(weight * total_quantity) as total_quantity,
+        SUM(weight * total_revenue) as total_revenue,
+        SUM(weight * base_price_sum) / NULLIF(SUM(weight * times_ordered), 0) as avg_price,
+        SUM(weight * (weight - 1) * times_ordered * times_ordered) as times_ordered_var,
+        SUM(weight * (weight - 1) * total_quantity * total_quantity) as total_quantity_var,
+        SUM(weight * (weight - 1) * total_revenue * total_revenue) as total_revenue_var,
+        COUNT(*) as sample_size
+    FROM per_sale
+    GROUP BY id, name, category_id, category_name
+)
+SELECT 
+    *,
+    RANK() OVER (ORDER BY total_quantity DESC) as quantity_rank,
+    RANK() OVER (ORDER BY total_quantity ASC) as low_sales_rank
+FROM product_sales
+ORDER BY total_quantity DESC;
@@ -0,0 +1,54 @@
+-- Prévia de produtos/top_revenue_categories a partir da amostra sales_sample.
+-- A amostra é de vendas (por conglomerado): os itens de cada venda amostrada entram todos, e a
+-- variância usa o total de cada venda na categoria.
+WITH coverage AS (
+    SELECT last_sale_id FROM rollup_state WHERE name = 'sales_sample'
+),
+-- O período fica aqui dentro: sampled é lida duas vezes (materializada) e o filtro de fora não
+-- chegaria à cauda, que então leria todas as partições de sales
+sampled AS (
+    SELECT id, created_at, sale_status_desc, weight
+    FROM sales_sample
+    WHERE created_at >= $1::date AND created_at < $2::date + 1
+    UNION ALL
+    -- Cauda: vendas posteriores ao último refresh da amostra entram todas (peso 1, variância 0)
+    SELECT id, created_at, sale_status_desc, 1::numeric
+    FROM sales
+    WHERE id > COALESCE((SELECT last_sale_id FROM coverage), 0)
+    AND created_at >= $1::date AND created_at < $2::date + 1
+),
+-- Faixa de ids das vendas amostradas do período: poda as partições de product_sales (particionada por sale_id)
+sale_range AS (
+    SELECT MIN(id) AS first_id, MAX(id) AS last_id
+    FROM sampled
+),
+per_sale AS (
+    SELECT 
+        cat.id as category_id,
+        cat.name as category_name,
+        s.weight,
+        COUNT(ps.id) as order_count,
+        SUM(ps.quantity) as total_quantity,
+        SUM(ps.total_price) as total_revenue
+    FROM sampled s
+    JOIN product_sales ps ON ps.sale_id = s.id
+    JOIN products p ON p.id = ps.product_id
+    JOIN categories cat ON cat.id = p.category_id
+    WHERE s.sale_status_desc = 'COMPLETED'
+      AND cat.type = 'P'
+      AND ps.sale_id BETWEEN (SELECT first_id FROM sale_range) AND (SELECT last_id FROM sale_range)
+    GROUP BY cat.id, cat.name, s.id, s.weight
+)
+SELECT 
+    category_name,
+    SUM(weight * order_count) as order_count,
+    SUM(weight * total_quantity) as total_quantity,
+    SUM(weight * total_revenue) as total_revenue,
+    ROUND(CAST(SUM(weight * total_revenue) AS NUMERIC), 2) as rounded_revenue,
+    SUM(weight * (weight - 1) * order_count * order_count) as order_count_var,
+    SUM(weight * (weight - 1) * total_quantity * total_quantity) as total_quantity_var,
+    SUM(weight * (weight - 1) * total_revenue * total_revenue) as total_revenue_var,
+    COUNT(*) as sample_size
+FROM per_sale
+GROUP BY category_id, category_name
+ORDER BY total_revenue DESC
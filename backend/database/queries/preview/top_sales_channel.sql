@@ -0,0 +1,29 @@
+-- Prévia de vendas_e_desempenho/top_sales_channel a partir da amostra sales_sample
+WITH coverage AS (
+    SELECT last_sale_id FROM rollup_state WHERE name = 'sales_sample'
+),
+sampled AS (
+    SELECT channel_id, weight, total_amount
+    FROM sales_sample
+    WHERE created_at >= $1::date AND created_at < $2::date + 1
+    AND sale_status_desc = 'COMPLETED'
+    UNION ALL
+    -- Cauda: vendas posteriores ao último refresh da amostra entram todas (peso 1, variância 0)
+    SELECT channel_id, 1::numeric, total_amount
+    FROM sales
+    WHERE id > COALESCE((SELECT last_sale_id FROM coverage), 0)
+    AND created_at >= $1::date AND created_at < $2::date + 1
+    AND sale_status_desc = 'COMPLETED'
+)
+SELECT 
+    c.name as channel,
+    SUM(s.weight) as order_count,
+    SUM(s.weight * s.total_amount) as total_revenue,
+    ROUND(SUM(s.weight) * 100.0 / (SELECT SUM(weight) FROM sampled), 2) as percentage,
+    SUM(s.weight * (s.weight - 1)) as order_count_var,
+    SUM(s.weight * (s.weight - 1) * s.total_amount * s.total_amount) as total_revenue_var,
+    COUNT(*) as sample_size
+FROM sampled s
+JOIN channels c ON s.channel_id = c.id
+GROUP BY c.id, c.name
+ORDER BY order_count DESC;
@@ -0,0 +1,27 @@
+-- Prévia de vendas_e_desempenho/total_sales_period a partir da amostra sales_sample.
+-- Cada venda amostrada vale `weight` vendas (1/probabilidade de entrar na amostra): as somas ponderadas
+-- são as estimativas (Horvitz-Thompson) e as colunas *_var, as variâncias usadas nos intervalos.
+WITH coverage AS (
+    SELECT last_sale_id FROM rollup_state WHERE name = 'sales_sample'
+),
+sampled AS (
+    SELECT weight, total_amount
+    FROM sales_sample
+    WHERE created_at >= $1::date AND created_at < $2::date + 1
+    AND sale_status_desc = 'COMPLETED'
+    UNION ALL
+    -- Cauda: vendas posteriores ao último refresh da amostra entram todas (peso 1, variância 0)
+    SELECT 1::numeric, total_amount
+    FROM sales
+    WHERE id > COALESCE((SELECT last_sale_id FROM coverage), 0)
+    AND created_at >= $1::date AND created_at < $2::date + 1
+    AND sale_status_desc = 'COMPLETED'
+)
+SELECT
+    SUM(weight) as total_orders,
+    SUM(weight * total_amount) as total_revenue,
+    SUM(weight * total_amount) / NULLIF(SUM(weight), 0) as avg_ticket,
+    SUM(weight * (weight - 1)) as total_orders_var,
+    SUM(weight * (weight - 1) * total_amount * total_amount) as total_revenue_var,
+    COUNT(*) as sample_size
+FROM sampled;
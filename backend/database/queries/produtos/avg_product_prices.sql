@@ -1,3 +1,9 @@
+-- Faixa de ids das vendas do período: poda as partições das tabelas filhas (particionadas por sale_id)
+WITH sale_range AS (
+    SELECT MIN(id) AS first_id, MAX(id) AS last_id
+    FROM sales
+    WHERE created_at >= $1::date AND created_at < $2::date + 1
+)
 SELECT 
     AVG(ps.base_price) as avg_product_price,
     MIN(ps.base_price) as min_price,
@@ -6,4 +12,5 @@ SELECT
 FROM product_sales ps
 JOIN sales s ON ps.sale_id = s.id
 WHERE s.sale_status_desc = 'COMPLETED'
-AND DATE(s.created_at) BETWEEN $1 AND $2;
\ No newline at end of file
+AND s.created_at >= $1::date AND s.created_at < $2::date + 1
+AND ps.sale_id BETWEEN (SELECT first_id FROM sale_range) AND (SELECT last_id FROM sale_range);
\ No newline at end of file
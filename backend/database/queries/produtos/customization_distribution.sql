@@ -11,7 +11,7 @@ WITH sales_customization AS (
         END as customization_type
     FROM sales s
     WHERE s.sale_status_desc = 'COMPLETED'
-    AND DATE(s.created_at) BETWEEN $1 AND $2
+    AND s.created_at >= $1::date AND s.created_at < $2::date + 1
 )
 SELECT 
     customization_type,
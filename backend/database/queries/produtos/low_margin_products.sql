@@ -13,7 +13,7 @@ LEFT JOIN categories c ON p.category_id = c.id
 LEFT JOIN product_sales ps ON p.id = ps.product_id
 LEFT JOIN sales s ON ps.sale_id = s.id AND s.sale_status_desc = 'COMPLETED'
 WHERE p.cost_price > 0 AND p.sale_price > 0
-AND (s.created_at IS NULL OR DATE(s.created_at) BETWEEN $1 AND $2)
+AND (s.created_at IS NULL OR (s.created_at >= $1::date AND s.created_at < $2::date + 1))
 GROUP BY p.id, p.name, p.category_id, c.name, p.cost_price, p.sale_price
 HAVING ((p.sale_price - p.cost_price) / p.sale_price) * 100 < 30  -- Margem < 30%
 ORDER BY margin_percentage ASC
@@ -0,0 +1,29 @@
+-- $3 = dia da semana (0 = domingo), $4/$5 = faixa de horas; NULL = sem filtro
+-- Faixa de ids das vendas do período: poda as partições das tabelas filhas (particionadas por sale_id)
+WITH sale_range AS (
+    SELECT MIN(id) AS first_id, MAX(id) AS last_id
+    FROM sales
+    WHERE created_at >= $1::date AND created_at < $2::date + 1
+)
+SELECT 
+    p.id as product_id,
+    p.name as product_name,
+    cat.name as category,
+    EXTRACT(DOW FROM s.created_at)::int as day_of_week,
+    EXTRACT(HOUR FROM s.created_at)::int as hour_of_day,
+    COUNT(*) as order_count,
+    SUM(ps.quantity) as total_quantity,
+    SUM(ps.total_price) as total_revenue
+FROM product_sales ps
+JOIN sales s ON s.id = ps.sale_id
+JOIN products p ON p.id = ps.product_id
+JOIN categories cat ON cat.id = p.category_id
+WHERE s.sale_status_desc = 'COMPLETED'
+AND s.created_at >= $1::date AND s.created_at < $2::date + 1
+AND ps.sale_id BETWEEN (SELECT first_id FROM sale_range) AND (SELECT last_id FROM sale_range)
+AND ($3::int IS NULL OR EXTRACT(DOW FROM s.created_at)::int = $3)
+AND ($4::int IS NULL OR EXTRACT(HOUR FROM s.created_at)::int >= $4)
+AND ($5::int IS NULL OR EXTRACT(HOUR FROM s.created_at)::int <= $5)
+GROUP BY p.id, p.name, cat.name, day_of_week, hour_of_day
+ORDER BY total_revenue DESC
+LIMIT $6;
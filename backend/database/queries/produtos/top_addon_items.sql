@@ -1,3 +1,14 @@
+-- Faixa de ids das vendas do período: poda as partições das tabelas filhas (particionadas por sale_id)
+WITH sale_range AS (
+    SELECT MIN(id) AS first_id, MAX(id) AS last_id
+    FROM sales
+    WHERE created_at >= $1::date AND created_at < $2::date + 1
+),
+product_sale_range AS (
+    SELECT MIN(id) AS first_id, MAX(id) AS last_id
+    FROM product_sales
+    WHERE sale_id BETWEEN (SELECT first_id FROM sale_range) AND (SELECT last_id FROM sale_range)
+)
 SELECT 
     i.name as item_name,
     c.name as category,
@@ -10,7 +21,9 @@ JOIN categories c ON i.category_id = c.id
 JOIN product_sales ps ON ips.product_sale_id = ps.id
 JOIN sales s ON ps.sale_id = s.id
 WHERE s.sale_status_desc = 'COMPLETED'
-AND DATE(s.created_at) BETWEEN $1 AND $2
+AND s.created_at >= $1::date AND s.created_at < $2::date + 1
+AND ps.sale_id BETWEEN (SELECT first_id FROM sale_range) AND (SELECT last_id FROM sale_range)
+AND ips.product_sale_id BETWEEN (SELECT first_id FROM product_sale_range) AND (SELECT last_id FROM product_sale_range)
 AND c.type = 'I'  -- Apenas categorias de itens
 GROUP BY i.id, i.name, c.name
 ORDER BY times_added DESC;
\ No newline at end of file
@@ -1,3 +1,9 @@
+-- Faixa de ids das vendas do período: poda as partições das tabelas filhas (particionadas por sale_id)
+WITH sale_range AS (
+    SELECT MIN(id) AS first_id, MAX(id) AS last_id
+    FROM sales
+    WHERE created_at >= $1::date AND created_at < $2::date + 1
+)
 SELECT 
     cat.name as category_name,
     COUNT(ps.id) as order_count,
@@ -10,6 +16,7 @@ JOIN categories cat ON cat.id = p.category_id
 JOIN sales s ON s.id = ps.sale_id
 WHERE s.sale_status_desc = 'COMPLETED'
   AND cat.type = 'P'
-  AND s.created_at BETWEEN $1 AND $2
+  AND s.created_at >= $1::date AND s.created_at < $2::date + 1
+  AND ps.sale_id BETWEEN (SELECT first_id FROM sale_range) AND (SELECT last_id FROM sale_range)
 GROUP BY cat.id, cat.name
 ORDER BY total_revenue DESC
\ No newline at end of file
@@ -0,0 +1,21 @@
+WITH coverage AS (
+    SELECT last_sale_id FROM rollup_state WHERE name = 'sales_daily'
+),
+daily AS (
+    SELECT sale_status_desc, order_count
+    FROM sales_daily
+    WHERE day BETWEEN $1 AND $2
+    UNION ALL
+    -- Cauda: vendas ainda não consolidadas no rollup
+    SELECT sale_status_desc, COUNT(*)
+    FROM sales
+    WHERE id > COALESCE((SELECT last_sale_id FROM coverage), 0)
+    AND created_at >= $1::date AND created_at < $2::date + 1
+    GROUP BY sale_status_desc
+)
+SELECT 
+    sale_status_desc as status,
+    SUM(order_count)::bigint as order_count,
+    ROUND((SUM(order_count) * 100.0 / NULLIF(SUM(SUM(order_count)) OVER (), 0)), 2) as percentage
+FROM daily
+GROUP BY sale_status_desc;
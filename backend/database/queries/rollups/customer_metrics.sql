@@ -0,0 +1,42 @@
+-- Resumo da base de clientes a partir de customer_stats + cauda ainda não consolidada.
+-- Novos clientes são os do período; recorrência e recência usam os totais atuais, com $2 como referência.
+-- $1/$2 período, $3 dias sem comprar para "em risco", $4 dias sem comprar para "perdido"
+WITH coverage AS (
+    SELECT last_sale_id FROM rollup_state WHERE name = 'customer_stats'
+),
+tail AS (
+    SELECT
+        customer_id,
+        COUNT(*) as order_count,
+        SUM(total_amount) as total_spent,
+        MIN(created_at) as first_order_at,
+        MAX(created_at) as last_order_at
+    FROM sales
+    WHERE id > COALESCE((SELECT last_sale_id FROM coverage), 0)
+    AND sale_status_desc = 'COMPLETED'
+    AND customer_id IS NOT NULL
+    GROUP BY customer_id
+),
+merged AS (
+    SELECT
+        COALESCE(cs.order_count, 0) + COALESCE(t.order_count, 0) as order_count,
+        COALESCE(cs.total_spent, 0) + COALESCE(t.total_spent, 0) as total_spent,
+        LEAST(cs.first_order_at, t.first_order_at) as first_order_at,
+        GREATEST(cs.last_order_at, t.last_order_at) as last_order_at
+    FROM customer_stats cs
+    FULL JOIN tail t ON t.customer_id = cs.customer_id
+)
+SELECT
+    COUNT(*) as customers_with_orders,
+    COUNT(*) FILTER (WHERE first_order_at >= $1::date) as new_customers,
+    COUNT(*) FILTER (WHERE order_count >= 2) as repeat_customers,
+    ROUND(COUNT(*) FILTER (WHERE order_count >= 2) * 100.0 / NULLIF(COUNT(*), 0), 2) as repeat_rate,
+    COUNT(*) FILTER (
+        WHERE last_order_at < $2::date + 1 - $3::int
+        AND last_order_at >= $2::date + 1 - $4::int
+    ) as at_risk_customers,
+    COUNT(*) FILTER (WHERE last_order_at < $2::date + 1 - $4::int) as lost_customers,
+    ROUND(AVG(order_count), 2) as avg_orders_per_customer,
+    ROUND(AVG(total_spent), 2) as avg_lifetime_value
+FROM merged
+WHERE first_order_at < $2::date + 1;
@@ -0,0 +1,68 @@
+-- Clientes por recorrência e recência lidos de customer_stats (ou de customer_store_stats quando há loja),
+-- somando as vendas ainda não consolidadas no rollup (a "cauda").
+-- $1 data de referência, $2 mínimo de pedidos, $3 mínimo de dias sem comprar, $4 máximo de dias sem comprar (opcional),
+-- $5 loja (opcional), $6 limite
+WITH coverage AS (
+    SELECT last_sale_id FROM rollup_state
+    WHERE name = CASE WHEN $5::int IS NULL THEN 'customer_stats' ELSE 'customer_store_stats' END
+),
+tail AS (
+    SELECT
+        customer_id,
+        COUNT(*) as order_count,
+        SUM(total_amount) as total_spent,
+        MIN(created_at) as first_order_at,
+        MAX(created_at) as last_order_at
+    FROM sales
+    WHERE id > COALESCE((SELECT last_sale_id FROM coverage), 0)
+    AND sale_status_desc = 'COMPLETED'
+    AND customer_id IS NOT NULL
+    AND ($5::int IS NULL OR store_id = $5::int)
+    GROUP BY customer_id
+),
+stats AS (
+    -- A cauda só pode deixar a última compra mais recente: o filtro de recência já vale no rollup
+    SELECT customer_id, order_count, total_spent, first_order_at, last_order_at
+    FROM customer_stats
+    WHERE $5::int IS NULL
+    AND last_order_at < $1::date + 1 - $3::int
+    AND ($4::int IS NULL OR last_order_at >= $1::date + 1 - $4::int)
+    UNION ALL
+    SELECT customer_id, order_count, total_spent, first_order_at, last_order_at
+    FROM customer_store_stats
+    WHERE store_id = $5::int
+    AND last_order_at < $1::date + 1 - $3::int
+    AND ($4::int IS NULL OR last_order_at >= $1::date + 1 - $4::int)
+),
+merged AS (
+    SELECT
+        st.customer_id,
+        st.order_count + COALESCE(t.order_count, 0) as order_count,
+        st.total_spent + COALESCE(t.total_spent, 0) as total_spent,
+        LEAST(st.first_order_at, t.first_order_at) as first_order_at,
+        GREATEST(st.last_order_at, t.last_order_at) as last_order_at
+    FROM stats st
+    LEFT JOIN tail t ON t.customer_id = st.customer_id
+    UNION ALL
+    -- Clientes que só aparecem na cauda
+    SELECT t.customer_id, t.order_count, t.total_spent, t.first_order_at, t.last_order_at
+    FROM tail t
+    WHERE NOT EXISTS (SELECT 1 FROM customer_stats cs WHERE cs.customer_id = t.customer_id AND $5::int IS NULL)
+    AND NOT EXISTS (SELECT 1 FROM customer_store_stats css WHERE css.customer_id = t.customer_id AND css.store_id = $5::int)
+)
+SELECT
+    m.customer_id,
+    c.customer_name,
+    m.order_count,
+    m.total_spent,
+    ROUND(m.total_spent / NULLIF(m.order_count, 0), 2) as avg_ticket,
+    m.first_order_at,
+    m.last_order_at,
+    $1::date - m.last_order_at::date as days_since_last_order
+FROM merged m
+LEFT JOIN customers c ON c.id = m.customer_id
+WHERE m.order_count >= $2
+AND m.last_order_at < $1::date + 1 - $3::int
+AND ($4::int IS NULL OR m.last_order_at >= $1::date + 1 - $4::int)
+ORDER BY m.total_spent DESC
+LIMIT $6;
@@ -0,0 +1,24 @@
+WITH coverage AS (
+    SELECT last_sale_id FROM rollup_state WHERE name = 'sales_hourly'
+),
+hourly AS (
+    SELECT hour, order_count, total_amount
+    FROM sales_hourly
+    WHERE day BETWEEN $1 AND $2
+    AND sale_status_desc = 'COMPLETED'
+    UNION ALL
+    -- Cauda: vendas ainda não consolidadas no rollup
+    SELECT EXTRACT(HOUR FROM created_at)::smallint, COUNT(*), SUM(total_amount)
+    FROM sales
+    WHERE id > COALESCE((SELECT last_sale_id FROM coverage), 0)
+    AND created_at >= $1::date AND created_at < $2::date + 1
+    AND sale_status_desc = 'COMPLETED'
+    GROUP BY 1
+)
+SELECT 
+    hour as hour_of_day,
+    SUM(order_count)::bigint as order_count,
+    SUM(total_amount) as total_revenue
+FROM hourly
+GROUP BY hour
+ORDER BY order_count DESC;
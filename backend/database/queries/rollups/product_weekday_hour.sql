@@ -0,0 +1,38 @@
+-- $3 = dia da semana (0 = domingo), $4/$5 = faixa de horas; NULL = sem filtro
+WITH coverage AS (
+    SELECT last_sale_id FROM rollup_state WHERE name = 'product_sales_hourly'
+),
+cells AS (
+    SELECT product_id, day, hour, order_count, total_quantity, total_revenue
+    FROM product_sales_hourly
+    WHERE day BETWEEN $1 AND $2
+    UNION ALL
+    -- Cauda: vendas ainda não consolidadas no rollup
+    SELECT ps.product_id, DATE(s.created_at), EXTRACT(HOUR FROM s.created_at)::smallint,
+           COUNT(*), SUM(ps.quantity), SUM(ps.total_price)
+    FROM product_sales ps
+    JOIN sales s ON s.id = ps.sale_id
+    WHERE s.id > COALESCE((SELECT last_sale_id FROM coverage), 0)
+    AND ps.sale_id > COALESCE((SELECT last_sale_id FROM coverage), 0)
+    AND s.sale_status_desc = 'COMPLETED'
+    AND s.created_at >= $1::date AND s.created_at < $2::date + 1
+    GROUP BY 1, 2, 3
+)
+SELECT 
+    p.id as product_id,
+    p.name as product_name,
+    cat.name as category,
+    EXTRACT(DOW FROM c.day)::int as day_of_week,
+    c.hour::int as hour_of_day,
+    SUM(c.order_count)::bigint as order_count,
+    SUM(c.total_quantity) as total_quantity,
+    SUM(c.total_revenue) as total_revenue
+FROM cells c
+JOIN products p ON p.id = c.product_id
+JOIN categories cat ON cat.id = p.category_id
+WHERE ($3::int IS NULL OR EXTRACT(DOW FROM c.day)::int = $3)
+AND ($4::int IS NULL OR c.hour >= $4)
+AND ($5::int IS NULL OR c.hour <= $5)
+GROUP BY p.id, p.name, cat.name, day_of_week, hour_of_day
+ORDER BY total_revenue DESC
+LIMIT $6;
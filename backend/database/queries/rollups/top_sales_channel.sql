@@ -0,0 +1,26 @@
+WITH coverage AS (
+    SELECT last_sale_id FROM rollup_state WHERE name = 'sales_daily'
+),
+daily AS (
+    SELECT channel_id, order_count, total_amount
+    FROM sales_daily
+    WHERE day BETWEEN $1 AND $2
+    AND sale_status_desc = 'COMPLETED'
+    UNION ALL
+    -- Cauda: vendas ainda não consolidadas no rollup
+    SELECT channel_id, COUNT(*), SUM(total_amount)
+    FROM sales
+    WHERE id > COALESCE((SELECT last_sale_id FROM coverage), 0)
+    AND created_at >= $1::date AND created_at < $2::date + 1
+    AND sale_status_desc = 'COMPLETED'
+    GROUP BY channel_id
+)
+SELECT 
+    c.name as channel,
+    SUM(d.order_count)::bigint as order_count,
+    SUM(d.total_amount) as total_revenue,
+    ROUND((SUM(d.order_count) * 100.0 / NULLIF(SUM(SUM(d.order_count)) OVER (), 0)), 2) as percentage
+FROM daily d
+JOIN channels c ON d.channel_id = c.id
+GROUP BY c.id, c.name
+ORDER BY order_count DESC;
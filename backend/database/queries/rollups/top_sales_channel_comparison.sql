@@ -0,0 +1,39 @@
+-- compare_to de top_sales_channel a partir de sales_daily: os dois períodos na mesma leitura
+WITH coverage AS (
+    SELECT last_sale_id FROM rollup_state WHERE name = 'sales_daily'
+),
+daily AS (
+    SELECT day, channel_id, order_count, total_amount
+    FROM sales_daily
+    WHERE (day BETWEEN $1 AND $2 OR day BETWEEN $3 AND $4)
+    AND sale_status_desc = 'COMPLETED'
+    UNION ALL
+    -- Cauda: vendas ainda não consolidadas no rollup
+    SELECT DATE(created_at), channel_id, COUNT(*), SUM(total_amount)
+    FROM sales
+    WHERE id > COALESCE((SELECT last_sale_id FROM coverage), 0)
+    AND ((created_at >= $1::date AND created_at < $2::date + 1) OR (created_at >= $3::date AND created_at < $4::date + 1))
+    AND sale_status_desc = 'COMPLETED'
+    GROUP BY 1, 2
+),
+by_channel AS (
+    SELECT 
+        channel_id,
+        COALESCE(SUM(order_count) FILTER (WHERE day BETWEEN $1 AND $2), 0)::bigint as order_count,
+        COALESCE(SUM(total_amount) FILTER (WHERE day BETWEEN $1 AND $2), 0) as total_revenue,
+        COALESCE(SUM(order_count) FILTER (WHERE day BETWEEN $3 AND $4), 0)::bigint as previous_order_count,
+        COALESCE(SUM(total_amount) FILTER (WHERE day BETWEEN $3 AND $4), 0) as previous_total_revenue
+    FROM daily
+    GROUP BY channel_id
+)
+SELECT 
+    c.name as channel,
+    b.order_count,
+    b.total_revenue,
+    ROUND((b.order_count * 100.0 / NULLIF(SUM(b.order_count) OVER (), 0)), 2) as percentage,
+    b.previous_order_count,
+    b.previous_total_revenue,
+    ROUND((b.previous_order_count * 100.0 / NULLIF(SUM(b.previous_order_count) OVER (), 0)), 2) as previous_percentage
+FROM by_channel b
+JOIN channels c ON b.channel_id = c.id
+ORDER BY b.order_count DESC, b.previous_order_count DESC;
@@ -0,0 +1,33 @@
+WITH coverage AS (
+    SELECT last_sale_id FROM rollup_state WHERE name = 'sales_daily'
+),
+daily AS (
+    SELECT day, order_count, total_amount
+    FROM sales_daily
+    WHERE day BETWEEN $1 AND $2
+    AND sale_status_desc = 'COMPLETED'
+    UNION ALL
+    -- Cauda: vendas ainda não consolidadas no rollup
+    SELECT DATE(created_at), COUNT(*), SUM(total_amount)
+    FROM sales
+    WHERE id > COALESCE((SELECT last_sale_id FROM coverage), 0)
+    AND created_at >= $1::date AND created_at < $2::date + 1
+    AND sale_status_desc = 'COMPLETED'
+    GROUP BY DATE(created_at)
+)
+SELECT 
+    EXTRACT(DOW FROM day) as day_of_week,
+    CASE EXTRACT(DOW FROM day)
+        WHEN 0 THEN 'Domingo'
+        WHEN 1 THEN 'Segunda'
+        WHEN 2 THEN 'Terça' 
+        WHEN 3 THEN 'Quarta'
+        WHEN 4 THEN 'Quinta'
+        WHEN 5 THEN 'Sexta'
+        WHEN 6 THEN 'Sábado'
+    END as day_name,
+    SUM(order_count)::bigint as order_count,
+    SUM(total_amount) as total_revenue
+FROM daily
+GROUP BY day_of_week, day_name
+ORDER BY order_count DESC;
@@ -0,0 +1,21 @@
+WITH coverage AS (
+    SELECT last_sale_id FROM rollup_state WHERE name = 'sales_daily'
+),
+daily AS (
+    SELECT order_count, total_amount
+    FROM sales_daily
+    WHERE day BETWEEN $1 AND $2
+    AND sale_status_desc = 'COMPLETED'
+    UNION ALL
+    -- Cauda: vendas ainda não consolidadas no rollup
+    SELECT COUNT(*), SUM(total_amount)
+    FROM sales
+    WHERE id > COALESCE((SELECT last_sale_id FROM coverage), 0)
+    AND created_at >= $1::date AND created_at < $2::date + 1
+    AND sale_status_desc = 'COMPLETED'
+)
+SELECT 
+    SUM(order_count)::bigint as total_orders,
+    SUM(total_amount) as total_revenue,
+    SUM(total_amount) / NULLIF(SUM(order_count), 0) as avg_ticket
+FROM daily;
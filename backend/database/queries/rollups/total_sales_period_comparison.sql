@@ -0,0 +1,28 @@
+-- compare_to de total_sales_period a partir de sales_daily: os dois períodos na mesma leitura
+WITH coverage AS (
+    SELECT last_sale_id FROM rollup_state WHERE name = 'sales_daily'
+),
+daily AS (
+    SELECT day, order_count, total_amount
+    FROM sales_daily
+    WHERE (day BETWEEN $1 AND $2 OR day BETWEEN $3 AND $4)
+    AND sale_status_desc = 'COMPLETED'
+    UNION ALL
+    -- Cauda: vendas ainda não consolidadas no rollup
+    SELECT DATE(created_at), COUNT(*), SUM(total_amount)
+    FROM sales
+    WHERE id > COALESCE((SELECT last_sale_id FROM coverage), 0)
+    AND ((created_at >= $1::date AND created_at < $2::date + 1) OR (created_at >= $3::date AND created_at < $4::date + 1))
+    AND sale_status_desc = 'COMPLETED'
+    GROUP BY 1
+)
+SELECT 
+    COALESCE(SUM(order_count) FILTER (WHERE day BETWEEN $1 AND $2), 0)::bigint as total_orders,
+    COALESCE(SUM(total_amount) FILTER (WHERE day BETWEEN $1 AND $2), 0) as total_revenue,
+    SUM(total_amount) FILTER (WHERE day BETWEEN $1 AND $2)
+        / NULLIF(SUM(order_count) FILTER (WHERE day BETWEEN $1 AND $2), 0) as avg_ticket,
+    COALESCE(SUM(order_count) FILTER (WHERE day BETWEEN $3 AND $4), 0)::bigint as previous_total_orders,
+    COALESCE(SUM(total_amount) FILTER (WHERE day BETWEEN $3 AND $4), 0) as previous_total_revenue,
+    SUM(total_amount) FILTER (WHERE day BETWEEN $3 AND $4)
+        / NULLIF(SUM(order_count) FILTER (WHERE day BETWEEN $3 AND $4), 0) as previous_avg_ticket
+FROM daily;
@@ -15,7 +15,7 @@ SELECT
     AVG(sa.delivery_seconds) as avg_delivery_time
 FROM stores s
 LEFT JOIN sales sa ON s.id = sa.store_id 
-    AND sa.created_at BETWEEN $1 AND $2
+    AND sa.created_at >= $1::date AND sa.created_at < $2::date + 1
 WHERE s.id = ANY($3)  -- Filtro por IDs de lojas
 GROUP BY s.id, s.name, s.city, s.state
 ORDER BY total_revenue DESC
\ No newline at end of file
@@ -10,7 +10,7 @@ SELECT
     RANK() OVER (ORDER BY SUM(CASE WHEN sa.sale_status_desc = 'COMPLETED' THEN sa.total_amount ELSE 0 END) DESC) as revenue_rank
 FROM stores s
 LEFT JOIN sales sa ON s.id = sa.store_id 
-    AND sa.created_at BETWEEN $1 AND $2
+    AND sa.created_at >= $1::date AND sa.created_at < $2::date + 1
 WHERE s.is_active = true
 GROUP BY s.id, s.name, s.city, s.state
 ORDER BY total_revenue DESC
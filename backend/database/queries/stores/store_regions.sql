@@ -10,7 +10,7 @@ SELECT
     2) as cancellation_rate
 FROM stores s
 LEFT JOIN sales sa ON s.id = sa.store_id 
-    AND sa.created_at BETWEEN $1 AND $2
+    AND sa.created_at >= $1::date AND sa.created_at < $2::date + 1
 WHERE s.is_active = true
 GROUP BY s.city, s.state
 ORDER BY total_revenue DESC
\ No newline at end of file
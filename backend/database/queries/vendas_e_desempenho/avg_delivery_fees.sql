@@ -5,4 +5,4 @@ SELECT
     SUM(service_tax_fee) as total_service_fees
 FROM sales 
 WHERE sale_status_desc = 'COMPLETED'
-AND DATE(created_at) BETWEEN $1 AND $2;
\ No newline at end of file
+AND created_at >= $1::date AND created_at < $2::date + 1;
\ No newline at end of file
@@ -3,4 +3,4 @@ SELECT
     PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY total_amount) as median_ticket
 FROM sales 
 WHERE sale_status_desc = 'COMPLETED'
-AND DATE(created_at) BETWEEN $1 AND $2;
\ No newline at end of file
+AND created_at >= $1::date AND created_at < $2::date + 1;
\ No newline at end of file
@@ -1,7 +1,7 @@
 SELECT 
     sale_status_desc as status,
     COUNT(*) as order_count,
-    ROUND((COUNT(*) * 100.0 / (SELECT COUNT(*) FROM sales WHERE DATE(created_at) BETWEEN $1 AND $2)), 2) as percentage
+    ROUND((COUNT(*) * 100.0 / (SELECT COUNT(*) FROM sales WHERE created_at >= $1::date AND created_at < $2::date + 1)), 2) as percentage
 FROM sales 
-WHERE DATE(created_at) BETWEEN $1 AND $2
+WHERE created_at >= $1::date AND created_at < $2::date + 1
 GROUP BY sale_status_desc;
\ No newline at end of file
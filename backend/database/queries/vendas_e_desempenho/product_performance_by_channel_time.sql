@@ -21,29 +21,3 @@ WITH product_metrics AS (
 )
 SELECT * FROM product_metrics
 ORDER BY total_revenue DESC;
-
-WITH customer_metrics AS (
-    SELECT 
-        c.id as customer_id,
-        c.customer_name,
-        COUNT(DISTINCT DATE(s.created_at)) as distinct_days_visited,
-        COUNT(s.id) as total_orders,
-        SUM(s.total_amount) as total_spent,
-        AVG(s.total_amount) as avg_ticket,
-        MAX(s.created_at) as last_order_date,
-        MIN(s.created_at) as first_order_date
-    FROM customers c
-    JOIN sales s ON c.id = s.customer_id
-    WHERE s.sale_status_desc = 'COMPLETED'
-    GROUP BY c.id, c.customer_name
-    HAVING COUNT(s.id) >= 3  -- Clientes com 3+ pedidos
-)
-SELECT 
-    *,
-    CASE 
-        WHEN last_order_date < CURRENT_DATE - INTERVAL '30 days' THEN 'CHURN_RISK'
-        WHEN last_order_date < CURRENT_DATE - INTERVAL '60 days' THEN 'CHURNED'
-        ELSE 'ACTIVE'
-    END as customer_status
-FROM customer_metrics
-ORDER BY total_spent DESC;
\ No newline at end of file
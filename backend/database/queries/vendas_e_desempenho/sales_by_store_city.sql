@@ -7,6 +7,6 @@ SELECT
 FROM sales s
 JOIN stores st ON s.store_id = st.id
 WHERE s.sale_status_desc = 'COMPLETED'
-AND DATE(s.created_at) BETWEEN $1 AND $2
+AND s.created_at >= $1::date AND s.created_at < $2::date + 1
 GROUP BY st.id, st.name, st.city
 ORDER BY total_revenue DESC;
\ No newline at end of file
@@ -1,4 +1,10 @@
-WITH product_sales AS (
+-- Faixa de ids das vendas do período: poda as partições das tabelas filhas (particionadas por sale_id)
+WITH sale_range AS (
+    SELECT MIN(id) AS first_id, MAX(id) AS last_id
+    FROM sales
+    WHERE created_at >= $1::date AND created_at < $2::date + 1
+),
+product_sales AS (
     SELECT 
         p.id,
         p.name,
@@ -10,7 +16,8 @@ WITH product_sales AS (
     JOIN products p ON ps.product_id = p.id
     JOIN sales s ON ps.sale_id = s.id
     WHERE s.sale_status_desc = 'COMPLETED'
-    AND DATE(s.created_at) BETWEEN $1 AND $2
+    AND s.created_at >= $1::date AND s.created_at < $2::date + 1
+    AND ps.sale_id BETWEEN (SELECT first_id FROM sale_range) AND (SELECT last_id FROM sale_range)
     GROUP BY p.id, p.name, p.category_id
 )
 SELECT 
@@ -13,6 +13,6 @@ SELECT
     SUM(s.total_amount) as total_revenue
 FROM sales s
 WHERE s.sale_status_desc = 'COMPLETED'
-AND DATE(s.created_at) BETWEEN $1 AND $2
+AND s.created_at >= $1::date AND s.created_at < $2::date + 1
 GROUP BY day_of_week
 ORDER BY order_count DESC;
\ No newline at end of file
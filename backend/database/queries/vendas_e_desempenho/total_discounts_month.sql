@@ -4,4 +4,4 @@ SELECT
     ROUND((SUM(total_discount) * 100.0 / NULLIF(SUM(total_amount + total_discount), 0)), 2) as discount_percentage
 FROM sales 
 WHERE sale_status_desc = 'COMPLETED'
-AND DATE(created_at) BETWEEN $1 AND $2;
\ No newline at end of file
+AND created_at >= $1::date AND created_at < $2::date + 1;
\ No newline at end of file
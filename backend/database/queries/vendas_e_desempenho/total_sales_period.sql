@@ -3,5 +3,5 @@ SELECT
     SUM(total_amount) as total_revenue,
     AVG(total_amount) as avg_ticket
 FROM sales 
-WHERE DATE(created_at) BETWEEN $1 AND $2 
+WHERE created_at >= $1::date AND created_at < $2::date + 1 
 AND sale_status_desc = 'COMPLETED';
\ No newline at end of file
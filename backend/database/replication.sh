@@ -0,0 +1,4 @@
+#!/bin/sh
+# Libera conexões de replicação para o serviço postgres-replica (docker-compose --profile replica).
+# Só roda na criação do volume: numa base já existente, acrescente a linha ao pg_hba.conf e recarregue.
+echo "host replication all all scram-sha-256" >> "$PGDATA/pg_hba.conf"
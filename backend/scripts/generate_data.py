@@ -4,6 +4,7 @@ God Level Coder Challenge - Data Generator
 Generates realistic restaurant data based on Arcca's actual models
 """
 
+import os
 import random
 import argparse
 from datetime import datetime, timedelta
@@ -12,6 +13,8 @@ import psycopg2
 from psycopg2.extras import execute_batch
 from faker import Faker
 
+INDEXES_FILE = os.path.join(os.path.dirname(__file__), '..', 'database', 'indexes.sql')
+
 fake = Faker('pt_BR')
 
 # Configurations
@@ -642,25 +645,25 @@ def insert_sales_batch(cursor, sales_batch, items, option_groups):
 
 
 def create_indexes(conn):
-    """Create performance indexes"""
+    """Create performance indexes (database/indexes.sql, the same set the backend checks)"""
     print("Creating indexes...")
     cursor = conn.cursor()
-    
-    # Additional indexes
-    indexes = [
-        "CREATE INDEX IF NOT EXISTS idx_sales_date_status ON sales(DATE(created_at), sale_status_desc)",
-        "CREATE INDEX IF NOT EXISTS idx_product_sales_product_sale ON product_sales(product_id, sale_id)",
-    ]
-    
-    for idx in indexes:
+
+    with open(INDEXES_FILE, encoding='utf-8') as f:
+        statements = [line.strip().rstrip(';') for line in f
+                      if line.strip() and not line.strip().startswith('--')]
+
+    failed = 0
+    for statement in statements:
         try:
-            cursor.execute(idx)
-        except:
-            pass
-    
-    
-    conn.commit()
-    print("✓ Indexes created")
+            cursor.execute(statement)
+            conn.commit()
+        except psycopg2.Error as e:
+            conn.rollback()
+            failed += 1
+            print(f"  ⚠️  {statement[:80]}...: {str(e).strip()}")
+
+    print(f"✓ Indexes created ({len(statements) - failed}/{len(statements)})")
 
 
 def main():
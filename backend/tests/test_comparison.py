@@ -0,0 +1,90 @@
+import copy
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from app.services.comparison import comparison_period, with_deltas
+
+
+@pytest.mark.parametrize("start, end, expected", [
+    (date(2025, 10, 1), date(2025, 10, 31), (date(2025, 8, 31), date(2025, 9, 30))),
+    (date(2025, 3, 1), date(2025, 3, 1), (date(2025, 2, 28), date(2025, 2, 28))),
+    (date(2024, 3, 1), date(2024, 3, 7), (date(2024, 2, 23), date(2024, 2, 29))),
+])
+def test_previous_period_has_same_length_right_before(start, end, expected):
+    previous_start, previous_end = comparison_period(start, end, "previous_period")
+    assert (previous_start, previous_end) == expected
+    assert (previous_end - previous_start) == (end - start)
+
+
+def test_previous_year():
+    assert comparison_period(date(2025, 5, 1), date(2025, 5, 31), "previous_year") == (date(2024, 5, 1), date(2024, 5, 31))
+
+
+def test_previous_year_from_february_29():
+    # 29/02 não existe no ano anterior: vira 28/02
+    assert comparison_period(date(2024, 2, 29), date(2024, 2, 29), "previous_year") == (date(2023, 2, 28), date(2023, 2, 28))
+    assert comparison_period(date(2024, 2, 1), date(2024, 2, 29), "previous_year") == (date(2023, 2, 1), date(2023, 2, 28))
+
+
+def test_custom_period():
+    assert comparison_period(
+        date(2025, 5, 1), date(2025, 5, 31), "custom", date(2025, 1, 1), date(2025, 1, 10)
+    ) == (date(2025, 1, 1), date(2025, 1, 10))
+
+
+@pytest.mark.parametrize("compare_start, compare_end", [
+    (None, None),
+    (date(2025, 1, 1), None),
+    (None, date(2025, 1, 1)),
+    (date(2025, 1, 10), date(2025, 1, 1)),
+])
+def test_custom_period_requires_valid_dates(compare_start, compare_end):
+    with pytest.raises(ValueError):
+        comparison_period(date(2025, 5, 1), date(2025, 5, 31), "custom", compare_start, compare_end)
+
+
+def test_unknown_compare_to():
+    with pytest.raises(ValueError, match="compare_to desconhecido"):
+        comparison_period(date(2025, 5, 1), date(2025, 5, 31), "previous_week")
+
+
+def test_deltas_and_change_pct():
+    [row] = with_deltas([{"revenue": Decimal("150.00"), "previous_revenue": Decimal("100.00"),
+                          "orders": 8, "previous_orders": 10}])
+    assert row["revenue_delta"] == Decimal("50.00")
+    assert row["revenue_change_pct"] == 50.0
+    assert row["orders_delta"] == -2
+    assert row["orders_change_pct"] == -20.0
+
+
+def test_zero_previous_keeps_delta_without_change_pct():
+    [row] = with_deltas([{"orders": 5, "previous_orders": 0}])
+    assert row["orders_delta"] == 5
+    assert row["orders_change_pct"] is None
+
+
+def test_negative_previous_uses_absolute_value():
+    [row] = with_deltas([{"margin": -50, "previous_margin": -100}])
+    assert row["margin_change_pct"] == 50.0
+
+
+@pytest.mark.parametrize("current, previous", [(None, 10), (10, None)])
+def test_missing_value_gives_none(current, previous):
+    [row] = with_deltas([{"orders": current, "previous_orders": previous}])
+    assert row["orders_delta"] is None
+    assert row["orders_change_pct"] is None
+
+
+def test_skips_non_numeric_and_unmatched_columns():
+    [row] = with_deltas([{"store_name": "Loja 1", "previous_store_name": "Loja 1", "previous_orders": 3}])
+    assert row == {"store_name": "Loja 1", "previous_store_name": "Loja 1", "previous_orders": 3}
+
+
+def test_does_not_mutate_input():
+    rows = [{"orders": 5, "previous_orders": 4}]
+    original = copy.deepcopy(rows)
+    result = with_deltas(rows)
+    assert rows == original
+    assert result[0] is not rows[0]
@@ -0,0 +1,58 @@
+import hashlib
+import math
+import random
+
+import pytest
+
+from app.services.hll import (
+    _ALPHA, _VALUE_BITS, CONFIDENCE_Z, REGISTERS, RELATIVE_ERROR, estimate_cardinality, with_bounds,
+)
+
+def _sketch(values):
+    """Mesmo cálculo do SQL: hash de 32 bits, registrador nos bits altos, rho nos baixos."""
+    registers = {}
+    for value in values:
+        h = int.from_bytes(hashlib.md5(str(value).encode()).digest()[:4], "big")
+        register = h >> _VALUE_BITS
+        rho = _VALUE_BITS + 1 - (h & ((1 << _VALUE_BITS) - 1)).bit_length()
+        registers[register] = max(registers.get(register, 0), rho)
+    return len(registers), sum(2.0 ** -rho for rho in registers.values())
+
+
+def test_empty_sketch_estimates_zero():
+    assert estimate_cardinality(0, 0.0) == 0.0
+
+
+@pytest.mark.parametrize("n", [10, 500, 3_000, 50_000])
+def test_estimate_within_expected_error(n):
+    # Pequenas cardinalidades caem na contagem linear; as grandes, no estimador harmônico
+    ids = random.Random(n).sample(range(10_000_000), n)
+    estimate = estimate_cardinality(*_sketch(ids))
+    assert abs(estimate - n) <= max(1, 3 * RELATIVE_ERROR * n)
+
+
+def test_duplicates_do_not_change_estimate():
+    ids = list(range(1_000))
+    assert estimate_cardinality(*_sketch(ids)) == estimate_cardinality(*_sketch(ids * 3))
+
+
+def test_all_registers_filled_uses_harmonic_estimator():
+    # Todos os registradores com rho = 1: sem registradores zerados não há contagem linear
+    estimate = estimate_cardinality(REGISTERS, REGISTERS * 0.5)
+    assert math.isclose(estimate, 2 * _ALPHA * REGISTERS)
+
+
+@pytest.mark.parametrize("estimate", [0.0, 3.2, 1_234.6, 98_765.4])
+def test_bounds_contain_estimate(estimate):
+    bounds = with_bounds(estimate)
+    assert bounds["estimate"] == round(estimate)
+    assert 0 <= bounds["low"] <= estimate <= bounds["high"]
+    assert bounds["confidence"] == 0.95
+    assert bounds["relative_error"] == round(RELATIVE_ERROR, 4)
+
+
+def test_bounds_margin_is_proportional_to_estimate():
+    bounds = with_bounds(100_000.0)
+    margin = 100_000 * RELATIVE_ERROR * CONFIDENCE_Z
+    assert bounds["low"] == math.floor(100_000 - margin)
+    assert bounds["high"] == math.ceil(100_000 + margin)
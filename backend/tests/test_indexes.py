@@ -0,0 +1,53 @@
+import pytest
+
+from app.services.indexes import _normalize, load_index_definitions
+
+# pg_get_indexdef de cada índice de database/indexes.sql, como o PostgreSQL 16 devolve depois do CREATE
+PG_INDEXDEF = {
+    "idx_sales_created_at_brin": "CREATE INDEX idx_sales_created_at_brin ON public.sales USING brin (created_at) WITH (pages_per_range='32')",
+    "idx_sales_store_created_at": "CREATE INDEX idx_sales_store_created_at ON public.sales USING btree (store_id, created_at)",
+    "idx_sales_created_at_status": "CREATE INDEX idx_sales_created_at_status ON public.sales USING btree (created_at, sale_status_desc) INCLUDE (channel_id, store_id, total_amount)",
+    "idx_sales_channel_created_at": "CREATE INDEX idx_sales_channel_created_at ON public.sales USING btree (channel_id, created_at) INCLUDE (sale_status_desc, total_amount)",
+    "idx_sales_customer_created_at": "CREATE INDEX idx_sales_customer_created_at ON public.sales USING btree (customer_id, created_at) WHERE (customer_id IS NOT NULL)",
+    "idx_product_sales_sale_id": "CREATE INDEX idx_product_sales_sale_id ON public.product_sales USING btree (sale_id)",
+    "idx_product_sales_product_sale": "CREATE INDEX idx_product_sales_product_sale ON public.product_sales USING btree (product_id, sale_id)",
+    "idx_item_product_sales_product_sale_id": "CREATE INDEX idx_item_product_sales_product_sale_id ON public.item_product_sales USING btree (product_sale_id)",
+    "idx_payments_sale_id": "CREATE INDEX idx_payments_sale_id ON public.payments USING btree (sale_id)",
+    "idx_delivery_sales_sale_id": "CREATE INDEX idx_delivery_sales_sale_id ON public.delivery_sales USING btree (sale_id)",
+    "idx_delivery_addresses_sale_id": "CREATE INDEX idx_delivery_addresses_sale_id ON public.delivery_addresses USING btree (sale_id)",
+}
+
+
+def test_every_declared_index_has_its_pg_indexdef():
+    assert {definition.name for definition in load_index_definitions()} == set(PG_INDEXDEF)
+
+
+@pytest.mark.parametrize("definition", load_index_definitions(), ids=lambda definition: definition.name)
+def test_declared_index_matches_pg_indexdef(definition):
+    assert _normalize(definition.sql) == _normalize(PG_INDEXDEF[definition.name])
+
+
+def test_normalize_ignores_concurrently_and_only():
+    declared = "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_x ON sales (store_id)"
+    assert _normalize(declared) == _normalize("CREATE INDEX idx_x ON ONLY public.sales USING btree (store_id)")
+
+
+@pytest.mark.parametrize("declared, current", [
+    ("WHERE customer_id IS NOT NULL", "WHERE (customer_id IS NOT NULL)"),
+    ("WHERE (a > 0)", "WHERE ((a > 0))"),
+])
+def test_normalize_predicate_parens(declared, current):
+    base = "CREATE INDEX idx_x ON sales (customer_id) "
+    assert _normalize(base + declared) == _normalize(base + current)
+
+
+def test_normalize_keeps_meaningful_parens():
+    base = "CREATE INDEX idx_x ON sales (a) "
+    assert _normalize(base + "WHERE (a > 0) OR (b > 0)") != _normalize(base + "WHERE a > 0 OR b > 0 AND c")
+    assert _normalize(base + "WHERE (a > 0) OR (b > 0)") == _normalize(base + "WHERE ((a > 0) OR (b > 0))")
+
+
+def test_normalize_detects_different_columns():
+    assert _normalize("CREATE INDEX idx_x ON sales (store_id, created_at)") != _normalize(
+        "CREATE INDEX idx_x ON public.sales USING btree (created_at, store_id)"
+    )
@@ -0,0 +1,57 @@
+import math
+import random
+from collections import Counter
+
+import pytest
+
+from app.services.quantiles import GAMMA, RELATIVE_ACCURACY, ZERO_BUCKET, bucket_value, percentiles_from_buckets
+
+
+def _buckets(values):
+    """Mesmo cálculo de bucket_sql, em ordem crescente de bucket."""
+    counts = Counter(ZERO_BUCKET if v < 1 else math.ceil(math.log(v) / math.log(GAMMA)) for v in values)
+    return sorted(counts.items())
+
+
+def test_empty_histogram_returns_none():
+    assert percentiles_from_buckets([], (50.0, 99.0)) == {"p50": None, "p99": None}
+    assert percentiles_from_buckets([(10, 0)], (50.0,)) == {"p50": None}
+
+
+def test_labels():
+    result = percentiles_from_buckets([(10, 1)], (50.0, 99.9, 75.5))
+    assert list(result) == ["p50", "p99_9", "p75_5"]
+
+
+def test_picks_bucket_by_rank():
+    buckets = [(10, 5), (20, 4), (30, 1)]
+    result = percentiles_from_buckets(buckets, (0.0, 50.0, 90.0, 100.0))
+    # 10 valores: ranks 0 e 4,5 caem no primeiro bucket (5 valores), 8,1 no segundo, 9 no último
+    assert result == {
+        "p0": round(bucket_value(10), 1),
+        "p50": round(bucket_value(10), 1),
+        "p90": round(bucket_value(20), 1),
+        "p100": round(bucket_value(30), 1),
+    }
+
+
+def test_zero_bucket():
+    assert percentiles_from_buckets([(ZERO_BUCKET, 3)], (50.0,)) == {"p50": 0.0}
+    assert percentiles_from_buckets([(ZERO_BUCKET, 3), (100, 7)], (10.0, 90.0)) == {
+        "p10": 0.0,
+        "p90": round(bucket_value(100), 1),
+    }
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_within_relative_accuracy(seed):
+    rng = random.Random(seed)
+    # Tempos de preparo/entrega: cauda longa, de um minuto a algumas horas
+    values = sorted(60 + rng.lognormvariate(6, 1) for _ in range(5_000))
+    percentiles = (50.0, 90.0, 99.0, 99.9)
+    result = percentiles_from_buckets(_buckets(values), percentiles)
+    for percentile in percentiles:
+        exact = values[int(percentile / 100 * (len(values) - 1))]
+        estimate = result[f"p{percentile:g}".replace(".", "_")]
+        # + arredondamento para uma casa decimal
+        assert abs(estimate - exact) <= RELATIVE_ACCURACY * exact + 0.05
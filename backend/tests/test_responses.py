@@ -0,0 +1,66 @@
+from decimal import Decimal
+
+from app.core.responses import columnar, reshape
+
+
+def test_empty_rows():
+    assert columnar([]) == {
+        "shape": "columnar",
+        "rows": 0,
+        "columns": [],
+        "data": {},
+        "dimensions": {},
+        "dimension_columns": {},
+        "dictionaries": {},
+    }
+
+
+def test_known_pairs_become_dimensions():
+    rows = [
+        {"store_id": 1, "store_name": "Loja A", "revenue": Decimal("10.5")},
+        {"store_id": 2, "store_name": "Loja B", "revenue": Decimal("7")},
+        {"store_id": 1, "store_name": "Loja A", "revenue": Decimal("3")},
+        {"store_id": None, "store_name": None, "revenue": Decimal("1")},
+    ]
+    result = columnar(rows)
+    assert result["rows"] == 4
+    # A coluna de nome sai; o id fica e aponta para o dicionário
+    assert result["columns"] == ["store_id", "revenue"]
+    assert result["data"] == {"store_id": [1, 2, 1, None], "revenue": [Decimal("10.5"), Decimal("7"), Decimal("3"), Decimal("1")]}
+    assert result["dimensions"] == {"stores": {1: "Loja A", 2: "Loja B"}}
+    assert result["dimension_columns"] == {"store_name": {"dimension": "stores", "key": "store_id"}}
+
+
+def test_name_without_id_is_not_a_dimension():
+    result = columnar([{"store_name": "Loja A", "orders": 1}, {"store_name": "Loja B", "orders": 2}])
+    assert result["dimensions"] == {}
+    assert result["columns"] == ["store_name", "orders"]
+
+
+def test_repeated_strings_are_dictionary_encoded():
+    rows = [{"city": "Recife", "state": "PE"}, {"city": "Olinda", "state": "PE"},
+            {"city": "Recife", "state": None}, {"city": "Natal", "state": "RN"}]
+    result = columnar(rows)
+    assert result["dictionaries"] == {"city": ["Recife", "Olinda", "Natal"], "state": ["PE", "RN"]}
+    assert result["data"] == {"city": [0, 1, 0, 2], "state": [0, 0, None, 1]}
+
+
+def test_unique_strings_stay_as_values():
+    result = columnar([{"channel": "iFood"}, {"channel": "Rappi"}])
+    assert result["dictionaries"] == {}
+    assert result["data"] == {"channel": ["iFood", "Rappi"]}
+
+
+def test_reshape_only_applies_to_columnar():
+    content = {"data": [{"orders": 1}], "success": True}
+    assert reshape(content, "rows") is content
+    reshaped = reshape(content, "columnar")
+    assert reshaped["success"] is True
+    assert reshaped["data"] == {"orders": [1]}
+
+
+def test_reshape_batch_results():
+    content = {"results": {"a": {"data": [{"orders": 1}]}, "b": {"error": "falhou"}}}
+    reshaped = reshape(content, "columnar")
+    assert reshaped["results"]["a"]["data"] == {"orders": [1]}
+    assert reshaped["results"]["b"] == {"error": "falhou"}
@@ -0,0 +1,135 @@
+import asyncio
+import re
+
+import pytest
+
+from app.services.semantic import (
+    SOURCES_BY_NAME, SemanticError, SemanticLayer, build_shape, candidate_sources, compile_sql,
+)
+
+
+class FakeRollups:
+    def __init__(self, fresh=()):
+        self.fresh = set(fresh)
+
+    async def is_fresh(self, db_pool, name):
+        return name in self.fresh
+
+
+def _choose(shape, fresh=(), source_name=None):
+    layer = SemanticLayer(rollups=FakeRollups(fresh))
+    return asyncio.run(layer.choose_source(None, shape, source_name)).name
+
+
+def _params(sql):
+    return sorted({int(n) for n in re.findall(r"\$(\d+)", sql)})
+
+
+@pytest.mark.parametrize("kwargs, message", [
+    ({"measures": ["revenu"]}, "Medidas desconhecidas: revenu"),
+    ({"measures": ["revenue"], "dimensions": ["week"]}, "Dimensões desconhecidas: week"),
+    ({"measures": []}, "ao menos uma medida"),
+    ({"measures": ["revenue"], "dimensions": ["day"], "order_by": [("orders", True)]}, "order_by fora da resposta: orders"),
+])
+def test_build_shape_rejects_invalid_input(kwargs, message):
+    with pytest.raises(SemanticError, match=message):
+        build_shape(**kwargs)
+
+
+def test_build_shape_normalizes():
+    shape = build_shape(["revenue", "orders", "revenue"], ["store", "city"], ["channel_ids", "store_ids"])
+    assert shape.measures == ("revenue", "orders")
+    # Filtros sempre na ordem de FILTERS, qualquer que seja a ordem pedida
+    assert shape.filters == ("store_ids", "channel_ids")
+    # store e city agrupam pela mesma chave
+    assert shape.keys == ("store_id",)
+    assert shape.partials == ("completed_amount", "completed_count")
+
+
+def test_shape_is_hashable_and_stable():
+    assert build_shape(["revenue"], ["day"]) == build_shape(["revenue"], ["day"])
+    assert hash(build_shape(["revenue"], ["day"])) == hash(build_shape(["revenue"], ["day"]))
+
+
+@pytest.mark.parametrize("filters, expected", [
+    ((), {"limit": 3}),
+    (("store_ids",), {"store_ids": 3, "limit": 4}),
+    (("channel_ids",), {"channel_ids": 3, "limit": 4}),
+    (("channel_ids", "store_ids"), {"store_ids": 3, "channel_ids": 4, "limit": 5}),
+])
+def test_compile_sql_parameter_numbering(filters, expected):
+    shape = build_shape(["revenue"], ["day"], filters)
+    for source in candidate_sources(shape):
+        sql, param_count = compile_sql(shape, source)
+        assert param_count == expected["limit"]
+        assert _params(sql) == list(range(1, param_count + 1))
+        assert sql.endswith(f"LIMIT ${expected['limit']}")
+        for name in ("store_ids", "channel_ids"):
+            if name in expected:
+                assert f"{source.filters[name]} = ANY(${expected[name]}::int[])" in sql
+
+
+def test_compile_sql_rollup_adds_tail_union():
+    shape = build_shape(["revenue"], ["day"], ["store_ids"])
+    sql, _ = compile_sql(shape, SOURCES_BY_NAME["sales_daily"])
+    assert "SELECT last_sale_id FROM rollup_state WHERE name = 'sales_daily'" in sql
+    assert sql.count("UNION ALL") == 1
+    rollup, tail = sql.split("UNION ALL")
+    assert "FROM sales_daily r" in rollup and "r.store_id = ANY($3::int[])" in rollup
+    # A cauda lê só vendas depois do rollup, com os mesmos filtros
+    assert "FROM sales s" in tail
+    assert "s.id > COALESCE((SELECT last_sale_id FROM coverage), 0)" in tail
+    assert "s.store_id = ANY($3::int[])" in tail
+
+
+def test_compile_sql_rollup_takes_tail_ctes_once():
+    shape = build_shape(["items_sold"], ["product"])
+    sql, _ = compile_sql(shape, SOURCES_BY_NAME["product_sales_hourly"])
+    assert sql.count("sale_range AS (") == 1
+    assert "ps.sale_id BETWEEN (SELECT first_id FROM sale_range)" in sql.split("UNION ALL")[1]
+
+
+def test_compile_sql_raw_source_has_no_tail():
+    shape = build_shape(["revenue"], ["day"])
+    sql, _ = compile_sql(shape, SOURCES_BY_NAME["sales"])
+    assert "UNION ALL" not in sql
+    assert "coverage" not in sql
+
+
+def test_compile_sql_joins_and_default_order():
+    sql, _ = compile_sql(build_shape(["product_revenue"], ["category"]), SOURCES_BY_NAME["product_sales"])
+    assert "LEFT JOIN products p ON p.id = f.product_id\nLEFT JOIN categories cat" in sql
+    assert "ORDER BY product_revenue DESC NULLS LAST" in sql
+    sql, _ = compile_sql(build_shape(["orders"], ["day"]), SOURCES_BY_NAME["sales"])
+    assert "ORDER BY day ASC NULLS LAST" in sql
+
+
+@pytest.mark.parametrize("measures, dimensions, expected", [
+    (["revenue"], ["store"], ["sales_daily", "sales_hourly", "sales"]),
+    (["avg_delivery_time"], ["day"], ["sales_daily", "sales"]),
+    (["orders"], ["hour"], ["sales_hourly", "sales"]),
+    (["items_sold"], ["category"], ["product_sales_hourly", "product_sales"]),
+    (["addon_revenue"], ["product"], ["item_product_sales"]),
+])
+def test_candidate_sources(measures, dimensions, expected):
+    assert [source.name for source in candidate_sources(build_shape(measures, dimensions))] == expected
+
+
+def test_no_source_mixes_sales_and_product_measures():
+    with pytest.raises(SemanticError, match="Nenhuma fonte"):
+        candidate_sources(build_shape(["revenue", "items_sold"]))
+
+
+def test_choose_source_prefers_fresh_rollup():
+    shape = build_shape(["revenue"], ["day"])
+    assert _choose(shape, fresh={"sales_daily", "sales_hourly"}) == "sales_daily"
+    assert _choose(shape, fresh={"sales_hourly"}) == "sales_hourly"
+    # Sem rollup atualizado: tabela bruta
+    assert _choose(shape) == "sales"
+
+
+def test_choose_source_forced():
+    shape = build_shape(["revenue"], ["day"])
+    assert _choose(shape, fresh={"sales_daily"}, source_name="sales") == "sales"
+    with pytest.raises(SemanticError, match="não responde"):
+        _choose(shape, source_name="product_sales")
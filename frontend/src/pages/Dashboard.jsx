@@ -21,7 +21,7 @@ export function Dashboard() {
     },
     customers: {
       total: 0,
-      new_last_30d: 0
+      new_in_period: 0
     }
   })
   
@@ -52,19 +52,6 @@ export function Dashboard() {
     return date.toISOString().split('T')[0]
   }
 
-  const checkDataAvailability = async () => {
-    try {
-      const startStr = formatDateForAPI(globalDateRange.startDate)
-      const endStr = formatDateForAPI(globalDateRange.endDate)
-      
-      const response = await analyticsService.checkDataAvailability(startStr, endStr)
-      return response.data?.has_data || false
-    } catch (error) {
-      console.warn('⚠️ Não foi possível verificar disponibilidade de dados:', error)
-      return true
-    }
-  }
-
   const loadDashboardData = async () => {
     if (dateError) {
       return
@@ -80,46 +67,23 @@ export function Dashboard() {
       
       console.log('📅 Carregando dados reais para período GLOBAL:', startStr, 'até', endStr)
       
-      const hasData = await checkDataAvailability()
-      if (!hasData) {
+      const dashboardRes = await analyticsService.getDashboard(startStr, endStr)
+      const dashboard = dashboardRes.data || {}
+
+      console.log('✅ Dados reais carregados:', dashboard)
+
+      if (!dashboard.has_data) {
         setDataStatus('no_data')
         setLoading(false)
         return
       }
 
-      const daysDiff = Math.ceil((globalDateRange.endDate - globalDateRange.startDate) / (1000 * 60 * 60 * 24))
-      const overviewDays = Math.min(daysDiff, 90)
-      
-      const [kpisRes, channelsRes, salesRes] = await Promise.all([
-        analyticsService.getOverviewKpis(overviewDays),
-        analyticsService.getTopChannels(startStr, endStr),
-        analyticsService.getTotalSales(startStr, endStr)
-      ])
-
-      console.log('✅ Dados reais carregados:', {
-        kpis: kpisRes.data,
-        channels: channelsRes.data,
-        sales: salesRes.data
+      setKpis({
+        sales: dashboard.sales || {},
+        customers: dashboard.customers || {}
       })
-
-      setKpis(kpisRes.data || {})
-
-      const channelsData = channelsRes.data?.data || channelsRes.data || []
-      setTopChannels(Array.isArray(channelsData) ? channelsData : [])
-      setInsights(channelsRes.data?.insights || [])
-
-      if (salesRes.data?.data?.[0]) {
-        const salesData = salesRes.data.data[0]
-        setKpis(prev => ({
-          ...prev,
-          sales: {
-            total_revenue: salesData.total_revenue || prev.sales?.total_revenue || 0,
-            total_orders: salesData.total_orders || prev.sales?.total_orders || 0,
-            avg_ticket: salesData.avg_ticket || prev.sales?.avg_ticket || 0,
-            unique_customers: prev.sales?.unique_customers || 0
-          }
-        }))
-      }
+      setTopChannels(Array.isArray(dashboard.channels) ? dashboard.channels : [])
+      setInsights(dashboard.insights || [])
 
       setDataStatus('success')
 
@@ -262,7 +226,7 @@ export function Dashboard() {
             </div>
             <div className="text-gray-600 text-sm">Clientes Cadastrados</div>
             <div className="text-xs text-gray-400 mt-1">
-              +{kpis.customers?.new_last_30d || 0} novos
+              +{kpis.customers?.new_in_period || 0} novos no período
             </div>
           </Card>
         </div>
@@ -102,7 +102,14 @@ export function ReportsPage() {
   }
 
   const handleExportCSV = () => {
-    alert('Funcionalidade de exportação em CSV será implementada em breve!')
+    const startStr = formatDateForAPI(globalDateRange.startDate)
+    const endStr = formatDateForAPI(globalDateRange.endDate)
+
+    window.location.href = analyticsService.getExportUrl('detail/sales', {
+      start_date: startStr,
+      end_date: endStr,
+      format: 'csv'
+    })
   }
 
   if (loading) {
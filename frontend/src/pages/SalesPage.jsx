@@ -48,25 +48,25 @@ export function SalesPage() {
       const startStr = formatDateForAPI(globalDateRange.startDate)
       const endStr = formatDateForAPI(globalDateRange.endDate)
 
-      const [
-        summaryRes, 
-        channelsRes, 
-        daysRes, 
-        hoursRes,
-        cancellationRes
-      ] = await Promise.all([
-        analyticsService.getTotalSales(startStr, endStr),
-        analyticsService.getTopChannels(startStr, endStr),
-        analyticsService.getTopDays(startStr, endStr),
-        analyticsService.getPeakHours(startStr, endStr),
-        analyticsService.getCancellationRate(startStr, endStr)
+      const batchRes = await analyticsService.runBatch(startStr, endStr, [
+        { id: 'summary', category: 'vendas_e_desempenho', query: 'total_sales_period' },
+        { id: 'channels', category: 'vendas_e_desempenho', query: 'top_sales_channel' },
+        { id: 'days', category: 'vendas_e_desempenho', query: 'top_sales_day_week' },
+        { id: 'hours', category: 'vendas_e_desempenho', query: 'peak_sales_hours' },
+        { id: 'cancellation', category: 'vendas_e_desempenho', query: 'cancellation_rate' }
       ])
 
-      setSalesSummary(summaryRes.data.data?.[0] || {})
-      setTopChannels(channelsRes.data.data || [])
-      setTopDays(daysRes.data.data || [])
-      setPeakHours(hoursRes.data.data || [])
-      setCancellationRate(cancellationRes.data.data || [])
+      const results = batchRes.data.results
+      const failed = Object.entries(results).filter(([, result]) => !result.success)
+      if (failed.length > 0) {
+        console.warn('⚠️ Queries do lote com erro:', failed)
+      }
+
+      setSalesSummary(results.summary?.data?.[0] || {})
+      setTopChannels(results.channels?.data || [])
+      setTopDays(results.days?.data || [])
+      setPeakHours(results.hours?.data || [])
+      setCancellationRate(results.cancellation?.data || [])
       
     } catch (error) {
       console.error('❌ Erro ao carregar dados de vendas:', error)
@@ -29,15 +29,37 @@ api.interceptors.response.use(
   }
 )
 
+// Converte a resposta shape=columnar de volta para a lista de objetos
+export const fromColumnar = (payload) => {
+  if (!payload || payload.shape !== 'columnar') return payload?.data || []
+
+  const { rows, columns, data, dimensions = {}, dimension_columns = {}, dictionaries = {} } = payload
+  const result = new Array(rows)
+  for (let i = 0; i < rows; i++) {
+    const row = {}
+    for (const column of columns) {
+      const value = data[column][i]
+      row[column] = dictionaries[column] && value !== null ? dictionaries[column][value] : value
+    }
+    for (const [name, { dimension, key }] of Object.entries(dimension_columns)) {
+      row[name] = dimensions[dimension]?.[row[key]] ?? null
+    }
+    result[i] = row
+  }
+  return result
+}
+
 export const analyticsService = {
   getStoreComparison: async (startDate, endDate, storeIds) => {
     const response = await api.get('/analytics/stores/comparison', {
       params: { 
         start_date: startDate, 
         end_date: endDate,
-        store_ids: storeIds.join(',')
+        store_ids: storeIds.join(','),
+        shape: 'columnar'
       }
     })
+    response.data = { ...response.data, data: fromColumnar(response.data) }
     return response
   },
 
@@ -67,6 +89,13 @@ export const analyticsService = {
     return response
   },
 
+  getDashboard: async (startDate, endDate) => {
+    const response = await api.get('/analytics/dashboard', {
+      params: { start_date: startDate, end_date: endDate }
+    })
+    return response
+  },
+
   getTopChannels: async (startDate, endDate) => {
     const response = await api.get('/analytics/top-channels', {
       params: { start_date: startDate, end_date: endDate }
@@ -209,6 +238,20 @@ export const analyticsService = {
     return response
   },
 
+  runBatch: async (startDate, endDate, queries) => {
+    const response = await api.post('/analytics/batch', {
+      start_date: startDate,
+      end_date: endDate,
+      queries
+    })
+    return response
+  },
+
+  getExportUrl: (path, params = {}) => {
+    const query = new URLSearchParams(params).toString()
+    return `${API_BASE_URL}/api/v1/analytics/export/${path}${query ? `?${query}` : ''}`
+  },
+
   checkDataAvailability: async (startDate, endDate) => {
     const response = await api.get('/analytics/data-availability', {
       params: { start_date: startDate, end_date: endDate }